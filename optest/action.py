@@ -6,6 +6,7 @@ from oic.utils.http_util import Redirect
 from rrtest import FatalError
 from rrtest.check import ExpectedError
 from rrtest.check import STATUSCODE
+from rrtest.responses import ResponseStore
 
 from oictest.check import factory as check_factory
 from oictest.oic_operations import AuthorizationRequest
@@ -62,7 +63,7 @@ class Conversation(object):
         self.exception = None
         self.provider_info = None
         # to keep track on what's happened
-        self.protocol_response = []
+        self.protocol_response = ResponseStore()
         self.cis = []
 
     def check_severity(self, stat):
@@ -190,7 +191,7 @@ class Response(Conversation):
         self.session = session
         self.creq, self.cresp = phase
         self.test_output = []
-        self.protocol_response = []
+        self.protocol_response = ResponseStore()
         self.verbose = verbose
         self.keyjar = keyjar
         self.accept_exception = accept_exception
@@ -13,6 +13,7 @@ import re
 import requests
 import sys
 from rrtest import Trace, FatalError
+from rrtest.static import FileResponse
 import action
 
 from beaker.middleware import SessionMiddleware
@@ -229,33 +230,9 @@ def skip_registration(phase, session):
 # -----------------------------------------------------------------------------
 # Callbacks
 # -----------------------------------------------------------------------------
-#noinspection PyUnresolvedReferences
-CTYPE_MAP = {
-    "ico": "image/x-icon",
-    "html": "text/html",
-    "json": 'application/json',
-    "txt": 'text/plain',
-    "css": 'text/css',
-    "xml": "text/xml",
-    "js": "text/javascript"
-}
-
-
 #noinspection PyUnusedLocal
 def static(environ, session, path):
-    logger.info("[static]sending: %s" % (path,))
-
-    try:
-        text = open(path).read()
-        ext = path.rsplit(".", 1)[-1]
-        try:
-            ctype = CTYPE_MAP[ext]
-        except KeyError:
-            ctype = CTYPE_MAP["txt"]
-
-        return Response(text, headers=[('Content-Type', ctype)])
-    except IOError:
-        return NotFound()
+    return FileResponse(path)
 
 
 #noinspection PyUnusedLocal
@@ -432,11 +409,13 @@ def application(environ, start_response):
 
     if not resp:
         if path == "robots.txt":
-            return static(environ, session, "static/robots.txt")
+            resp = static(environ, session, "static/robots.txt")
         elif path == "keys":
-            return static(environ, session, "keys/jwk")
+            resp = static(environ, session, "keys/jwk")
         elif path.startswith("static"):
-            return static(environ, session, path)
+            resp = static(environ, session, path)
+        if resp:
+            return resp(environ, start_response)
 
     # From here on testing is setup and done
 
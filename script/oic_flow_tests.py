@@ -1,21 +1,31 @@
 #!/usr/bin/env python
-import os
+import copy
 import json
+import logging
 import time
 import argparse
+from collections import OrderedDict
 from subprocess import Popen
 from subprocess import PIPE
 
+from oic.oic import Client
+from oic.oic.consumer import Consumer
+from oic.oic.message import factory as message_factory
 from oic.utils.keyio import KeyJar
 from oic.utils.keyio import key_export
-from oictest.graph import Node, flatten
+from oictest import OIC
+from oictest import oic_operations
+from oictest.base import Conversation
+from oictest.batch import run_graph
+from oictest.check import factory as check_factory
+from oictest.graph import Node
 from oictest.graph import sort_flows_into_graph
 from rrtest.check import STATUSCODE
 from oictest import start_key_server
 
 __author__ = 'rohe0002'
 
-OICC = "oicc.py"
+LOGGER = logging.getLogger("oic")
 
 LEVEL = {
     "INFORMATION": 'I',
@@ -27,42 +37,56 @@ LEVEL = {
 }
 
 
-def test(node, who, host, csv=False):
-    global OICC
-
-    #print ">> %s" % node.name
-
-    p1 = Popen(["./%s.py" % who], stdout=PIPE)
-    cmd2 = [OICC, "-e", "-J", "-", "-H", host, node.name]
-
-    p2 = Popen(cmd2, stdin=p1.stdout, stdout=PIPE, stderr=PIPE)
-    p1.stdout.close()
-    (p_out, p_err) = p2.communicate()
-
+def run_flow(flow_id, config, host):
+    """
+    Runs one flow in this process.
+
+    :param flow_id: The flow to run
+    :param config: The script configuration, every flow gets its own copy
+    :param host: Host name, replaces %s in the configuration URLs
+    :return: The flows test summation and trace
+    """
+    cli = None
+    try:
+        cli = OIC(oic_operations, Client, Consumer, message_factory,
+                  check_factory, Conversation)
+        cli.args = cli._parser.parse_args(["-e", "-H", host, flow_id])
+        cli.json_config = copy.deepcopy(config)
+        tsum = cli.run_flow()
+    except (Exception, SystemExit), err:
+        tsum = {"id": flow_id, "status": 4,
+                "tests": [{"id": "-", "status": 4,
+                           "message": "%s: %s" % (err.__class__.__name__,
+                                                  err)}]}
+    if tsum is None:
+        tsum = {"id": flow_id, "status": 4,
+                "tests": [{"id": "-", "status": 4,
+                           "message": "Failed to set up the flow"}]}
+    try:
+        trace = cli.trace
+    except AttributeError:
+        trace = ""
+    return tsum, trace
+
+
+def test(node, tsum, trace):
     reason = ""
-    if p_out:
-        try:
-            output = json.loads(p_out)
-        except ValueError:
-            print 40 * "=" + "\n" + "failed on '%s'" % node.name + "\n" + \
-                p_out + "\n" + 40 * "="
-            raise
-        node.trace = output
-        if output["status"] > 1:
-            for test in output["tests"]:
-                if test["status"] > 1:
-                    try:
-                        reason = test["message"]
-                    except KeyError:
-                        print test
-            node.err = p_err
-        #print output["status"]
-        _sc = STATUSCODE[output["status"]]
-    else:
-        _sc = STATUSCODE[1]
-        node.err = p_err
-
-    node.state = _sc
+    node.trace = tsum
+    if tsum["status"] > 1:
+        for test in tsum["tests"]:
+            if test["status"] > 1:
+                try:
+                    reason = test["message"]
+                except KeyError:
+                    print test
+        node.err = str(trace)
+
+    node.state = STATUSCODE[tsum["status"]]
+    return reason
+
+
+def report(node, reason, csv=False):
+    _sc = node.state
     sign = LEVEL[_sc]
     if reason:
         if csv:
@@ -76,25 +100,36 @@ def test(node, who, host, csv=False):
             print "%s (%s)%s - %s" % (sign, node.name, node.desc, _sc)
 
 
-def recursively_test(node, who, host, csv=False):
-    for parent in node.parent:
-        if parent.state == STATUSCODE[0]:  # untested, don't go further
-            print "SKIP %s Parent untested: %s" % (node.name, parent.name)
-            return
+def test_all(nodes, config, host, csv=False, workers=4):
+    """
+    Runs the flows, a flow is only run if the flows it depends on passed.
+    Flows that doesn't depend on each other are run concurrently.
 
-    test(node, who, host, csv)
+    :param nodes: dictionary with all the nodes keyed by flow id, in the
+        order they should be reported
+    """
+    def _run(index, name):
+        return run_flow(name, config, host)
 
-    #print "node.state: %s" % node.state
+    res = run_graph(nodes.keys(),
+                    lambda name: [p.name for p in nodes[name].parent],
+                    _run, workers,
+                    lambda r: STATUSCODE[r[0]["status"]] in STATUSCODE[0:3])
 
-    if node.state in STATUSCODE[0:3]:
-        test_all(node.children, who, host, csv)
+    for name, node in nodes.items():
+        if res[name] is None:  # a flow it depends on failed
+            continue
+        report(node, test(node, *res[name]), csv)
 
 
-def test_all(graph, who, host, csv=False):
-    skeys = graph.keys()
-    skeys.sort()
-    for key in skeys:
-        recursively_test(graph[key], who, host, csv)
+def walk(graph):
+    """
+    The nodes in the order the flows used to be run one after the other.
+    """
+    for key in sorted(graph.keys()):
+        yield graph[key]
+        for node in walk(graph[key].children):
+            yield node
 
 from oictest import KEY_EXPORT_ARGS
 
@@ -114,12 +149,20 @@ if __name__ == "__main__":
     _parser.add_argument('-c', dest='csv', action='store_true')
     _parser.add_argument('-l', dest='list', action='store_true')
     _parser.add_argument('-E', dest='export_path', default="")
+    _parser.add_argument('-w', dest='workers', type=int, default=4,
+                         help="Number of flows to run at the same time")
     _parser.add_argument(
         '-S', dest="script_path",
         help="Path to the script running the static web server")
     _parser.add_argument('server', nargs=1)
     args = _parser.parse_args()
 
+    hdlr = logging.FileHandler("oictest.log")
+    hdlr.setFormatter(logging.Formatter(
+        "%(asctime)s %(name)s:%(levelname)s %(message)s"))
+    LOGGER.addHandler(hdlr)
+    LOGGER.setLevel(logging.DEBUG)
+
     args.server = args.server[0].strip("'")
     args.server = args.server.strip('"')
 
@@ -143,15 +186,13 @@ if __name__ == "__main__":
     if args.list:
         keys = FLOWS.keys()
         keys.sort()
-        for key in keys:
-            node = Node(name=key, desc=FLOWS[key])
-            test(node, args.server, args.host, args.csv)
+        nodes = OrderedDict([(key, Node(name=key, desc=FLOWS[key]))
+                             for key in keys])
     else:
         flow_graph = sort_flows_into_graph(FLOWS, args.group)
-        _l = flatten(flow_graph)
-        test_all(flow_graph, args.server, args.host, args.csv)
+        nodes = OrderedDict([(n.name, n) for n in walk(flow_graph)])
+
+    test_all(nodes, _cnf, args.host, args.csv, args.workers)
 
     if _pop:
         _pop.kill()
-
-    os.wait()
\ No newline at end of file
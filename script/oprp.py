@@ -22,7 +22,7 @@ from oic.oic.message import factory as message_factory
 from oic.oic.message import OpenIDSchema
 
 from oictest.graph import flatten
-from oictest.graph import in_tree
+from oictest.graph import node_index
 from oictest.graph import node_cmp
 from oictest.base import Conversation
 from oictest.check import factory as check_factory
@@ -42,6 +42,7 @@ from rrtest import exception_trace
 from rrtest import Break
 from rrtest.check import ERROR
 from rrtest.check import WARNING
+from rrtest.static import STATIC
 
 LOGGER = logging.getLogger("")
 
@@ -60,28 +61,7 @@ def setup_logging(logfile):
 
 
 def static(environ, start_response, logger, path):
-    logger.info("[static]sending: %s" % (path,))
-
-    try:
-        text = open(path).read()
-        if path.endswith(".ico"):
-            start_response('200 OK', [('Content-Type', "image/x-icon")])
-        elif path.endswith(".html"):
-            start_response('200 OK', [('Content-Type', 'text/html')])
-        elif path.endswith(".json"):
-            start_response('200 OK', [('Content-Type', 'application/json')])
-        elif path.endswith(".jwt"):
-            start_response('200 OK', [('Content-Type', 'application/jwt')])
-        elif path.endswith(".txt"):
-            start_response('200 OK', [('Content-Type', 'text/plain')])
-        elif path.endswith(".css"):
-            start_response('200 OK', [('Content-Type', 'text/css')])
-        else:
-            start_response('200 OK', [('Content-Type', "text/plain")])
-        return [text]
-    except IOError:
-        resp = NotFound()
-        return resp(environ, start_response)
+    return STATIC(environ, start_response, path)
 
 
 def opchoice(environ, start_response, clients):
@@ -169,15 +149,15 @@ def session_setup(session, path, index=0):
     for key in _keys:
         if key.startswith("_"):
             continue
-        elif key in ["tests", "graph", "flow_names", "response_type",
-                     "test_info", "profiles"]:  # don't touch !
+        elif key in ["tests", "graph", "node_index", "flow_names",
+                     "response_type", "test_info", "profiles"]:  # don't touch !
             continue
         else:
             del session[key]
 
     ots = OIDCTestSetup(CONF, TEST_FLOWS, str(CONF.PORT))
     session["testid"] = path
-    session["node"] = in_tree(session["graph"], path)
+    session["node"] = session["node_index"].get(path)
     sequence_info = ots.make_sequence(path)
     sequence_info = ots.add_init(sequence_info)
     session["seq_info"] = sequence_info
@@ -204,6 +184,7 @@ def verify_support(conv, ots, graph):
     :param ots: The OIDC RP setup.
     :param graph: A graph representation of the possible test flows.
     """
+    index = node_index(graph)
     for key, val in ots.test_defs.FLOWS.items():
         sequence_info = ots.make_sequence(key)
         for op in sequence_info["sequence"]:
@@ -217,7 +198,7 @@ def verify_support(conv, ots, graph):
                 chk = CheckTokenEndpointAuthMethod()
                 res = chk(conv)
                 if res["status"] > 1:
-                    node = in_tree(graph, key)
+                    node = index[key]
                     node.state = 4
 
             if "pre" in conv.req.tests:
@@ -236,7 +217,7 @@ def verify_support(conv, ots, graph):
                         chk = test()
                         res = chk(conv)
                         if res["status"] > 1:
-                            node = in_tree(graph, key)
+                            node = index[key]
                             node.state = 4
 
 
@@ -447,6 +428,7 @@ def run_sequence(sequence_info, session, conv, ots, environ, start_response,
 def init_session(session):
     graph = sort_flows_into_graph(TEST_FLOWS.FLOWS)
     session["graph"] = graph
+    session["node_index"] = node_index(graph)
     session["tests"] = [x for x in flatten(graph)]
     session["tests"].sort(node_cmp)
     session["flow_names"] = [x.name for x in session["tests"]]
@@ -630,6 +612,8 @@ if __name__ == '__main__':
     parser.add_argument('-t', dest='testflows')
     parser.add_argument('-d', dest='directory')
     parser.add_argument('-p', dest='profiles')
+    parser.add_argument('-S', dest='session_db',
+                        help="Keep sessions in this SQLite database")
     parser.add_argument(dest="config")
     args = parser.parse_args()
 
@@ -673,9 +657,18 @@ if __name__ == '__main__':
 
     setup_logging("rp_%s.log" % CONF.PORT)
 
-    SRV = wsgiserver.CherryPyWSGIServer(('0.0.0.0', CONF.PORT),
-                                        SessionMiddleware(application,
-                                                          session_opts))
+    if args.session_db:
+        from oictest.session import SessionStore
+        from oictest.session import SessionMiddleware as ServerSideSession
+
+        STORE = SessionStore(args.session_db,
+                             timeout=session_opts["session.timeout"],
+                             shared={"cache": CACHE})
+        APP = ServerSideSession(application, STORE)
+    else:
+        APP = SessionMiddleware(application, session_opts)
+
+    SRV = wsgiserver.CherryPyWSGIServer(('0.0.0.0', CONF.PORT), APP)
 
     if CONF.BASE.startswith("https"):
         from cherrypy.wsgiserver import ssl_pyopenssl
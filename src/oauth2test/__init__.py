@@ -87,9 +87,11 @@ class OAuth2(object):
         self._pop = None
         self.json_config = None
         self.features = {}
+        self.fatal = False
 
     def parse_args(self):
-        self.json_config = self.json_config_file()
+        if self.json_config is None:
+            self.json_config = self.json_config_file()
 
         try:
             self.features = self.json_config["features"]
@@ -156,89 +158,8 @@ class OAuth2(object):
             self.args.flow = self.args.flow.strip("'")
             self.args.flow = self.args.flow.strip('"')
 
-            flow_spec = self.operations_mod.FLOWS[self.args.flow]
             try:
-                block = flow_spec["block"]
-            except KeyError:
-                block = {}
-
-            self.parse_args()
-            _spec = self.make_sequence()
-            _spec["flow"] = flow_spec["sequence"]
-            interact = self.get_interactions()
-
-            try:
-                self.do_features(interact, _spec, block)
-            except Exception, exc:
-                exception_trace("do_features", exc)
-                return
-
-            try:
-                expect_exception = flow_spec["expect_exception"]
-            except KeyError:
-                expect_exception = False
-
-            conv = None
-            try:
-                if self.pinfo:
-                    self.client.provider_info = self.pinfo
-                if self.args.verbose:
-                    print >> sys.stderr, "Set up done, running sequence"
-
-                args = {"break": self.args.bailout}
-                for arg in ["cookie_imp", "cookie_exp"]:
-                    try:
-                        val = getattr(self.args, arg)
-                    except AttributeError:
-                        continue
-                    else:
-                        args[arg] = val
-
-                cf = self.get_login_cookies()
-                if cf:
-                    args["login_cookies"] = cf
-
-                for arg in ["extra_args", "kwargs_mod"]:
-                    try:
-                        args[arg] = self.json_config[arg]
-                    except KeyError:
-                        args[arg] = {}
-
-                self.trace.info(
-                    "client preferences: %s" % self.client.client_prefs)
-
-                conv = self.conversation_cls(self.client, self.cconf,
-                                             self.trace, interact,
-                                             msg_factory=self.msg_factory,
-                                             check_factory=self.chk_factory,
-                                             expect_exception=expect_exception,
-                                             **args)
-                try:
-                    conv.ignore_check = self.json_config["ignore_check"]
-                except KeyError:
-                    pass
-
-                if self.args.restart:
-                    conv.restore_state(self.args.restart)
-
-                conv.do_sequence(_spec)
-                #testres, trace = do_sequence(oper,
-                self.test_log = conv.test_output
-                tsum = self.test_summation(self.args.flow)
-                if tsum["status"] > 1 or self.args.debug:
-                    print >> sys.stdout, json.dumps(tsum)
-                    print >> sys.stderr, self.trace
-            except (FatalError, UnSupported), err:
-                self.test_log = conv.test_output
-                tsum = self.test_summation(self.args.flow)
-                print >> sys.stdout, json.dumps(tsum)
-                print >> sys.stderr, self.trace
-                # try:
-                #     print >> sys.stderr, err.trace
-                # except AttributeError:
-                #     pass
-                # print err
-                #exception_trace("RUN", err)
+                tsum = self.run_flow()
             except PyoidcError, err:
                 if err.message:
                     self.trace.info("Protocol message: %s" % err.message)
@@ -249,6 +170,11 @@ class OAuth2(object):
                 print >> sys.stderr, self.trace
                 print err
                 exception_trace("RUN", err)
+            else:
+                if tsum is not None:
+                    if self.fatal or tsum["status"] > 1 or self.args.debug:
+                        print >> sys.stdout, json.dumps(tsum)
+                        print >> sys.stderr, self.trace
 
             #if self._pop is not None:
             #    self._pop.terminate()
@@ -256,6 +182,87 @@ class OAuth2(object):
                 # os.kill(self.environ["keyprovider"].pid, signal.SIGTERM)
                 self.environ["keyprovider"].terminate()
 
+    def run_flow(self):
+        """
+        Runs the flow given by the flow argument. The script configuration
+        is read as specified by the arguments unless json_config has
+        already been set.
+
+        :return: The test summation or None if the flow couldn't be set up
+        """
+        flow_spec = self.operations_mod.FLOWS[self.args.flow]
+        try:
+            block = flow_spec["block"]
+        except KeyError:
+            block = {}
+
+        self.parse_args()
+        _spec = self.make_sequence()
+        _spec["flow"] = flow_spec["sequence"]
+        interact = self.get_interactions()
+
+        try:
+            self.do_features(interact, _spec, block)
+        except Exception, exc:
+            exception_trace("do_features", exc)
+            return None
+
+        try:
+            expect_exception = flow_spec["expect_exception"]
+        except KeyError:
+            expect_exception = False
+
+        conv = None
+        try:
+            if self.pinfo:
+                self.client.provider_info = self.pinfo
+            if self.args.verbose:
+                print >> sys.stderr, "Set up done, running sequence"
+
+            args = {"break": self.args.bailout}
+            for arg in ["cookie_imp", "cookie_exp"]:
+                try:
+                    val = getattr(self.args, arg)
+                except AttributeError:
+                    continue
+                else:
+                    args[arg] = val
+
+            cf = self.get_login_cookies()
+            if cf:
+                args["login_cookies"] = cf
+
+            for arg in ["extra_args", "kwargs_mod"]:
+                try:
+                    args[arg] = self.json_config[arg]
+                except KeyError:
+                    args[arg] = {}
+
+            self.trace.info(
+                "client preferences: %s" % self.client.client_prefs)
+
+            conv = self.conversation_cls(self.client, self.cconf,
+                                         self.trace, interact,
+                                         msg_factory=self.msg_factory,
+                                         check_factory=self.chk_factory,
+                                         expect_exception=expect_exception,
+                                         **args)
+            try:
+                conv.ignore_check = self.json_config["ignore_check"]
+            except KeyError:
+                pass
+
+            if self.args.restart:
+                conv.restore_state(self.args.restart)
+
+            conv.do_sequence(_spec)
+            #testres, trace = do_sequence(oper,
+        except (FatalError, UnSupported), err:
+            self.fatal = True
+
+        self.test_log = conv.test_output
+        return self.test_summation(self.args.flow)
+
     def operations(self):
         lista = []
         for key, val in self.operations_mod.FLOWS.items():
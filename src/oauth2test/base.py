@@ -1,6 +1,7 @@
 from oic.oauth2 import Message
 import sys
 from rrtest import tool, FatalError
+from rrtest.responses import ResponseStore
 
 __author__ = 'rolandh'
 
@@ -14,7 +15,7 @@ class Conversation(tool.Conversation):
                                    features, verbose, expect_exception,
                                    extra_args)
         self.cis = []
-        self.protocol_response = []
+        self.protocol_response = ResponseStore()
         #self.item = []
         #self.keyjar = self.client.keyjar
         self.position = ""
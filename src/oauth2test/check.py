@@ -3,12 +3,10 @@ from rrtest.check import CONT_JSON, CheckErrorResponse
 from rrtest.check import CRITICAL
 from rrtest.check import OK
 from rrtest.check import Error
+from rrtest.check import REGISTRY
 
 __author__ = 'rohe0002'
 
-import inspect
-import sys
-
 
 class CheckAuthorizationResponse(Error):
     """
@@ -116,23 +114,12 @@ class CheckErrorResponseForInvalidType(CheckErrorResponse):
 
         return res
 
-CLASS_CACHE = {}
 
+REGISTRY.extend(__name__, check.__name__)
 
-def factory(cid, classes=CLASS_CACHE):
-    if len(classes) == 0:
-        check.factory(cid, classes)
-        for name, obj in inspect.getmembers(sys.modules[__name__]):
-            if inspect.isclass(obj):
-                try:
-                    classes[obj.cid] = obj
-                except AttributeError:
-                    pass
 
-    if cid in classes:
-        return classes[cid]
-    else:
-        return None
+def factory(cid):
+    return REGISTRY.get(cid, __name__)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 #!/usr/bin/env python
+import copy
 import os
+import threading
 import time
 from urlparse import urlparse
 from oauth2test import OAuth2
@@ -77,6 +79,41 @@ def start_key_server(url, wdir="", script_path=""):
 
 URL_TYPES = ["jwks_uri"]
 
+# Keys read from file, shared by all the flows run in this process
+_KEY_CACHE = {}
+_JWKS_DUMPED = set()
+_KEY_LOCK = threading.Lock()
+
+
+def load_key_bundles(keys):
+    """
+    Reads the client keys, each key file is only read once per process.
+
+    :param keys: dictionary with key type as key and a dictionary with the
+        path to the key file, under "key", as value
+    :return: list of KeyBundles, one per key type
+    """
+    _spec = tuple(sorted([(typ, info["key"]) for typ, info in keys.items()]))
+    with _KEY_LOCK:
+        try:
+            kbl = _KEY_CACHE[_spec]
+        except KeyError:
+            kbl = []
+            kid = 0
+            for typ, path in _spec:
+                kb = KeyBundle(source="file://%s" % path, fileformat="der",
+                               keytype=typ)
+                for k in kb.keys():
+                    k.serialize()
+                    k.kid = "a%d" % kid
+                    kid += 1
+                kbl.append(kb)
+            _KEY_CACHE[_spec] = kbl
+
+    # Every client gets its own bundles, the keys are shared
+    return [copy.copy(kb) for kb in kbl]
+
+
 
 class OIC(OAuth2):
     client_args = ["client_id", "redirect_uris", "password", "client_secret"]
@@ -267,16 +304,8 @@ class OIC(OAuth2):
             self.client.keyjar = KeyJar()
 
         kbl = []
-        kid_template = "a%d"
-        kid = 0
-        for typ, info in self.cconf["keys"].items():
-            kb = KeyBundle(source="file://%s" % info["key"], fileformat="der",
-                           keytype=typ)
-
+        for kb in load_key_bundles(self.cconf["keys"]):
             for k in kb.keys():
-                k.serialize()
-                k.kid = kid_template % kid
-                kid += 1
                 self.client.kid[k.use][k.kty] = k.kid
             self.client.keyjar.add_kb("", kb)
 
@@ -284,7 +313,10 @@ class OIC(OAuth2):
 
         try:
             new_name = "static/jwks.json"
-            dump_jwks(kbl, new_name)
+            with _KEY_LOCK:
+                if new_name not in _JWKS_DUMPED:
+                    dump_jwks(kbl, new_name)
+                    _JWKS_DUMPED.add(new_name)
             self.client.jwks_uri = "%s%s" % (self.cconf["_base_url"], new_name)
         except KeyError:
             pass
@@ -0,0 +1,210 @@
+import logging
+import os
+import tarfile
+import threading
+import time
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+LOG_ROOT = "log"
+TAR_ROOT = "tar"
+
+
+def log_files(logdir, test_profile):
+    """
+    The files in a log directory and how they should appear in the archive
+
+    :return: dictionary with archive name as key and
+        (path, mtime, size) as value
+    """
+    res = {}
+    for item in os.listdir(logdir):
+        if item.startswith("."):
+            continue
+
+        fn = os.path.join(logdir, item)
+        try:
+            _stat = os.stat(fn)
+        except OSError:
+            continue
+        if os.path.isfile(fn):
+            res["%s/%s.txt" % (test_profile, item)] = (
+                fn, int(_stat.st_mtime), _stat.st_size)
+    return res
+
+
+def archived(tarname):
+    """
+    What's in an archive
+
+    :return: dictionary with member name as key and (mtime, size) as value
+        or None if there is no archive
+    """
+    try:
+        tar = tarfile.open(tarname, "r")
+    except (IOError, tarfile.TarError):
+        return None
+
+    try:
+        return dict([(m.name, (m.mtime, m.size)) for m in tar.getmembers()])
+    finally:
+        tar.close()
+
+
+def update_archive(logdir, tarname, test_profile, manifest=None):
+    """
+    Bring a tar archive up to date with the content of a log directory.
+    If files have only been added they are appended to the archive, if
+    anything has been changed or removed a new archive is written and moved
+    into place.
+
+    :param logdir: The directory with the log files
+    :param tarname: The path of the tar file
+    :param test_profile: Used as directory name within the archive
+    :param manifest: What is in the archive, if known
+    :return: What is in the archive after the update
+    """
+    files = log_files(logdir, test_profile)
+    current = dict([(k, v[1:]) for k, v in files.items()])
+
+    if manifest is None:
+        manifest = archived(tarname)
+
+    if manifest == current:
+        return manifest
+
+    if manifest is not None and \
+            all([current.get(k) == v for k, v in manifest.items()]):
+        names = [k for k in current if k not in manifest]
+        tar = tarfile.open(tarname, "a", dereference=True)
+        tmpname = ""
+    else:
+        names = current.keys()
+        tmpname = "%s.%d.tmp" % (tarname, threading.current_thread().ident)
+        tar = tarfile.open(tmpname, "w", dereference=True)
+
+    names.sort()
+    try:
+        for name in names:
+            tar.add(files[name][0], arcname=name)
+    finally:
+        tar.close()
+
+    if tmpname:
+        os.rename(tmpname, tarname)
+
+    return current
+
+
+def tar_path(issuer, test_profile, tar_root=TAR_ROOT):
+    return os.path.join(tar_root, issuer, "{}.tar".format(test_profile))
+
+
+def create_tar_archive(issuer, test_profile, log_root=LOG_ROOT,
+                       tar_root=TAR_ROOT):
+    _dir = os.path.join(tar_root, issuer)
+    if not os.path.isdir(_dir):
+        os.makedirs(_dir)
+
+    return update_archive(os.path.join(log_root, issuer, test_profile),
+                          tar_path(issuer, test_profile, tar_root),
+                          test_profile)
+
+
+class TarArchiver(object):
+    """
+    Keeps the per issuer and profile tar archives up to date without doing
+    it on every log write. Changes are marked and an archive is built when
+    it's asked for or when there has been no changes to it for a while.
+    """
+
+    def __init__(self, log_root=LOG_ROOT, tar_root=TAR_ROOT, quiet=30.0):
+        self.log_root = log_root
+        self.tar_root = tar_root
+        self.quiet = quiet
+        self.dirty = {}
+        self.manifest = {}
+        self.key_lock = {}
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run,
+                                           name="tar-archiver")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def mark(self, issuer, test_profile):
+        with self.cond:
+            self.dirty[(issuer, test_profile)] = time.time()
+            self.cond.notify()
+
+    def _lock(self, key):
+        with self.cond:
+            try:
+                return self.key_lock[key]
+            except KeyError:
+                self.key_lock[key] = _lock = threading.Lock()
+                return _lock
+
+    def build(self, issuer, test_profile):
+        """
+        Make sure the archive is up to date.
+
+        :return: The path of the archive
+        """
+        key = (issuer, test_profile)
+        _tar = tar_path(issuer, test_profile, self.tar_root)
+        with self._lock(key):
+            with self.cond:
+                stamp = self.dirty.pop(key, None)
+            if stamp is None and key in self.manifest:
+                return _tar
+
+            _logdir = os.path.join(self.log_root, issuer, test_profile)
+            if not os.path.isdir(_logdir):
+                return _tar
+
+            try:
+                _dir = os.path.dirname(_tar)
+                if not os.path.isdir(_dir):
+                    os.makedirs(_dir)
+                self.manifest[key] = update_archive(
+                    _logdir, _tar, test_profile, self.manifest.get(key))
+            except Exception:
+                self.manifest.pop(key, None)
+                if stamp is not None:
+                    self.mark(issuer, test_profile)
+                raise
+        return _tar
+
+    def flush(self):
+        with self.cond:
+            keys = self.dirty.keys()
+        for issuer, test_profile in keys:
+            self.build(issuer, test_profile)
+
+    def _due(self):
+        with self.cond:
+            while True:
+                if not self.dirty:
+                    self.cond.wait()
+                    continue
+                now = time.time()
+                due = [k for k, v in self.dirty.items()
+                       if now - v >= self.quiet]
+                if due:
+                    return due
+                self.cond.wait(self.quiet - (now - min(self.dirty.values())))
+
+    def _run(self):
+        while True:
+            for issuer, test_profile in self._due():
+                try:
+                    self.build(issuer, test_profile)
+                except Exception as err:
+                    logger.error("Failed to archive %s/%s: %s" % (
+                        issuer, test_profile, err))
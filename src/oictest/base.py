@@ -46,6 +46,7 @@ class Conversation(tool.Conversation):
         self.AuthorizationRequest = None
         self.etag = {}
         self.timestamp = []
+        self.log_writer = None
 
     def my_endpoints(self):
         return self.client.redirect_uris
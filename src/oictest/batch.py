@@ -0,0 +1,365 @@
+"""
+Runs OP test flows without a human and a web browser in the loop.
+
+The test tool's WSGI application is called in-process while a Browser
+instance plays the part of the user agent, following redirects to and from
+the OP and handling login and consent pages using the same interaction
+specifications as the command line tools. Independent flows are run
+concurrently by a pool of workers, each with its own session.
+"""
+import logging
+import threading
+import traceback
+import Queue
+from cStringIO import StringIO
+from urllib import urlencode
+from urlparse import urljoin
+
+from bs4 import BeautifulSoup
+from oic.oauth2.base import PBase
+
+from oictest.oidcrp import test_summation
+from oictest.testclass import Notice
+from oictest.testclass import RmCookie
+from rrtest.check import CRITICAL
+from rrtest.check import INTERACTION
+from rrtest.interaction import Action
+from rrtest.interaction import Interaction
+from rrtest.interaction import InteractionNeeded
+from rrtest.transport import KeepAlive
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+REDIRECT = [301, 302, 303, 307]
+
+
+class RunError(Exception):
+    pass
+
+
+class UserAgent(KeepAlive, PBase):
+    pass
+
+
+class Reply(object):
+    """ What the in-process application returned """
+
+    def __init__(self, status, headers, body):
+        self.status_code = int(status.split(" ")[0])
+        self.headers = dict([(k.lower(), v) for k, v in headers])
+        self.text = body
+
+
+def local_form(content, base):
+    """
+    A form on a page that posts to the test tool, like the one an OP
+    returns when response_mode=form_post is used.
+
+    :return: (action, dictionary with the form content) or None
+    """
+    if not content:
+        return None
+
+    for form in BeautifulSoup(content).find_all("form"):
+        action = form.get("action", "")
+        if action.startswith(base):
+            return action, dict([(i["name"], i.get("value", "")) for i in
+                                 form.find_all("input") if i.get("name")])
+    return None
+
+
+class Browser(object):
+    """
+    A user agent for one worker.
+
+    :param app: The WSGI application, requests to base goes here
+    :param base: The base URL of the test tool
+    :param session: The session the application uses for this user agent
+    :param interactions: How to handle pages on the OP side, see
+        rrtest.interaction
+    :param max_steps: How many requests one flow may need at most
+    """
+
+    def __init__(self, app, base, session=None, interactions=None,
+                 verify_ssl=False, max_steps=50):
+        self.app = app
+        self.base = base
+        self.session = {} if session is None else session
+        self.httpc = UserAgent(verify_ssl=verify_ssl)
+        self.interaction = Interaction(self.httpc, interactions or [])
+        self.max_steps = max_steps
+
+    def local(self, url, method="GET", body=""):
+        path, _, query = url[len(self.base):].partition("?")
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": "/" + path,
+            "QUERY_STRING": query,
+            "REMOTE_ADDR": "127.0.0.1",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": StringIO(body),
+            "beaker.session": self.session
+        }
+        if body:
+            environ["CONTENT_TYPE"] = "application/x-www-form-urlencoded"
+
+        _resp = {}
+
+        def start_response(status, headers, exc_info=None):
+            _resp["status"] = status
+            _resp["headers"] = headers
+
+        _body = "".join(self.app(environ, start_response))
+        return Reply(_resp["status"], _resp["headers"], _body)
+
+    def callback(self, url):
+        """
+        The OP redirected back to the test tool. What's in the fragment
+        part is posted by the page the test tool returns.
+        """
+        url, _, fragment = url.partition("#")
+        reply = self.local(url)
+        if fragment and reply.status_code == 200:
+            reply = self.local(self.base + "authz_post", "POST",
+                               urlencode({"fragment": fragment}))
+        return reply
+
+    def visit(self, url):
+        """
+        Browse the OP until it sends the user agent back to the test tool.
+        """
+        response = self.httpc.send(url, "GET")
+        for _ in range(self.max_steps):
+            if response.status_code in REDIRECT:
+                url = urljoin(url, response.headers["location"])
+                if url.startswith(self.base):
+                    return self.callback(url)
+                response = self.httpc.send(url, "GET")
+                continue
+            elif response.status_code >= 400:
+                raise RunError("%s returned %s" % (url,
+                                                   response.status_code))
+
+            _form = local_form(response.text, self.base)
+            if _form:
+                return self.local(_form[0], "POST", urlencode(_form[1]))
+
+            _spec = self.interaction.pick_interaction(url.split("?")[0],
+                                                      response.text)
+            conv = self.session["conv"]
+            result = Action(_spec["control"])(self.httpc, conv, None, url,
+                                              response, response.text, None)
+            if isinstance(result, dict):  # a form meant for the test tool
+                return self.local(conv.my_endpoints()[0], "POST",
+                                  urlencode(result))
+            response = result
+            url = response.url
+
+        raise RunError("Too many steps at the OP")
+
+    def notice(self):
+        """
+        The step the test tool is at, if it's a page meant for the user.
+        """
+        try:
+            _info = self.session["seq_info"]
+            step = _info["sequence"][self.session["index"]][0]
+        except (KeyError, IndexError, TypeError):
+            return None
+
+        if isinstance(step, type) and issubclass(step, Notice):
+            return step
+        return None
+
+    def run(self, flow_id):
+        """
+        Run one test flow from start to end.
+        """
+        reply = self.local(self.base + flow_id)
+        for _ in range(self.max_steps):
+            if reply.status_code in REDIRECT:
+                url = reply.headers["location"]
+                if url.startswith(self.base + "opresult"):
+                    return
+                elif url.startswith(self.base):
+                    reply = self.local(url)
+                else:
+                    reply = self.visit(url)
+            else:
+                _notice = self.notice()
+                if _notice is None:  # the test tool is done with the flow
+                    return
+                if issubclass(_notice, RmCookie):
+                    self.httpc.cookiejar.clear()
+                reply = self.local(self.base + "continue")
+
+        raise RunError("Too many steps")
+
+    def result(self, flow_id):
+        """
+        :return: The test_summation() of the flows test output
+        """
+        try:
+            _output = self.session["test_info"][flow_id]["test_output"]
+        except KeyError:
+            _output = self.session["conv"].test_output
+        return test_summation(_output, flow_id)
+
+    def test(self, flow_id):
+        try:
+            self.run(flow_id)
+        except InteractionNeeded as err:
+            self.failed(flow_id, INTERACTION, "interaction needed: %s" % err)
+        except Exception as err:
+            logger.error(traceback.format_exc())
+            self.failed(flow_id, CRITICAL, "%s: %s" % (
+                err.__class__.__name__, err))
+        return self.result(flow_id)
+
+    def failed(self, flow_id, status, message):
+        _item = {"id": "-", "status": status, "message": message}
+        try:
+            _output = self.session["test_info"][flow_id]["test_output"]
+        except KeyError:
+            try:
+                _output = self.session["conv"].test_output
+            except KeyError:
+                self.session.setdefault("test_info", {})[flow_id] = {
+                    "test_output": [_item]}
+                return
+        _output.append(_item)
+
+
+def run_graph(items, depends, func, workers=4, proceed=None):
+    """
+    Run func on each item in a pool of threads, an item is not started
+    before the items it depends on are done.
+
+    :param items: The items, in the order they should be started if there
+        is a choice
+    :param depends: Function that given an item returns the items it
+        depends on
+    :param func: Function that is called as func(worker_index, item)
+    :param workers: Number of threads
+    :param proceed: If given, a function that is called with what func
+        returned for an item. If it returns False the items that depend on
+        that item, directly or indirectly, are skipped. They are also
+        skipped if func or proceed raises an exception.
+    :return: dictionary with the item as key and what func returned as value,
+        the exception if it raised one and None for skipped items
+    """
+    position = dict([(item, i) for i, item in enumerate(items)])
+    waiting = {}
+    children = dict([(item, []) for item in items])
+    for item in items:
+        _deps = [d for d in depends(item) if d in position]
+        waiting[item] = len(_deps)
+        for dep in _deps:
+            children[dep].append(item)
+
+    ready = Queue.PriorityQueue()
+    for item in items:
+        if not waiting[item]:
+            ready.put((position[item], item))
+
+    result = {}
+    lock = threading.Lock()
+
+    def worker(index):
+        while True:
+            _, item = ready.get()
+            if item is None:
+                return
+            try:
+                res = func(index, item)
+            except Exception as err:
+                logger.error(traceback.format_exc())
+                res = err
+
+            if isinstance(res, Exception):
+                ok = False
+            elif proceed is None:
+                ok = True
+            else:
+                try:
+                    ok = proceed(res)
+                except Exception:
+                    logger.error(traceback.format_exc())
+                    ok = False
+
+            with lock:
+                result[item] = res
+                if not ok:
+                    _skip = list(children[item])
+                    while _skip:
+                        _item = _skip.pop()
+                        if _item not in result:
+                            result[_item] = None
+                            _skip.extend(children[_item])
+                for child in children[item]:
+                    waiting[child] -= 1
+                    if not waiting[child] and child not in result:
+                        ready.put((position[child], child))
+                if len(result) == len(items):
+                    for _ in range(workers):
+                        ready.put((len(items), None))
+
+    if not items:
+        return result
+
+    threads = [threading.Thread(target=worker, args=(i,),
+                                name="flow-worker-%d" % i)
+               for i in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if len(result) != len(items):
+        raise RunError("Circular dependencies among: %s" % sorted(
+            [i for i in items if i not in result]))
+    return result
+
+
+class BatchRunner(object):
+    """
+    Runs all the test flows of a profile.
+
+    :param app: The WSGI application
+    :param oprp: The OPRP instance the application uses
+    :param profile: Profile code
+    :param workers: How many flows to run at the same time
+    :param interactions: Interaction specifications for the OP's pages
+    """
+
+    def __init__(self, app, oprp, profile, workers=4, interactions=None,
+                 verify_ssl=False):
+        self.app = app
+        self.oprp = oprp
+        self.profile = profile
+        self.workers = workers
+        self.browsers = [Browser(app, oprp.conf.BASE,
+                                 interactions=interactions,
+                                 verify_ssl=verify_ssl)
+                         for _ in range(workers)]
+
+    def flows(self, prefix=""):
+        return [f for f in self.oprp.profile_flows(self.profile) if
+                f.startswith(prefix)]
+
+    def run(self, flows=None):
+        """
+        :param flows: Which flows to run, by default all in the profile
+        :return: list of test_summation() results in flow order
+        """
+        if flows is None:
+            flows = self.flows()
+
+        self.oprp.test_profile = self.profile
+        res = run_graph(flows, self.oprp.registry.depends,
+                        lambda i, fid: self.browsers[i].test(fid),
+                        self.workers)
+        return [res[fid] for fid in flows]
@@ -0,0 +1,159 @@
+"""
+The cache shared by all sessions of an OPRP instance.
+
+Conversations are parked here while the tester removes cookies and so on,
+and ID Tokens are kept for later tests to look at. Entries expire after a
+while and the number of entries kept in memory is bounded. Entries pushed
+out of memory can be written to a SQLite database, where they are kept
+until they expire.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from oictest.session import Serializer
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache(object):
+    """
+    Dictionary like, but an entry is dropped when it hasn't been set for
+    ttl seconds or when more than max_entries entries are kept.
+
+    :param max_entries: Max number of entries kept in memory
+    :param ttl: Seconds an entry is kept
+    :param spill: A SQLite database to move entries to instead of dropping
+        them when there are too many
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, spill=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.counters = {"hit": 0, "miss": 0, "eviction": 0, "expired": 0,
+                         "spilled": 0}
+        self.lock = threading.RLock()
+        self.writes = 0
+        if spill:
+            self.serializer = Serializer({"cache": self})
+            self.db = sqlite3.connect(spill, check_same_thread=False,
+                                      isolation_level=None)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, "
+                "expires REAL, data BLOB)")
+        else:
+            self.serializer = None
+            self.db = None
+
+    def _spill(self, key, expires, value):
+        try:
+            blob = self.serializer.dumps(value)
+        except Exception as err:
+            logger.warning("Could not spill cache entry %s: %s" % (key, err))
+            return
+        self.db.execute(
+            "INSERT OR REPLACE INTO cache (key, expires, data) VALUES (?,?,?)",
+            (key, expires, sqlite3.Binary(blob)))
+        self.counters["spilled"] += 1
+
+    def _unspill(self, key, now):
+        row = self.db.execute("SELECT expires, data FROM cache WHERE key=?",
+                              (key,)).fetchone()
+        if row is None:
+            return None
+        self.db.execute("DELETE FROM cache WHERE key=?", (key,))
+        expires, blob = row
+        if expires <= now:
+            self.counters["expired"] += 1
+            return None
+        try:
+            value = self.serializer.loads(blob)
+        except Exception as err:
+            logger.warning("Could not restore cache entry %s: %s" % (key, err))
+            return None
+        return expires, value
+
+    def _evict(self, now):
+        for key, (expires, _) in self.entries.items():
+            if expires <= now:
+                del self.entries[key]
+                self.counters["expired"] += 1
+
+        while len(self.entries) > self.max_entries:
+            key, (expires, value) = self.entries.popitem(last=False)
+            self.counters["eviction"] += 1
+            if self.db is not None:
+                self._spill(key, expires, value)
+
+    def __getitem__(self, key):
+        now = time.time()
+        with self.lock:
+            try:
+                expires, value = self.entries.pop(key)
+            except KeyError:
+                item = None
+                if self.db is not None:
+                    item = self._unspill(key, now)
+                if item is None:
+                    self.counters["miss"] += 1
+                    raise KeyError(key)
+                expires, value = item
+            else:
+                if expires <= now:
+                    self.counters["expired"] += 1
+                    self.counters["miss"] += 1
+                    raise KeyError(key)
+
+            self.counters["hit"] += 1
+            self.entries[key] = (expires, value)
+            if len(self.entries) > self.max_entries:
+                self._evict(now)
+            return value
+
+    def __setitem__(self, key, value):
+        now = time.time()
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (now + self.ttl, value)
+            self.writes += 1
+            if len(self.entries) > self.max_entries or self.writes % 100 == 0:
+                self._evict(now)
+                if self.db is not None:
+                    self.db.execute("DELETE FROM cache WHERE expires <= ?",
+                                    (now,))
+
+    def __delitem__(self, key):
+        with self.lock:
+            try:
+                del self.entries[key]
+            except KeyError:
+                if self.db is None or self.db.execute(
+                        "DELETE FROM cache WHERE key=?", (key,)).rowcount == 0:
+                    raise
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM cache")
@@ -33,11 +33,10 @@ from rrtest.check import CRITICAL
 from rrtest.check import ERROR
 from rrtest.check import INTERACTION
 from rrtest.check import INFORMATION
+from rrtest.check import REGISTRY
 
 __author__ = 'rohe0002'
 
-import inspect
-import sys
 import urlparse
 
 from oic.oic.message import SCOPE2CLAIMS
@@ -57,24 +56,39 @@ def get_provider_info(conv):
 
 
 def get_protocol_response(conv, cls):
-    res = []
-    for instance, msg in conv.protocol_response:
-        if isinstance(instance, cls):
-            res.append((instance, msg))
-    return res
+    try:
+        return conv.protocol_response.all(cls)
+    except AttributeError:  # a plain list
+        return [(inst, msg) for inst, msg in conv.protocol_response if
+                isinstance(inst, cls)]
 
 
-def get_id_tokens(conv):
+def last_protocol_response(conv, cls):
+    """
+    :return: The last (instance, raw message) tuple that is an instance of
+        cls
+    :raise: IndexError if there is none
+    """
+    try:
+        _latest = conv.protocol_response.latest(cls)
+    except AttributeError:  # a plain list
+        return get_protocol_response(conv, cls)[-1]
+    if _latest is None:
+        raise IndexError("No %s response" % cls.__name__)
+    return _latest
+
+
+def _id_tokens(store):
     res = []
     # In access token responses
-    for inst, msg in get_protocol_response(conv, message.AccessTokenResponse):
+    for inst, msg in store.all(message.AccessTokenResponse):
         _dict = json.loads(msg)
         jwt = _dict["id_token"]
         idt = inst["id_token"]
         res.append((idt, jwt))
 
     # implicit, id_token in authorization response
-    for inst, msg in get_protocol_response(conv, message.AuthorizationResponse):
+    for inst, msg in store.all(message.AuthorizationResponse):
         try:
             idt = inst["id_token"]
         except KeyError:
@@ -87,6 +101,16 @@ def get_id_tokens(conv):
     return res
 
 
+def get_id_tokens(conv):
+    """
+    The ID Tokens received so far and their compact JWT representation.
+    The raw messages are only parsed again when new responses has arrived.
+
+    :return: list of (IdToken instance, JWT) tuples
+    """
+    return list(conv.protocol_response.memo("id_tokens", _id_tokens))
+
+
 def jwt_header(msg):
     return json.loads(b64d(str(msg.split(".")[0])))
 
@@ -1725,8 +1749,8 @@ class VerifyIDTokenUserInfoSubSame(Information):
         idt_sub = [i["sub"] for i, j in res]
 
         # The UserInfo sub
-        for instance, msg in get_protocol_response(conv, message.OpenIDSchema):
-            ui_sub = instance["sub"]
+        instance, msg = last_protocol_response(conv, message.OpenIDSchema)
+        ui_sub = instance["sub"]
 
         try:
             assert ui_sub == idt_sub
@@ -1747,8 +1771,7 @@ class VerifyState(Information):
         # The send state
         _send_state = conv.AuthorizationRequest["state"]
         # the received state
-        inst, txt = get_protocol_response(conv,
-                                          message.AuthorizationResponse)[-1]
+        inst, txt = last_protocol_response(conv, message.AuthorizationResponse)
         _recv_state = inst["state"]
 
         try:
@@ -2246,10 +2269,10 @@ class VerifyScopes(Warnings):
 
         if areq["response_type"] == ["id_token"]:
             # Then everything should be in the ID Token
-            (aresp, _) = get_protocol_response(conv, AuthorizationResponse)[-1]
+            (aresp, _) = last_protocol_response(conv, AuthorizationResponse)
             container = aresp["id_token"]
         else:  # In Userinfo
-            (container, _) = get_protocol_response(conv, OpenIDSchema)[-1]
+            (container, _) = last_protocol_response(conv, OpenIDSchema)
 
         missing = []
         for claim in claims:
@@ -2318,23 +2341,14 @@ class AuthTimeCheck(Warnings):
         return {}
 
 
-CLASS_CACHE = {}
-
+REGISTRY.extend(__name__, check.__name__)
 
-def factory(cid, classes=CLASS_CACHE):
-    if len(classes) == 0:
-        check.factory(cid, classes)
-        for name, obj in inspect.getmembers(sys.modules[__name__]):
-            if inspect.isclass(obj):
-                try:
-                    classes[obj.cid] = obj
-                except AttributeError:
-                    pass
 
-    if cid in classes:
-        return classes[cid]
-    else:
+def factory(cid):
+    _cls = REGISTRY.get(cid, __name__)
+    if _cls is None:
         raise Unknown("Couldn't find the check: '%s'" % cid)
+    return _cls
 
 
 if __name__ == "__main__":
@@ -0,0 +1,233 @@
+"""
+Client database for the OP used when testing RPs.
+
+A drop in replacement for the shelve used as cdb by the Provider. The
+entries are kept in SQLite, in WAL mode so readers don't wait for writers,
+with a bounded in memory cache in front. Clients registered by the RPs
+under test expire after a while, clients created by the tester don't.
+
+The cdb holds two kinds of entries, client information dictionaries keyed
+by client_id and registration access tokens pointing to a client_id. Both
+are indexed by client_id and client information also by redirect_uri.
+
+As with a shelve opened without writeback, a value that is changed must be
+set again to be saved.
+"""
+import cPickle
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from oic.oauth2 import rndstr
+from oic.oic.provider import secret
+from oic.utils.client_management import pack_redirect_uri
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 100
+
+
+class ClientDB(object):
+    """
+    :param path: The SQLite database
+    :param ttl: Seconds a registered client is kept, 0 means forever
+    :param cache_size: Max number of entries kept in memory
+    """
+
+    def __init__(self, path=":memory:", ttl=86400, cache_size=1024):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.seed = rndstr(32).encode("utf-8")
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.db = sqlite3.connect(path, check_same_thread=False,
+                                  isolation_level=None)
+        if path != ":memory:":
+            self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS client (key TEXT PRIMARY KEY, "
+            "client_id TEXT, expires REAL, data BLOB)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS client_id_idx ON "
+                        "client (client_id)")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS redirect_uri (uri TEXT, key TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS redirect_uri_idx ON "
+                        "redirect_uri (uri)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS redirect_uri_key_idx ON "
+                        "redirect_uri (key)")
+
+    def _remember(self, key, expires, value):
+        self.cache.pop(key, None)
+        self.cache[key] = (expires, value)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _get(self, key):
+        now = time.time()
+        try:
+            expires, value = self.cache[key]
+        except KeyError:
+            row = self.db.execute(
+                "SELECT expires, data FROM client WHERE key=?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            expires, value = row[0], cPickle.loads(str(row[1]))
+            self._remember(key, expires, value)
+
+        if expires and expires <= now:
+            return None
+        return value
+
+    def __getitem__(self, key):
+        with self.lock:
+            value = self._get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        with self.lock:
+            return self._get(key) is not None
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self._get(key)
+        if value is None:
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        """
+        :param ttl: Overrides the ttl given when the database was created
+        """
+        if ttl is None:
+            ttl = self.ttl
+        now = time.time()
+        expires = now + ttl if ttl else 0
+
+        if isinstance(value, dict):
+            client_id = value.get("client_id", key)
+            uris = [u[0] for u in value.get("redirect_uris") or []]
+        else:  # registration access token
+            client_id = value
+            uris = []
+
+        blob = sqlite3.Binary(cPickle.dumps(value, 2))
+        with self.lock:
+            self.db.execute("BEGIN")
+            self.db.execute(
+                "INSERT OR REPLACE INTO client (key, client_id, expires, data)"
+                " VALUES (?, ?, ?, ?)", (key, client_id, expires, blob))
+            self.db.execute("DELETE FROM redirect_uri WHERE key=?", (key,))
+            self.db.executemany(
+                "INSERT INTO redirect_uri (uri, key) VALUES (?, ?)",
+                [(uri, key) for uri in uris])
+            self.db.execute("COMMIT")
+            self._remember(key, expires, value)
+
+            self.writes += 1
+            if self.writes % PURGE_INTERVAL == 0:
+                self._purge(now)
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def _delete(self, where, args):
+        keys = [r[0] for r in self.db.execute(
+            "SELECT key FROM client WHERE %s" % where, args)]
+        if not keys:
+            return 0
+        self.db.execute("BEGIN")
+        for key in keys:
+            self.db.execute("DELETE FROM client WHERE key=?", (key,))
+            self.db.execute("DELETE FROM redirect_uri WHERE key=?", (key,))
+            self.cache.pop(key, None)
+        self.db.execute("COMMIT")
+        return len(keys)
+
+    def __delitem__(self, key):
+        with self.lock:
+            if not self._delete("key=?", (key,)):
+                raise KeyError(key)
+
+    def _purge(self, now):
+        return self._delete("expires > 0 AND expires <= ?", (now,))
+
+    def purge(self):
+        """
+        Remove all expired entries.
+
+        :return: The number of entries removed
+        """
+        with self.lock:
+            return self._purge(time.time())
+
+    def remove_client(self, client_id):
+        """
+        Remove a client and its registration access tokens.
+        """
+        with self.lock:
+            return self._delete("client_id=?", (client_id,))
+
+    def by_redirect_uri(self, uri):
+        """
+        :return: The client_ids of the clients that have registered uri
+        """
+        now = time.time()
+        with self.lock:
+            return [r[0] for r in self.db.execute(
+                "SELECT client.client_id FROM redirect_uri, client WHERE "
+                "redirect_uri.uri=? AND redirect_uri.key=client.key AND "
+                "(client.expires = 0 OR client.expires > ?)", (uri, now))]
+
+    def keys(self):
+        now = time.time()
+        with self.lock:
+            return [r[0] for r in self.db.execute(
+                "SELECT key FROM client WHERE expires = 0 OR expires > ?",
+                (now,))]
+
+    def items(self):
+        res = []
+        for key in self.keys():
+            value = self.get(key)
+            if value is not None:
+                res.append((key, value))
+        return res
+
+    def __len__(self):
+        return len(self.keys())
+
+    def sync(self):
+        pass
+
+    def create(self, redirect_uris, policy_uri="", logo_uri="", jwks_uri=""):
+        """
+        A client that is registered by the tester and therefore never
+        expires. Same as oic.utils.client_management.CDB.create.
+        """
+        client_id = rndstr(12)
+        while client_id in self:
+            client_id = rndstr(12)
+
+        info = {
+            "client_secret": secret(self.seed, client_id),
+            "client_id": client_id,
+            "client_salt": rndstr(8),
+            "redirect_uris": pack_redirect_uri(redirect_uris),
+        }
+        if policy_uri:
+            info["policy_uri"] = policy_uri
+        if logo_uri:
+            info["logo_uri"] = logo_uri
+        if jwks_uri:
+            info['jwks_uri'] = jwks_uri
+
+        self.set(client_id, info, ttl=0)
+        return info
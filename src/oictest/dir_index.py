@@ -0,0 +1,250 @@
+"""
+Cached directory listings for the log browser.
+
+A listing is kept until the directory changes, which is noticed either by
+its modification time or because the code writing a log told us. Listing
+pages are served with an ETag made from what is on the page, so it only
+changes when the page does, and rendered pages are kept by ETag.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from urllib import urlencode
+from urlparse import parse_qs
+
+from oic.utils.http_util import Response
+
+__author__ = 'roland'
+
+PAGE_SIZE = 100
+RENDERED = 128
+
+
+class Listing(object):
+    def __init__(self, mtime, dirs, files):
+        self.mtime = mtime
+        self.dirs = dirs
+        self.files = files
+        self.names = set(dirs + files)
+
+
+class DirIndex(object):
+    def __init__(self):
+        self.listings = {}
+        self.lock = threading.Lock()
+
+    def listing(self, path):
+        """
+        :param path: A directory
+        :return: Listing instance with the sorted names of the
+            subdirectories and the files, names starting with '.' left out.
+            None if path is not a directory.
+        """
+        path = os.path.normpath(path)
+        try:
+            _mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+
+        with self.lock:
+            try:
+                _listing = self.listings[path]
+            except KeyError:
+                pass
+            else:
+                if _listing.mtime == _mtime:
+                    return _listing
+
+        dirs = []
+        files = []
+        try:
+            _names = os.listdir(path)
+        except OSError:
+            return None
+        for name in _names:
+            if name.startswith("."):
+                continue
+            if os.path.isdir(os.path.join(path, name)):
+                dirs.append(name)
+            else:
+                files.append(name)
+
+        _listing = Listing(_mtime, sorted(dirs), sorted(files))
+        with self.lock:
+            self.listings[path] = _listing
+        return _listing
+
+    def invalidate(self, path):
+        """
+        Something was written to path, drop the listings of the directories
+        on the way there.
+        """
+        path = os.path.normpath(path)
+        with self.lock:
+            while path and path != os.sep:
+                try:
+                    del self.listings[path]
+                except KeyError:
+                    pass
+                path = os.path.dirname(path)
+
+    def isdir(self, path):
+        head, tail = os.path.split(os.path.normpath(path))
+        _listing = self.listing(head or ".")
+        if _listing is None:
+            return False
+        return tail in _listing.dirs
+
+    def with_or_without_slash(self, path):
+        """
+        Same as oprp.with_or_without_slash but using the cached listings.
+        """
+        if self.isdir(path):
+            return path
+
+        if path.endswith("%2F"):
+            path = path[:-3]
+        else:
+            path += "%2F"
+        if self.isdir(path):
+            return path
+
+        return None
+
+
+DIR_INDEX = DirIndex()
+
+
+def page_args(environ):
+    """
+    The paging and filtering arguments in the query part of a request.
+
+    :return: dictionary with offset, limit, name and result
+    """
+    qs = parse_qs(environ.get("QUERY_STRING", ""))
+    res = {"offset": 0, "limit": PAGE_SIZE, "name": "", "result": ""}
+    for key in ["offset", "limit"]:
+        try:
+            res[key] = max(0, int(qs[key][0]))
+        except (KeyError, ValueError):
+            pass
+    if not res["limit"]:
+        res["limit"] = PAGE_SIZE
+    for key in ["name", "result"]:
+        try:
+            res[key] = qs[key][0]
+        except KeyError:
+            pass
+    return res
+
+
+def paginate(items, args):
+    """
+    :param items: list of (name, path) tuples
+    :param args: What page_args returns
+    :return: The items on the page and a dictionary with offset, limit,
+        total and the filters, to be used for links to other pages
+    """
+    if args["name"]:
+        _name = args["name"].lower()
+        items = [i for i in items if _name in i[0].lower()]
+
+    _off = args["offset"]
+    _lim = args["limit"]
+    page = {"offset": _off, "limit": _lim, "total": len(items),
+            "name": args["name"], "result": args["result"]}
+    return items[_off:_off + _lim], page
+
+
+def page_links(page):
+    """
+    Query strings for the previous and next page, None where there is none.
+    """
+    res = []
+    for _off in [page["offset"] - page["limit"],
+                 page["offset"] + page["limit"]]:
+        if _off < 0 and page["offset"] > 0:
+            _off = 0
+        if _off < 0 or _off >= page["total"]:
+            res.append(None)
+            continue
+        _args = [("offset", _off), ("limit", page["limit"])]
+        for key in ["name", "result"]:
+            if page[key]:
+                _args.append((key, page[key]))
+        res.append("?" + urlencode(_args))
+    return res
+
+
+def paging(page):
+    """
+    :param page: The page dictionary paginate returns
+    :return: HTML with the position in the listing and links to the
+        previous and next page, empty if everything fits on one page
+    """
+    if not page or page["total"] <= page["limit"]:
+        return ""
+    prev, next = page_links(page)
+    el = "<p>%d-%d of %d" % (page["offset"] + 1,
+                             min(page["offset"] + page["limit"], page["total"]),
+                             page["total"])
+    if prev:
+        el += ' <a href="%s">Previous</a>' % prev
+    if next:
+        el += ' <a href="%s">Next</a>' % next
+    el += "</p>"
+    return el
+
+
+class ListingPages(object):
+    """
+    Rendered listing pages keyed by ETag.
+    """
+
+    def __init__(self, size=RENDERED):
+        self.size = size
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def etag(*args):
+        """
+        :param args: Everything the page is rendered from
+        """
+        return '"%s"' % hashlib.sha1(repr(args)).hexdigest()
+
+    def respond(self, environ, start_response, etag, lookup, template,
+                **argv):
+        """
+        Return 304 if the client has the page, otherwise the page, rendered
+        if it isn't in the cache.
+        """
+        if etag in environ.get("HTTP_IF_NONE_MATCH", ""):
+            start_response("304 Not Modified", [("ETag", etag)])
+            return []
+
+        with self.lock:
+            try:
+                body = self.pages.pop(etag)
+            except KeyError:
+                body = None
+            else:
+                self.pages[etag] = body
+
+        if body is None:
+            resp = Response(mako_template=template, template_lookup=lookup,
+                            headers=[("ETag", etag)])
+            body = resp(environ, start_response, **argv)
+            with self.lock:
+                self.pages[etag] = body
+                while len(self.pages) > self.size:
+                    self.pages.popitem(last=False)
+            return body
+
+        start_response("200 OK", [("ETag", etag),
+                                  ("Content-type", "text/html")])
+        return body
+
+
+LISTING_PAGES = ListingPages()
@@ -1,3 +1,8 @@
+import heapq
+
+from oictest.prof_util import ProfileIndex
+
+
 class Node():
     def __init__(self, name, desc, rmc=False, experr=False, profiles=None):
         self.name = name
@@ -44,67 +49,154 @@ def in_tree(root, item):
     return None
 
 
-def _depends(flows, flow, result, remains):
-    spec = flows[flow]
-    _node = Node(flow, spec["name"],
-                 "rm_cookie" in spec["sequence"],
-                 "expect_err" in spec["sequence"])
-    try:
-        _node.profiles = spec["profile"]
-    except KeyError:
-        pass
-
-    if "depends" in spec:
-        for dep in spec["depends"]:
-            _parent = in_tree(result, dep)
-            if _parent:
+class FlowRegistry(object):
+    """
+    Index over a set of test flow definitions. Built once, after that
+    lookups by flow id, by group (any '-' separated prefix of a flow id)
+    and by profile are constant time.
+
+    :param flows: The flow definitions keyed by flow id
+    :param order: The flow ids in the order they should be presented,
+        by default all flow ids sorted
+    """
+
+    def __init__(self, flows, order=None):
+        self.flows = flows
+        if order is None:
+            order = sorted(flows.keys())
+        self.ids = list(order)
+        self.position = dict([(fid, i) for i, fid in enumerate(self.ids)])
+
+        self.groups = {}
+        for fid in self.ids:
+            part = fid.split("-")
+            for i in range(1, len(part)):
+                self.groups.setdefault("-".join(part[:i]), []).append(fid)
+
+        self.children = dict([(fid, []) for fid in flows])
+        for fid in sorted(flows.keys()):
+            for dep in self.depends(fid):
+                self.children[dep].append(fid)
+
+        self.order = self._topological()
+        self._profiles = None
+
+    def __contains__(self, fid):
+        return fid in self.position
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, fid):
+        return self.flows[fid]
+
+    def depends(self, fid):
+        return [d for d in self.flows[fid].get("depends", []) if d in
+                self.flows]
+
+    def group(self, grp):
+        """
+        The flows whose id starts with grp + '-'
+        """
+        return self.groups.get(grp.rstrip("-"), [])
+
+    def profile_flows(self, code):
+        """
+        The flows, in presentation order, that belongs to a profile.
+        """
+        if self._profiles is None:
+            self._profiles = ProfileIndex(self.ids, self.flows)
+        return self._profiles.flows(code)
+
+    def _topological(self):
+        indegree = dict([(fid, len(self.depends(fid))) for fid in self.flows])
+        ready = [fid for fid, n in indegree.items() if n == 0]
+        heapq.heapify(ready)
+        result = []
+        while ready:
+            fid = heapq.heappop(ready)
+            result.append(fid)
+            for child in self.children[fid]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    heapq.heappush(ready, child)
+
+        if len(result) != len(self.flows):
+            raise ValueError("Circular dependencies among: %s" % sorted(
+                [fid for fid, n in indegree.items() if n]))
+        return result
+
+    def graph(self, grp=""):
+        """
+        Build a dependency graph of Node instances. Flows that the selected
+        flows depends on are included even if they are not in the group.
+
+        :param grp: Only flows whose id starts with this
+        :return: Dictionary with the root nodes
+        """
+        if grp:
+            needed = set([fid for fid in self.flows if fid.startswith(grp)])
+        else:
+            needed = set(self.flows.keys())
+
+        stack = list(needed)
+        while stack:
+            for dep in self.depends(stack.pop()):
+                if dep not in needed:
+                    needed.add(dep)
+                    stack.append(dep)
+
+        nodes = {}
+        result = {}
+        for fid in self.order:
+            if fid not in needed:
+                continue
+
+            spec = self.flows[fid]
+            _node = Node(fid, spec["name"],
+                         "rm_cookie" in spec["sequence"],
+                         "expect_err" in spec["sequence"])
+            try:
+                _node.profiles = spec["profile"]
+            except KeyError:
                 pass
+
+            _parents = self.depends(fid)
+            if _parents:
+                for dep in _parents:
+                    nodes[dep].children[fid] = _node
+                    _node.parent.append(nodes[dep])
             else:
-                _parent = _depends(flows, dep, result, remains)
-            _parent.children[_node.name] = _node
-    else:
-        result[flow] = _node  # root test
+                result[fid] = _node  # root test
+            nodes[fid] = _node
 
-    remains.remove(flow)
-    return _node
+        return result
 
 
 def sort_flows_into_graph(flows, grp=""):
-    result = {}
-    if grp:
-        remains = [k for k in flows.keys() if k.startswith(grp)]
-    else:
-        remains = flows.keys()
-    while remains:
-        flow = remains[0]
-        _depends(flows, flow, result, remains)
-
-    return result
+    return FlowRegistry(flows).graph(grp)
 
 
 def sorted_flows(flows):
-    result = []
-    remains = flows.keys()
-    while remains:
-        for flow in remains:
-            spec = flows[flow]
-            if "depends" in spec:
-                flag = False
-                for dep in spec["depends"]:
-                    if dep in result:
-                        flag = True
-                    else:
-                        flag = False
-                        break
-
-                if flag:
-                    result.append(flow)
-                    remains.remove(flow)
-            else:
-                result.append(flow)
-                remains.remove(flow)
+    return FlowRegistry(flows).order
 
-    return result
+
+def node_index(root):
+    """
+    :param root: dictionary
+    :return: dictionary with all nodes in the graph keyed by name
+    """
+    index = {}
+    stack = root.values()
+    while stack:
+        node = stack.pop()
+        if node.name not in index:
+            index[node.name] = node
+            stack.extend(node.children.values())
+    return index
 
 
 def print_graph(root, inx=""):
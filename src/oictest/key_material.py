@@ -0,0 +1,149 @@
+"""
+Key material for the OP used when testing RPs.
+
+The OP's own keys are loaded, or generated, once per process and shared by
+all the Provider instances. The JWKS describing them is serialised once and
+the objects used to sign with a key are made once per (alg, kid). Signing
+and verifying is counted and timed.
+"""
+import json
+import logging
+import threading
+import time
+
+from Crypto.Signature import PKCS1_PSS
+from Crypto.Signature import PKCS1_v1_5
+from jwkest.jws import SIGNER_ALGS
+from jwkest.jws import JWSig
+from jwkest.jws import NoSuitableSigningKeys
+from jwkest.jws import alg2keytype
+from jwkest.jwt import b64encode_item
+from oic.utils.keyio import build_keyjar
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+SCHEMES = {"RS": PKCS1_v1_5, "PS": PKCS1_PSS}
+
+
+class KeyMaterial(object):
+    """
+    :param key_conf: The key configuration, the same as for keyjar_init
+    :param kid_template: A template by which to build the kids
+    """
+
+    def __init__(self, key_conf, kid_template="a%d"):
+        _start = time.time()
+        self.jwks, self.keyjar, self.kid = build_keyjar(key_conf,
+                                                        kid_template)
+        logger.debug("Keys loaded in %.3f s" % (time.time() - _start))
+        self._jwks_json = json.dumps(self.jwks)
+        self.keys = {}
+        self.signers = {}
+        self.counters = {"sign": 0, "verify": 0, "sign_time": 0.0,
+                         "verify_time": 0.0}
+        self.lock = threading.Lock()
+
+    def init(self, instance):
+        """
+        Use instead of keyjar_init.
+
+        :return: The JWKS
+        """
+        instance.keyjar = self.keyjar
+        instance.kid = self.kid
+        return self.jwks
+
+    def export(self):
+        """
+        :return: The JWKS as a JSON document
+        """
+        return self._jwks_json
+
+    def signing_key(self, alg):
+        """
+        :return: The key that is used to sign with alg
+        """
+        try:
+            return self.keys[alg]
+        except KeyError:
+            pass
+
+        _keys = [k for k in self.keyjar.get_signing_key(alg2keytype(alg), "",
+                                                        alg=alg)
+                 if not k.alg or k.alg == alg]
+        if not _keys:
+            raise NoSuitableSigningKeys("No key for algorithm: %s" % alg)
+        self.keys[alg] = _keys[0]
+        return _keys[0]
+
+    def signer(self, alg, key):
+        """
+        :return: A function that given the signing input returns the
+            signature
+        """
+        try:
+            return self.signers[(alg, key.kid)]
+        except KeyError:
+            pass
+
+        try:
+            _scheme = SCHEMES[alg[:2]].new(key.key)
+        except KeyError:  # elliptic curve
+            _signer = SIGNER_ALGS[alg]
+            _key = key.get_key(alg=alg, private=True)
+
+            def _sign(msg):
+                return _signer.sign(msg, _key)
+        else:
+            _digest = SIGNER_ALGS[alg].digest
+
+            def _sign(msg):
+                return _scheme.sign(_digest.new(msg))
+
+        with self.lock:
+            self.signers[(alg, key.kid)] = _sign
+        return _sign
+
+    def count(self, what, spent):
+        with self.lock:
+            self.counters[what] += 1
+            self.counters["%s_time" % what] += spent
+
+    def sign(self, msg, alg):
+        """
+        Sign with one of the OP's own keys. Same result as
+        msg.to_jwt(keys, alg).
+
+        :param msg: A Message instance
+        :param alg: An asymmetric signing algorithm
+        :return: A signed JWT
+        """
+        key = self.signing_key(alg)
+        xargs = {"alg": alg}
+        if key.kid:
+            xargs["kid"] = key.kid
+
+        _start = time.time()
+        _input = JWSig(**xargs).pack(parts=[msg.to_json()])
+        sig = self.signer(alg, key)(_input.encode("utf-8"))
+        self.count("sign", time.time() - _start)
+        return ".".join([_input, b64encode_item(sig).decode("utf-8")])
+
+
+KEY_MATERIAL = {}
+_lock = threading.Lock()
+
+
+def load_keys(key_conf, kid_template="a%d"):
+    """
+    The key material for a key configuration, only loaded the first time.
+    """
+    _key = json.dumps([key_conf, kid_template], sort_keys=True)
+    with _lock:
+        try:
+            return KEY_MATERIAL[_key]
+        except KeyError:
+            KEY_MATERIAL[_key] = KeyMaterial(key_conf, kid_template)
+            return KEY_MATERIAL[_key]
@@ -0,0 +1,234 @@
+"""
+A catalogue of the test logs.
+
+Every time the result of a test changes a line is appended to a JSON lines
+file in the log directory. The file is hidden so that code walking the
+directory tree, where every entry is expected to be an issuer directory,
+doesn't see it. Reports can then be made from the catalogue
+instead of reading and parsing every log file. The last line for a log
+file is the one that counts.
+"""
+import json
+import os
+import threading
+
+from oictest.log_writer import RESULT_HEAD
+from oictest.log_writer import SLINE
+
+__author__ = 'roland'
+
+INDEX_FILE = ".index.jsonl"
+TAIL = 65536
+
+
+def split_path(path):
+    """
+    :param path: A log file path, <root>/<issuer>/<profile>/<test id>
+    :return: The issuer directory, profile and test id
+    """
+    return tuple(os.path.normpath(path).split(os.sep)[-3:])
+
+
+def read_summary(filename):
+    """
+    Get the header and the result from a log file without reading all of it.
+
+    :return: tuple of a dictionary with the headers and the first line of
+        the result, the result is None if there is none
+    """
+    headers = {}
+    with open(filename, "rb") as fp:
+        for line in fp:
+            line = line.rstrip("\n")
+            if line == SLINE:
+                break
+            try:
+                key, val = line.split(": ", 1)
+            except ValueError:
+                pass
+            else:
+                headers[key] = val
+
+        fp.seek(0, os.SEEK_END)
+        size = fp.tell()
+        fp.seek(max(0, size - TAIL))
+        _tail = fp.read()
+        _pos = _tail.rfind(RESULT_HEAD)
+        if _pos < 0:
+            if size <= TAIL:
+                return headers, None
+            fp.seek(0)
+            _tail = fp.read()
+            _pos = _tail.rfind(RESULT_HEAD)
+            if _pos < 0:
+                return headers, None
+
+    _res = _tail[_pos + len(RESULT_HEAD):]
+    return headers, _res.split("\n")[0]
+
+
+class LogIndex(object):
+    """
+    :param root: The log directory
+    """
+
+    def __init__(self, root="log"):
+        self.root = root
+        self.path = os.path.join(root, INDEX_FILE)
+        self.recorded = {}
+        self.lock = threading.Lock()
+        self._latest = (None, {})
+
+    def record(self, path, issuer, timestamp, result):
+        """
+        Add a line to the catalogue, unless the result is the same as the
+        last time this log was recorded by this process.
+
+        :param path: The log file
+        :param issuer: The OP's issuer ID
+        :param timestamp: When the test was run
+        :param result: The result text as written to the log
+        """
+        _result = result.split("\n")[0]
+        _iss, _prof, _tid = split_path(path)
+        line = json.dumps({"issuer": issuer, "dir": _iss, "profile": _prof,
+                           "test_id": _tid, "timestamp": timestamp,
+                           "result": _result}) + "\n"
+
+        with self.lock:
+            if self.recorded.get(path) == _result:
+                return
+            if not os.path.isdir(self.root):
+                os.makedirs(self.root)
+            with open(self.path, "a") as fp:
+                fp.write(line)
+            self.recorded[path] = _result
+
+    def entries(self):
+        """
+        All lines in the catalogue, oldest first.
+        """
+        try:
+            fp = open(self.path)
+        except IOError:
+            return
+        with fp:
+            for line in fp:
+                try:
+                    yield json.loads(line)
+                except ValueError:  # half written line
+                    continue
+
+    def latest(self):
+        """
+        :return: dictionary with (issuer directory, profile, test id) as key
+            and the last catalogue entry for that log file as value. Must not
+            be modified, it's reused until the catalogue changes.
+        """
+        try:
+            _stat = os.stat(self.path)
+            _key = (_stat.st_size, _stat.st_mtime)
+        except OSError:
+            _key = None
+
+        _cached = self._latest
+        if _key is not None and _cached[0] == _key:
+            return _cached[1]
+
+        res = {}
+        for entry in self.entries():
+            res[(entry["dir"], entry["profile"], entry["test_id"])] = entry
+        self._latest = (_key, res)
+        return res
+
+    def compact(self):
+        """
+        Rewrite the catalogue with only the last entry per log file.
+        """
+        with self.lock:
+            _latest = self.latest()
+            self._write([_latest[k] for k in sorted(_latest.keys())])
+
+    def _logs(self):
+        """
+        :return: (issuer directory, profile, test id) and file name of
+            every log file in the tree
+        """
+        for _iss in sorted(os.listdir(self.root)):
+            _idir = os.path.join(self.root, _iss)
+            if _iss.startswith(".") or not os.path.isdir(_idir):
+                continue
+            for _prof in sorted(os.listdir(_idir)):
+                _pdir = os.path.join(_idir, _prof)
+                if _prof.startswith(".") or not os.path.isdir(_pdir):
+                    continue
+                for _tid in sorted(os.listdir(_pdir)):
+                    fn = os.path.join(_pdir, _tid)
+                    if _tid.startswith("OP-") and os.path.isfile(fn):
+                        yield (_iss, _prof, _tid), fn
+
+    @staticmethod
+    def _entry(key, fn):
+        """
+        :return: A catalogue entry made from the log file or None if the
+            log has no result
+        """
+        try:
+            headers, result = read_summary(fn)
+        except IOError:
+            return None
+        if result is None or "Timestamp" not in headers:
+            return None
+        return {"issuer": headers.get("Issuer", ""), "dir": key[0],
+                "profile": key[1], "test_id": key[2],
+                "timestamp": headers["Timestamp"], "result": result}
+
+    def _write(self, entries):
+        _tmp = self.path + ".tmp"
+        with open(_tmp, "w") as fp:
+            for entry in entries:
+                fp.write(json.dumps(entry) + "\n")
+        os.rename(_tmp, self.path)
+
+    def rebuild(self):
+        """
+        Build the catalogue from the log files.
+        """
+        entries = []
+        for key, fn in self._logs():
+            _entry = self._entry(key, fn)
+            if _entry is not None:
+                entries.append(_entry)
+
+        with self.lock:
+            self._write(entries)
+            self.recorded = {}
+
+    def update(self):
+        """
+        Make the catalogue match the log files. Logs it doesn't know about,
+        like the ones written before there was a catalogue, are read and
+        added. Logs that have been removed are dropped. Only the directories
+        are listed, log files already in the catalogue aren't read.
+
+        :return: The number of entries added and removed
+        """
+        _latest = self.latest()
+        added = []
+        present = set()
+        for key, fn in self._logs():
+            present.add(key)
+            if key not in _latest:
+                _entry = self._entry(key, fn)
+                if _entry is not None:
+                    added.append(_entry)
+        removed = set([k for k in _latest if k not in present])
+        if not added and not removed:
+            return 0, 0
+
+        with self.lock:
+            _latest = self.latest()  # may have been added to meanwhile
+            entries = [_latest[k] for k in sorted(_latest.keys()) if
+                       k not in removed]
+            self._write(entries + added)
+        return len(added), len(removed)
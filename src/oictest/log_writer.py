@@ -0,0 +1,158 @@
+import os
+
+from rrtest.check import STATUSCODE
+
+__author__ = 'roland'
+
+SLINE = 60 * "="
+
+# The fixed text surrounding the trace and the test output sections of a
+# test log, must stay in sync with what test/oic_op/rp/parse_log.py expects.
+TRACE_HEAD = "\n\n%s\n\nTrace output\n\n" % SLINE
+OUTPUT_HEAD = "\n\n\n%s\n\nTest output\n\n" % SLINE
+RESULT_HEAD = "\n\n\n%s\n\nRESULT: " % SLINE
+
+
+def _bytes(txt):
+    if isinstance(txt, unicode):
+        return txt.encode("utf8")
+    return txt
+
+
+def trace_item(item):
+    return "%s" % item
+
+
+def test_output_item(item):
+    """
+    The lines representing one item in the test output
+
+    :param item: A tuple marking a phase or a dictionary with a check result
+    :return: list of lines
+    """
+    if isinstance(item, tuple):
+        return ["__%s:%s__" % item]
+
+    element = ["[%s]" % item["id"],
+               "\tstatus: %s" % STATUSCODE[item["status"]]]
+    try:
+        element.append("\tdescription: %s" % (item["name"]))
+    except KeyError:
+        pass
+    try:
+        element.append("\tinfo: %s" % (item["message"]))
+    except KeyError:
+        pass
+    return element
+
+
+class LogWriter(object):
+    """
+    Writes the log of one test run to disk. The file is laid out as
+
+        header, trace, test output, result
+
+    Trace lines and test output items are only formatted once. When the
+    trace has grown the new lines are written where the trace section ends
+    and the (small) test output section and result are written after them,
+    otherwise only the new test output items and the result is written.
+    The header is overwritten in place.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.trace = None
+        self.output = None
+        self.header = ""
+        self.trace_len = 0
+        self.trace_end = 0
+        self.output_len = 0
+        self.output_block = ""
+
+    def _reset(self, trace, output):
+        self.trace = trace
+        self.output = output
+        self.header = ""
+        self.trace_len = 0
+        self.trace_end = 0
+        self.output_len = 0
+        self.output_block = ""
+
+    def _stale(self, header, trace, output):
+        if trace is not self.trace or output is not self.output:
+            return True
+        if len(trace) < self.trace_len:
+            return True
+        if len(output) < self.output_len:
+            return True
+        if len(header) != len(self.header):
+            return True
+        if not os.path.isfile(self.path):
+            return True
+        return False
+
+    @staticmethod
+    def header_text(info):
+        """
+        :param info: Dictionary with Issuer, Profile, Test ID and Timestamp
+        """
+        _hdr = ["%s: %s" % (k, info[k]) for k in ["Issuer", "Profile",
+                                                   "Test ID", "Timestamp"]]
+        return _bytes("\n".join(_hdr) + TRACE_HEAD)
+
+    def write(self, info, trace, output, result):
+        """
+        Bring the log file up to date.
+
+        :param info: Header information, see header_text
+        :param trace: A rrtest.Trace instance
+        :param output: The list of test outputs
+        :param result: The result text
+        :return: The path of the log file
+        """
+        header = self.header_text(info)
+        footer = _bytes(RESULT_HEAD + result + "\n")
+
+        fresh = self._stale(header, trace, output)
+        if fresh:
+            self._reset(trace, output)
+            _fh = open(self.path, "wb")
+        else:
+            _fh = open(self.path, "r+b")
+
+        _lines = trace[self.trace_len:]
+        _items = output[self.output_len:]
+        try:
+            new_trace = "".join(
+                [_bytes(trace_item(t)) + "\n" for t in _lines])
+            new_output = []
+            for item in _items:
+                new_output.extend(test_output_item(item))
+            new_output = "".join([_bytes(l) + "\n" for l in new_output])
+
+            if header != self.header:
+                _fh.seek(0)
+                _fh.write(header)
+                self.header = header
+                if not self.trace_end:
+                    self.trace_end = len(header)
+
+            if new_trace or fresh:
+                _fh.seek(self.trace_end)
+                _fh.write(new_trace)
+                _fh.write(OUTPUT_HEAD)
+                _fh.write(self.output_block)
+                self.trace_end += len(new_trace)
+            else:
+                _fh.seek(self.trace_end + len(OUTPUT_HEAD) +
+                         len(self.output_block))
+            _fh.write(new_output)
+            _fh.write(footer)
+            _fh.truncate()
+        finally:
+            _fh.close()
+
+        self.trace_len += len(_lines)
+        self.output_len += len(_items)
+        self.output_block += new_output
+        return self.path
@@ -0,0 +1,190 @@
+"""
+Cache for OP metadata, the provider configuration and the JWKS documents.
+
+The same documents are fetched by almost every test flow. Responses are
+kept per URL and reused for as long as Cache-Control allows, after that
+they are revalidated using the ETag and Last-Modified validators.
+"""
+import json
+import logging
+import threading
+import time
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+# Tests that verify that the OP has rotated its keys, must see fresh copies
+BYPASS_CHECKS = ["new-signing-keys", "new-encryption-keys"]
+
+
+def cache_control(headers):
+    """
+    :param headers: The response headers
+    :return: dictionary with the Cache-Control directives
+    """
+    res = {}
+    try:
+        _val = headers["cache-control"]
+    except KeyError:
+        return res
+
+    for item in _val.split(","):
+        key, _, val = item.strip().partition("=")
+        if key:
+            res[key.lower()] = val.strip('"')
+    return res
+
+
+def bypass_cache(tests):
+    """
+    :param tests: The tests that are run at the end of a flow
+    :return: True if the flow must not use cached metadata
+    """
+    if not tests:
+        return False
+    for cid in BYPASS_CHECKS:
+        if cid in tests:
+            return True
+    return False
+
+
+class Entry(object):
+    def __init__(self, response):
+        self.response = response
+        self.etag = response.headers.get("etag")
+        self.last_modified = response.headers.get("last-modified")
+        self.expires = 0
+        self.refresh(response)
+
+    def refresh(self, response):
+        _cc = cache_control(response.headers)
+        if "no-cache" in _cc:
+            self.expires = 0
+            return
+
+        try:
+            self.expires = time.time() + int(_cc["max-age"])
+        except (KeyError, ValueError):
+            self.expires = 0
+
+    def fresh(self):
+        return time.time() < self.expires
+
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class MetadataCache(object):
+    """
+    Responses to GET requests keyed by URL and grouped by issuer, shared by
+    all the conversations in this process.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.issuers = {}
+        self.counters = {"hit": 0, "miss": 0, "revalidated": 0, "bypass": 0}
+        self.lock = threading.Lock()
+
+    def _count(self, what, url):
+        logger.debug("metadata cache %s: %s" % (what, url))
+        with self.lock:
+            self.counters[what] += 1
+
+    def fetch(self, url, issuer, send, bypass=False, **kwargs):
+        """
+        GET a document, from the cache if possible.
+
+        :param url: Where the document is
+        :param issuer: The OP the document belongs to
+        :param send: Function that does the HTTP request, like
+            PBase.http_request
+        :param bypass: If True the document is always fetched, the cache is
+            updated with what is returned.
+        :return: A requests.Response instance
+        """
+        with self.lock:
+            entry = self.entries.get(url)
+
+        if bypass:
+            self._count("bypass", url)
+        elif entry is not None:
+            if entry.fresh():
+                self._count("hit", url)
+                return entry.response
+
+            _headers = kwargs.get("headers", {}).copy()
+            _headers.update(entry.validators())
+            kwargs["headers"] = _headers
+
+        resp = send(url, "GET", **kwargs)
+
+        if not bypass and entry is not None and resp.status_code == 304:
+            self._count("revalidated", url)
+            entry.refresh(resp)
+            return entry.response
+
+        if not bypass:
+            self._count("miss", url)
+
+        with self.lock:
+            if resp.status_code == 200 and "no-store" not in cache_control(
+                    resp.headers):
+                self.entries[url] = Entry(resp)
+                self.issuers.setdefault(issuer, set()).add(url)
+            else:
+                try:
+                    del self.entries[url]
+                except KeyError:
+                    pass
+        return resp
+
+    def provider_config(self, client, issuer, bypass=False):
+        """
+        client.provider_config() with the GET requests it does, the
+        configuration document and any redirects, going through the cache.
+        """
+        _send = client.http_request
+
+        def send(url, method="GET", **kwargs):
+            if method == "GET":
+                return self.fetch(url, issuer, _send, bypass, **kwargs)
+            return _send(url, method, **kwargs)
+
+        client.http_request = send
+        try:
+            return client.provider_config(issuer)
+        finally:
+            del client.http_request
+
+    def clear(self, issuer=None):
+        with self.lock:
+            if issuer is None:
+                self.entries = {}
+                self.issuers = {}
+            else:
+                for url in self.issuers.pop(issuer, []):
+                    try:
+                        del self.entries[url]
+                    except KeyError:
+                        pass
+
+
+def load_jwks(kb, resp):
+    """
+    Load a KeyBundle with the keys in a fetched JWKS, so it doesn't fetch
+    them again itself.
+    """
+    kb.imp_jwks = json.loads(resp.text)
+    kb._keys = []
+    kb.do_keys(kb.imp_jwks["keys"])
+    kb.time_out = time.time() + kb.cache_time
+
+
+METADATA_CACHE = MetadataCache()
@@ -1,10 +1,17 @@
 #from oic.oic.provider import Provider
+import logging
+import threading
+import time
+from collections import OrderedDict
+
 from oic.oic import OIDCONF_PATTERN
 from oic.utils.webfinger import WF_URL
 from oictest.provider import Provider
 
 __author__ = 'roland'
 
+logger = logging.getLogger(__name__)
+
 OIDC_PATTERN = OIDCONF_PATTERN[3:]
 WEB_FINGER = WF_URL[11:]
 NP = 5
@@ -62,6 +69,55 @@ def extract_mode(path):
         return mod, part[-1]
 
 
+class ModeCache(object):
+    """
+    extract_mode with the parsed modes remembered. The mode is given by the
+    first NP parts of the path, what's after that is the endpoint, so all
+    the endpoints of a test share one entry.
+
+    :param size: Max number of modes kept
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.modes = OrderedDict()
+        self.counters = {"hit": 0, "miss": 0}
+        self.lock = threading.Lock()
+
+    def __call__(self, path):
+        if path.startswith("/"):
+            path = path[1:]
+
+        part = path.split("/", NP)
+        if len(part) > NP:
+            endpoint = part[NP]
+            key = path[:len(path) - len(endpoint)]  # keeps the last '/'
+        else:
+            endpoint = None
+            key = path
+
+        with self.lock:
+            try:
+                mode, _endpoint = self.modes.pop(key)
+            except KeyError:
+                mode, _endpoint = extract_mode(path)
+                self.counters["miss"] += 1
+            else:
+                self.counters["hit"] += 1
+            self.modes[key] = (mode, _endpoint)
+            while len(self.modes) > self.size:
+                self.modes.popitem(last=False)
+
+        if endpoint is None:
+            endpoint = _endpoint
+        if mode:  # callers may change it
+            mode = dict(mode)
+        return mode, endpoint
+
+
+MODES = ModeCache()
+
+
 def mode2path(mode):
     # test_id/<sig-alg>/<enc-alg>/<behavior>/<userinfo>
     if mode is None:
@@ -137,4 +193,65 @@ def setup_op(mode, com_args, op_arg):
         except KeyError:
             pass
 
-    return op
\ No newline at end of file
+    return op
+
+
+class ProviderPool(object):
+    """
+    Provider instances, one per mode, shared by all sessions. Setting up a
+    provider is expensive, and a provider doesn't hold anything that
+    belongs to one RP: clients and sessions are in the cdb and sdb
+    databases given in com_args and the access tokens for distributed
+    claims are kept by the pool.
+
+    :param com_args: Arguments to Provider
+    :param op_arg: Attributes to set on the Provider instance
+    :param size: Max number of providers kept
+    """
+
+    def __init__(self, com_args, op_arg, size=64):
+        self.com_args = com_args
+        self.op_arg = op_arg
+        self.size = size
+        self.providers = OrderedDict()
+        self.claim_access_token = {}
+        self.counters = {"hit": 0, "miss": 0, "eviction": 0}
+        self.build_time = 0.0
+        self.lock = threading.Lock()
+
+    def get(self, mode):
+        """
+        :param mode: What extract_mode returns
+        :return: A Provider instance set up for that mode
+        """
+        key = mode2path(mode)
+        with self.lock:
+            try:
+                op = self.providers.pop(key)
+            except KeyError:
+                op = None
+            else:
+                self.counters["hit"] += 1
+                self.providers[key] = op
+
+        if op is None:
+            _start = time.time()
+            op = setup_op(mode, self.com_args, self.op_arg)
+            op.claim_access_token = self.claim_access_token
+            _time = time.time() - _start
+            logger.debug("Provider for %s set up in %.3f s" % (key, _time))
+
+            with self.lock:
+                self.counters["miss"] += 1
+                self.build_time += _time
+                if key in self.providers:  # someone else was quicker
+                    op = self.providers.pop(key)
+                self.providers[key] = op
+                while len(self.providers) > self.size:
+                    self.providers.popitem(last=False)
+                    self.counters["eviction"] += 1
+
+        # the authentication methods are shared by all providers
+        for _authn in self.com_args["authn_broker"]:
+            _authn.srv = op
+        return op
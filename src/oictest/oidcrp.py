@@ -15,6 +15,7 @@ from oic.utils.keyio import keyjar_init
 # from oic.utils.time_util import utc_time_sans_frac
 from oictest.check import utc_time_sans_frac
 from oictest.testflows import RmCookie
+from rrtest.transport import KeepAlive
 
 __author__ = 'roland'
 
@@ -36,7 +37,7 @@ def flow2sequence(operations, item):
     return [operations.PHASES[phase] for phase in flow["sequence"]]
 
 
-class Client(oic.Client):
+class Client(KeepAlive, oic.Client):
     def __init__(self, client_id=None, ca_certs=None,
                  client_prefs=None, client_authn_methods=None, keyjar=None,
                  verify_ssl=True, behaviour=None):
@@ -2,10 +2,11 @@
 import copy
 import json
 import os
+import threading
+from collections import OrderedDict
 from urllib import quote_plus
 from urllib import unquote
 import logging
-import tarfile
 
 from jwkest import JWKESTException
 from jwkest.jws import alg2keytype
@@ -25,12 +26,25 @@ from oictest.check import utc_time_sans_frac
 from requests import ConnectionError
 from oictest import ConfigurationError
 
+from oictest.archive import create_tar_archive
 from oictest.base import Conversation
 from oictest.check import get_protocol_response
+from oictest.dir_index import DIR_INDEX
+from oictest.dir_index import LISTING_PAGES
+from oictest.dir_index import page_args
+from oictest.dir_index import paginate
+from oictest.log_index import LogIndex
+from oictest.log_writer import LogWriter
+from oictest.log_writer import test_output_item
 from oictest.oidcrp import test_summation, MissingErrorResponse
 from oictest.oidcrp import OIDCTestSetup
 from oictest.oidcrp import request_and_return
-from oictest.prof_util import flows
+from oictest.graph import FlowRegistry
+from oictest.metadata import METADATA_CACHE
+from oictest.metadata import bypass_cache
+from oictest.metadata import load_jwks
+from oictest.pages import FLOW_LIST
+from oictest.pages import precompile
 
 from rrtest import Trace
 from rrtest import exception_trace
@@ -38,8 +52,9 @@ from rrtest import Break
 from rrtest.check import ERROR
 from rrtest.check import OK
 from rrtest.check import CRITICAL
-from rrtest.check import STATUSCODE
 from rrtest.check import WARNING
+from rrtest.static import STATIC
+from rrtest.transport import configure as configure_transport
 
 from testclass import Discover, Done, END_TAG
 from testclass import RequirementsNotMet
@@ -55,6 +70,7 @@ INCOMPLETE = 4
 TEST_RESULTS = {OK: "OK", ERROR: "ERROR", WARNING: "WARNING",
                 INCOMPLETE: "INCOMPLETE"}
 CRYPTSUPPORT = {"none": "n", "signing": "s", "encryption": "e"}
+MAX_SEQUENCES = 2000
 
 
 class NotSupported(Exception):
@@ -71,47 +87,6 @@ def setup_logging(logfile, log):
     log.setLevel(logging.DEBUG)
 
 
-def mk_tardir(issuer, test_profile):
-    wd = os.getcwd()
-
-    tardirname = wd
-    for part in ["tar", issuer, test_profile]:
-        tardirname = os.path.join(tardirname, part)
-        if not os.path.isdir(tardirname):
-            os.mkdir(tardirname)
-
-    logdirname = os.path.join(wd, "log", issuer, test_profile)
-    for item in os.listdir(logdirname):
-        if item.startswith("."):
-            continue
-
-        ln = os.path.join(logdirname, item)
-        tn = os.path.join(tardirname, "{}.txt".format(item))
-        if not os.path.isfile(tn):
-            os.symlink(ln, tn)
-
-
-def create_tar_archive(issuer, test_profile):
-    mk_tardir(issuer, test_profile)
-
-    wd = os.getcwd()
-    _dir = os.path.join(wd, "tar", issuer)
-    os.chdir(_dir)
-
-    tar = tarfile.open("{}.tar".format(test_profile), "w", dereference=True)
-
-    for item in os.listdir(test_profile):
-        if item.startswith("."):
-            continue
-
-        fn = os.path.join(test_profile, item)
-
-        if os.path.isfile(fn):
-            tar.add(fn)
-    tar.close()
-    os.chdir(wd)
-
-
 def not_logging(logfile, logger):
     hdlr = logging.FileHandler(logfile)
     base_formatter = logging.Formatter(
@@ -163,9 +138,14 @@ def with_or_without_slash(path):
 
 
 class OPRP(object):
+    """
+    One instance is meant to be shared by all requests, per request handlers
+    are created with context().
+    """
+
     def __init__(self, lookup, conf, test_flows, cache, test_profile,
                  profiles, test_class, check_factory, environ=None,
-                 start_response=None):
+                 start_response=None, archiver=None):
         self.lookup = lookup
         self.conf = conf
         self.test_flows = test_flows
@@ -176,6 +156,69 @@ class OPRP(object):
         self.check_factory = check_factory
         self.environ = environ
         self.start_response = start_response
+        self.archiver = archiver
+
+        f_names = self.test_flows.FLOWS.keys()
+        f_names.sort()
+        _order = []
+        for k in self.test_flows.ORDDESC:
+            k += '-'
+            _order.extend([z for z in f_names if z.startswith(k)])
+
+        self.registry = FlowRegistry(self.test_flows.FLOWS, _order)
+        self.flow_names = self.registry.ids
+        self._sequences = OrderedDict()
+        self._lock = threading.Lock()
+        self.log_index = LogIndex()
+        if lookup is not None:
+            precompile(lookup)
+
+        try:
+            configure_transport(**conf.HTTP_POOL)
+        except AttributeError:
+            pass
+
+    def context(self, environ, start_response):
+        """
+        A handler for one request. It shares everything but the WSGI
+        environment and start_response with this instance.
+        """
+        _ctx = copy.copy(self)
+        _ctx.environ = environ
+        _ctx.start_response = start_response
+        return _ctx
+
+    def profile_flows(self, profile):
+        """
+        The ordered list of flows that belongs to a profile.
+        """
+        return self.registry.profile_flows(profile)
+
+    def get_sequence(self, flow_id, profile):
+        """
+        The sequence of request/responses a test flow consists of given a
+        profile. The profile resolution is only done once per flow and
+        profile. What's returned is a new list with a copy of the arguments
+        of each step, anything below the top level of the arguments is shared
+        and must not be modified.
+
+        :param flow_id: Flow id
+        :param profile: Profile code
+        :return: list of (phase, arguments) tuples
+        """
+        key = (flow_id, profile)
+        try:
+            _seq = self._sequences[key]
+        except KeyError:
+            _seq = tuple(self.profiles.get_sequence(
+                flow_id, profile, self.test_flows.FLOWS,
+                self.profiles.PROFILEMAP, self.test_class.PHASES))
+            with self._lock:
+                self._sequences[key] = _seq
+                while len(self._sequences) > MAX_SEQUENCES:
+                    self._sequences.popitem(last=False)
+
+        return [(phase, dict(kwargs)) for phase, kwargs in _seq]
 
     # def opchoice(self, clients):
     #     resp = Response(mako_template="opchoice.mako",
@@ -212,10 +255,6 @@ class OPRP(object):
         session["test_info"][session["testid"]] = _info
 
     def flow_list(self, session):
-        resp = Response(mako_template="flowlist.mako",
-                        template_lookup=self.lookup,
-                        headers=[])
-
         try:
             _tid = session["testid"]
         except KeyError:
@@ -231,8 +270,26 @@ class OPRP(object):
             "headlines": self.test_flows.DESC,
             "testresults": TEST_RESULTS
         }
-    
-        return resp(self.environ, self.start_response, **argv)
+
+        text = FLOW_LIST.render(self.lookup, **argv)
+        self.start_response("200 OK", [("Content-type", "text/html")])
+        return [text]
+
+    def flow_states(self, session):
+        """
+        The state icon and test information link of every flow, for the
+        flow list page to update itself.
+        """
+        _tmpl = self.lookup.get_template("flowlist.mako")
+        try:
+            _info = FLOW_LIST.fragments(_tmpl, session["tests"],
+                                        session["test_info"], self.conf.BASE)
+        except AttributeError:
+            return self.not_found()
+        except KeyError:  # the session has no flows yet
+            _info = {}
+        resp = Response(json.dumps(_info), content="application/json")
+        return resp(self.environ, self.start_response)
 
     def opresult(self, conv, session):
         evaluate(session)
@@ -274,49 +331,29 @@ class OPRP(object):
         return resp(self.environ, self.start_response)
     
     def static(self, path):
-        logger.info("[static]sending: %s" % (path,))
+        return STATIC(self.environ, self.start_response, path)
 
-        try:
-            text = open(path).read()
-            if path.endswith(".ico"):
-                self.start_response('200 OK', [('Content-Type',
-                                                "image/x-icon")])
-            elif path.endswith(".html"):
-                self.start_response('200 OK', [('Content-Type', 'text/html')])
-            elif path.endswith(".json"):
-                self.start_response('200 OK', [('Content-Type',
-                                                'application/json')])
-            elif path.endswith(".jwt"):
-                self.start_response('200 OK', [('Content-Type',
-                                                'application/jwt')])
-            elif path.endswith(".txt"):
-                self.start_response('200 OK', [('Content-Type', 'text/plain')])
-            elif path.endswith(".css"):
-                self.start_response('200 OK', [('Content-Type', 'text/css')])
-            else:
-                self.start_response('200 OK', [('Content-Type', "text/plain")])
-            return [text]
-        except IOError:
-            resp = NotFound()
-            return resp(self.environ, self.start_response)
+    def tar_archive(self, path):
+        """
+        Send a tar archive, making sure it's up to date first.
+
+        :param path: tar/<issuer>/<profile>.tar
+        """
+        if self.archiver:
+            part = path.split("/")
+            if len(part) == 3 and part[2].endswith(".tar"):
+                try:
+                    self.archiver.build(part[1], part[2][:-4])
+                except Exception as err:
+                    exception_trace("tar_archive", err, logger)
+
+        return self.static(path)
 
     def _display(self, root, issuer, profile):
-        item = []
+        _args = page_args(self.environ)
         if profile:
             path = os.path.join(root, issuer, profile).replace(":", "%3A")
             argv = {"issuer": unquote(issuer), "profile": profile}
-
-            path = with_or_without_slash(path)
-            if path is None:
-                resp = Response("No saved logs")
-                return resp(self.environ, self.start_response)
-
-            for _name in os.listdir(path):
-                if _name.startswith("."):
-                    continue
-                fn = os.path.join(path, _name)
-                if os.path.isfile(fn):
-                    item.append((unquote(_name), os.path.join(profile, _name)))
         else:
             if issuer:
                 argv = {'issuer': unquote(issuer), 'profile': ''}
@@ -325,25 +362,32 @@ class OPRP(object):
                 argv = {'issuer': '', 'profile': ''}
                 path = root
 
-            path = with_or_without_slash(path)
-            if path is None:
-                resp = Response("No saved logs")
-                return resp(self.environ, self.start_response)
-
-            for _name in os.listdir(path):
-                if _name.startswith("."):
-                    continue
-                fn = os.path.join(path, _name)
-                if os.path.isdir(fn):
-                    item.append((unquote(_name), os.path.join(path, _name)))
+        path = DIR_INDEX.with_or_without_slash(path)
+        if path is None:
+            resp = Response("No saved logs")
+            return resp(self.environ, self.start_response)
 
-        resp = Response(mako_template="logs.mako",
-                        template_lookup=self.lookup,
-                        headers=[])
+        _listing = DIR_INDEX.listing(path)
+        if profile:
+            _names = _listing.files
+            if _args["result"]:
+                _iss = os.path.basename(os.path.dirname(path))
+                _latest = self.log_index.latest()
+                _names = [n for n in _names if _latest.get(
+                    (_iss, profile, n), {}).get("result", "").startswith(
+                    _args["result"])]
+            item = [(unquote(_name), os.path.join(profile, _name)) for _name
+                    in _names]
+        else:
+            item = [(unquote(_name), os.path.join(path, _name)) for _name in
+                    _listing.dirs]
 
         item.sort()
-        argv["logs"] = item
-        return resp(self.environ, self.start_response, **argv)
+        argv["logs"], argv["page"] = paginate(item, _args)
+        etag = LISTING_PAGES.etag(path, sorted(argv["page"].items()),
+                                  argv["logs"], argv["issuer"], argv["profile"])
+        return LISTING_PAGES.respond(self.environ, self.start_response, etag,
+                                     self.lookup, "logs.mako", **argv)
 
     def display_log(self, root, issuer="", profile="", testid=""):
         logger.info(
@@ -385,9 +429,7 @@ class OPRP(object):
         session["testid"] = path
         session["node"] = get_node(session["tests"], path)
         sequence_info = {
-            "sequence": self.profiles.get_sequence(
-                path, session["profile"], self.test_flows.FLOWS,
-                self.profiles.PROFILEMAP, self.test_class.PHASES),
+            "sequence": self.get_sequence(path, session["profile"]),
             "mti": session["node"].mti,
             "tests": session["node"].tests}
         sequence_info["sequence"].append((Done, {}))
@@ -395,6 +437,7 @@ class OPRP(object):
         session["index"] = index
         session["response_type"] = ""
         ots, conv = self.client_init()
+        conv.bypass_cache = bypass_cache(sequence_info["tests"])
         session["conv"] = conv
         session["ots"] = ots
 
@@ -501,17 +544,10 @@ class OPRP(object):
         if profile is None:
             profile = self.test_profile
 
-        f_names = self.test_flows.FLOWS.keys()
-        f_names.sort()
-        session["flow_names"] = []
-        for k in self.test_flows.ORDDESC:
-            k += '-'
-            l = [z for z in f_names if z.startswith(k)]
-            session["flow_names"].extend(l)
-
-        session["tests"] = [make_node(x, self.test_flows.FLOWS[x]) for x in
-                            flows(profile, session["flow_names"],
-                                  self.test_flows.FLOWS)]
+        session["flow_names"] = self.flow_names
+        session["tests"] = NodeList(
+            [make_node(x, self.test_flows.FLOWS[x]) for x in
+             self.profile_flows(profile)])
 
         session["response_type"] = []
         session["test_info"] = {}
@@ -633,10 +669,14 @@ class OPRP(object):
                         return self.err_response(session, "discover",
                                                  conv.last_response.text)
 
-                    for x in ots.client.keyjar[
-                            ots.client.provider_info["issuer"]]:
+                    _issuer = ots.client.provider_info["issuer"]
+                    for x in ots.client.keyjar[_issuer]:
                         try:
-                            resp = ots.client.http_request(x.source)
+                            resp = METADATA_CACHE.fetch(
+                                x.source, _issuer, ots.client.http_request,
+                                conv.bypass_cache)
+                            if resp.status_code == 200:
+                                load_jwks(x, resp)
                         except Exception as err:
                             return self.err_response(session, "jwks_fetch",
                                                      str(err))
@@ -866,32 +906,24 @@ class OPRP(object):
                 if not path:
                     return
 
-                sline = 60*"="
-                output = ["%s: %s" % (k, _pi[k]) for k in ["Issuer", "Profile",
-                                                           "Test ID"]]
-                output.append("Timestamp: %s" % in_a_while())
-                output.extend(["", sline, ""])
-                output.extend(trace_output(_conv.trace))
-                output.extend(["", sline, ""])
-                output.extend(test_output(_conv.test_output))
-                output.extend(["", sline, ""])
-                # and lastly the result
                 self.store_test_info(session, _pi)
                 _info = session["test_info"][_tid]
-                output.append("RESULT: %s" % represent_result(_info, _tid))
-                output.append("")
-
-                f = open(path, "w")
-                txt = "\n".join(output)
 
-                try:
-                    f.write(txt)
-                except UnicodeEncodeError:
-                    f.write(txt.encode("utf8"))
+                # header, trace, test output and lastly the result
+                _writer = _conv.log_writer
+                if _writer is None or _writer.path != path:
+                    _writer = _conv.log_writer = LogWriter(path)
+                _result = represent_result(_info, _tid)
+                _writer.write(_pi, _conv.trace, _conv.test_output, _result)
+                self.log_index.record(path, _pi["Issuer"], _pi["Timestamp"],
+                                      _result)
+                DIR_INDEX.invalidate(path)
 
-                f.close()
                 pp = path.split("/")
-                create_tar_archive(pp[1], pp[2])
+                if self.archiver:
+                    self.archiver.mark(pp[1], pp[2])
+                else:
+                    create_tar_archive(pp[1], pp[2])
                 return path
 
 # =============================================================================
@@ -920,19 +952,7 @@ def test_output(out):
     """
     element = ["Test output\n"]
     for item in out:
-        if isinstance(item, tuple):
-            element.append("__%s:%s__" % item)
-        else:
-            element.append("[%s]" % item["id"])
-            element.append("\tstatus: %s" % STATUSCODE[item["status"]])
-            try:
-                element.append("\tdescription: %s" % (item["name"]))
-            except KeyError:
-                pass
-            try:
-                element.append("\tinfo: %s" % (item["message"]))
-            except KeyError:
-                pass
+        element.extend(test_output_item(item))
     element.append("\n")
     return element
 
@@ -1012,10 +1032,9 @@ def log_path(session, test_id=None):
 
 
 def end_tags(info):
-    _ll = info["trace"].lastline()
-
     try:
-        if _ll.endswith(END_TAG) and info["test_output"][-1] == ("X", END_TAG):
+        _last = info["trace"].events[-1][3]
+        if _last == END_TAG and info["test_output"][-1] == ("X", END_TAG):
             return True
     except IndexError:
         pass
@@ -1244,7 +1263,23 @@ def make_node(x, spec):
     return Node(x, **spec)
 
 
+class NodeList(list):
+    """
+    A list of nodes that can also be looked up by name. Not meant to be
+    modified after creation.
+    """
+
+    def __init__(self, nodes=()):
+        list.__init__(self, nodes)
+        self.names = dict([(n.name, n) for n in self])
+
+
 def get_node(tests, nid):
+    try:
+        return tests.names.get(nid)
+    except AttributeError:
+        pass
+
     l = [x for x in tests if x.name == nid]
     try:
         return l[0]
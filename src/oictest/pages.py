@@ -0,0 +1,158 @@
+"""
+Template handling for the test tool web pages.
+
+The list of test flows is shown after almost every step. Most of it, the
+flows, their descriptions and the headlines, only depends on the profile.
+That part is rendered once and kept, only the state of each flow and
+whether there is test information for it is filled in per request.
+"""
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+from mako.exceptions import TopLevelLookupException
+from mako.lookup import TemplateLookup
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+PRECOMPILED = ["flowlist.mako", "profile.mako", "testinfo.mako",
+               "opresult_repost.mako", "sorry.mako", "logs.mako"]
+
+_LOOKUPS = {}
+_LOCK = threading.Lock()
+
+
+def template_lookup(root=""):
+    """
+    One TemplateLookup per directory, with compiled templates kept in
+    <root>modules.
+
+    :param root: The directory with the templates and htdocs directories
+    """
+    with _LOCK:
+        try:
+            return _LOOKUPS[root]
+        except KeyError:
+            _lookup = TemplateLookup(
+                directories=[root + 'templates', root + 'htdocs'],
+                module_directory=root + 'modules',
+                input_encoding='utf-8', output_encoding='utf-8')
+            _LOOKUPS[root] = _lookup
+            return _lookup
+
+
+def precompile(lookup, names=None):
+    """
+    Compile templates now instead of when they are first used.
+
+    :return: The names of the templates that were found
+    """
+    res = []
+    for name in names or PRECOMPILED:
+        try:
+            lookup.get_template(name)
+        except TopLevelLookupException:
+            continue
+        res.append(name)
+    return res
+
+
+SLOT = re.compile("\x00(state|info):([^\x00]*)\x00")
+
+
+def slot(kind, name):
+    return "\x00%s:%s\x00" % (kind, name)
+
+
+class FlowListPage(object):
+    """
+    Renders flowlist.mako. Templates that define state_icon() and
+    info_link() and use the slot function they're given in place of them
+    have their output split into the parts that don't change and the
+    slots. Other templates are rendered every time.
+
+    :param size: Number of pages kept
+    """
+
+    def __init__(self, size=32):
+        self.size = size
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _skeleton(self, template, key, argv):
+        with self.lock:
+            try:
+                parts = self.pages.pop(key)
+            except KeyError:
+                pass
+            else:
+                self.pages[key] = parts
+                return parts
+
+        text = template.render(slot=slot, **argv)
+        _split = SLOT.split(text)
+        if len(_split) == 1:  # doesn't use slots
+            parts = None
+        else:
+            parts = [(_split[i], _split[i + 1], _split[i + 2]) for i in
+                     range(0, len(_split) - 1, 3)]
+            parts.append((_split[-1], None, None))
+
+        with self.lock:
+            self.pages[key] = parts
+            while len(self.pages) > self.size:
+                self.pages.popitem(last=False)
+        return parts
+
+    def fragments(self, template, flows, test_info, base):
+        """
+        :return: dictionary with flow id as key and the HTML for its state
+            icon and test information link as value
+        """
+        _mod = template.module
+        res = {}
+        for node in flows:
+            if node.name in test_info:
+                _info = _mod.info_link(base, node.name)
+            else:
+                _info = ""
+            res[node.name] = {"state": node.state,
+                              "icon": _mod.state_icon(node.state),
+                              "info": _info}
+        return res
+
+    def render(self, lookup, template_name="flowlist.mako", **argv):
+        """
+        :param argv: What the template expects, flows, test_info and base
+            among them
+        :return: The page
+        """
+        template = lookup.get_template(template_name)
+        _mod = template.module
+        if not hasattr(_mod, "state_icon") or not hasattr(_mod, "info_link"):
+            return template.render(**argv)
+
+        _flows = argv["flows"]
+        key = (id(lookup), template_name, argv.get("profile"),
+               argv.get("base"), tuple([n.name for n in _flows]))
+        parts = self._skeleton(template, key, argv)
+        if parts is None:
+            return template.render(**argv)
+
+        _state = dict([(n.name, n.state) for n in _flows])
+        _info = set(argv["test_info"])
+        _base = argv["base"]
+        res = []
+        for text, kind, name in parts:
+            res.append(text)
+            if kind == "state":
+                res.append(_mod.state_icon(_state[name]))
+            elif kind == "info" and name in _info:
+                res.append(_mod.info_link(_base, name))
+        return "".join(res)
+
+
+FLOW_LIST = FlowListPage()
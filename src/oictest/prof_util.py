@@ -97,6 +97,38 @@ def flows(code, ordered_list, flows_):
     return res
 
 
+class ProfileIndex(object):
+    """
+    Which flows belongs to a profile. Flows are grouped on their profile
+    specification so map_prof is only evaluated once per specification
+    and the result per profile code is kept.
+
+    :param ordered_list: The flow ids in the order they should be returned
+    :param flows_: The flow definitions
+    """
+
+    def __init__(self, ordered_list, flows_):
+        self.ordered_list = ordered_list
+        self.spec = dict([(k, flows_[k]["profile"]) for k in ordered_list])
+        self.specs = set(self.spec.values())
+        self.cache = {}
+
+    def flows(self, code):
+        """
+        Same as flows() but cached. The returned list must not be modified.
+        """
+        try:
+            return self.cache[code]
+        except KeyError:
+            pass
+
+        p = code.split('.')
+        _match = set([s for s in self.specs if map_prof(p, s.split('.'))])
+        res = [k for k in self.ordered_list if self.spec[k] in _match]
+        self.cache[code] = res
+        return res
+
+
 def _update(dic1, dic2):
     for key in ["request_args", "kw", "req_tests", "resp_tests"]:
         if key not in dic1:
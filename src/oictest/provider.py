@@ -1,3 +1,5 @@
+import time
+
 from oic import oic
 from oic.oauth2 import Message, rndstr
 from oic.oic import provider, ProviderConfigurationResponse
@@ -82,14 +84,26 @@ class Provider(provider.Provider):
         self.server = Server(ca_certs=ca_certs, verify_ssl=verify_ssl)
         self.server.behavior_type = self.behavior_type
         self.claim_access_token = {}
+        # oictest.key_material.KeyMaterial instance
+        self.key_material = None
 
     def id_token_as_signed_jwt(self, session, loa="2", alg="", code=None,
                                access_token=None, user_info=None, auth_time=0,
                                exp=None, extra_claims=None):
-        _jws = provider.Provider.id_token_as_signed_jwt(
-            self, session, loa=loa, alg=alg, code=code,
-            access_token=access_token, user_info=user_info, auth_time=auth_time,
-            exp=exp, extra_claims=extra_claims)
+        if alg == "":
+            alg = self.jwx_def["sign_alg"]["id_token"]
+
+        if self.key_material is None or not alg or alg == "none" or \
+                alg.startswith("HS"):
+            _jws = provider.Provider.id_token_as_signed_jwt(
+                self, session, loa=loa, alg=alg, code=code,
+                access_token=access_token, user_info=user_info,
+                auth_time=auth_time, exp=exp, extra_claims=extra_claims)
+        else:
+            _idt = self.server.make_id_token(
+                session, loa, self.baseurl, alg, code, access_token,
+                user_info, auth_time, exp, extra_claims)
+            _jws = self.key_material.sign(_idt, alg)
 
         if "idts" in self.behavior_type:  # mess with the signature
             #
@@ -99,6 +113,23 @@ class Provider(provider.Provider):
 
         return _jws
 
+    def _verify(self, func, *args):
+        if self.key_material is None:
+            return func(self, *args)
+
+        _start = time.time()
+        try:
+            return func(self, *args)
+        finally:
+            self.key_material.count("verify", time.time() - _start)
+
+    def _parse_openid_request(self, request):
+        return self._verify(provider.Provider._parse_openid_request, request)
+
+    def _parse_id_token(self, id_token, redirect_uri):
+        return self._verify(provider.Provider._parse_id_token, id_token,
+                            redirect_uri)
+
     def _collect_user_info(self, session, userinfo_claims=None):
         ava = provider.Provider._collect_user_info(self, session,
                                                    userinfo_claims)
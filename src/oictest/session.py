@@ -0,0 +1,255 @@
+"""
+Server side session handling for the OP test tool.
+
+Session data, which includes the Conversation and OIDCTestSetup instances,
+is kept in a compact serialized form in a SQLite database. A bounded number
+of recently used sessions are also kept deserialized in memory. Since every
+session write bumps a version number in the database several processes can
+share one database file.
+"""
+import cookielib
+import cPickle
+import logging
+import sqlite3
+import sys
+import threading
+import time
+import types
+import zlib
+from Cookie import SimpleCookie
+from collections import OrderedDict
+from cStringIO import StringIO
+
+from oic.oauth2 import rndstr
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+COOKIE_NAME = "oprp_session"
+
+
+def _module(name):
+    __import__(name)
+    return sys.modules[name]
+
+
+class Serializer(object):
+    """
+    Pickles session data. Objects that can't or shouldn't be pickled are
+    replaced by references: modules by their name, cookie jars by their
+    cookies and shared objects (like the OPRP cache) by the name they
+    were registered under.
+    """
+
+    def __init__(self, shared=None):
+        self.shared = shared or {}
+        self._shared_id = dict([(id(v), k) for k, v in self.shared.items()])
+
+    def _persistent_id(self, obj):
+        try:
+            return "shared", self._shared_id[id(obj)]
+        except KeyError:
+            pass
+
+        if isinstance(obj, types.ModuleType):
+            return "module", obj.__name__
+        elif isinstance(obj, cookielib.CookieJar):
+            return ("cookiejar", obj.__class__, list(obj),
+                    getattr(obj, "filename", None))
+        return None
+
+    def _persistent_load(self, pid):
+        if pid[0] == "shared":
+            return self.shared[pid[1]]
+        elif pid[0] == "module":
+            return _module(pid[1])
+        elif pid[0] == "cookiejar":
+            _, cls, cookies, filename = pid
+            jar = cls()
+            for cookie in cookies:
+                jar.set_cookie(cookie)
+            if filename:
+                jar.filename = filename
+            return jar
+        raise cPickle.UnpicklingError("Unknown reference: %s" % (pid,))
+
+    def dumps(self, data):
+        pickler = cPickle.Pickler(2)
+        pickler.persistent_id = self._persistent_id
+        pickler.dump(data)
+        return zlib.compress(pickler.getvalue())
+
+    def loads(self, blob):
+        unpickler = cPickle.Unpickler(StringIO(zlib.decompress(str(blob))))
+        unpickler.persistent_load = self._persistent_load
+        return unpickler.load()
+
+
+class SessionStore(object):
+    """
+    :param path: The SQLite database, by default an in memory database
+        which means sessions can't be shared between processes.
+    :param max_entries: How many sessions to keep deserialized in memory
+    :param timeout: Seconds of inactivity before a session is discarded
+    :param shared: Objects that are shared by all sessions and therefore
+        shouldn't be part of the serialized session data
+    """
+
+    def __init__(self, path=":memory:", max_entries=64, timeout=900,
+                 shared=None):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.serializer = Serializer(shared)
+        self.hot = OrderedDict()
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False,
+                                  isolation_level=None)
+        if path != ":memory:":
+            self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS session (sid TEXT PRIMARY KEY, "
+            "version INTEGER, accessed REAL, data BLOB)")
+        self.writes = 0
+
+    def _remember(self, sid, version, data):
+        self.hot.pop(sid, None)
+        self.hot[sid] = (version, data)
+        while len(self.hot) > self.max_entries:
+            self.hot.popitem(last=False)
+
+    def load(self, sid):
+        """
+        :return: The session data or None if there is no such session
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT version, accessed FROM session WHERE sid=?",
+                (sid,)).fetchone()
+            if row is None:
+                self.hot.pop(sid, None)
+                return None
+
+            version, accessed = row
+            if accessed < time.time() - self.timeout:
+                self._delete(sid)
+                return None
+
+            try:
+                _version, data = self.hot.pop(sid)
+            except KeyError:
+                pass
+            else:
+                if _version == version:
+                    self.hot[sid] = (version, data)
+                    return data
+
+            blob = self.db.execute("SELECT data FROM session WHERE sid=?",
+                                   (sid,)).fetchone()[0]
+
+        try:
+            data = self.serializer.loads(blob)
+        except Exception as err:
+            logger.error("Could not restore session %s: %s" % (sid, err))
+            self.delete(sid)
+            return None
+
+        with self.lock:
+            self._remember(sid, version, data)
+        return data
+
+    def save(self, sid, data):
+        blob = self.serializer.dumps(data)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT version FROM session WHERE sid=?",
+                                  (sid,)).fetchone()
+            version = row[0] + 1 if row else 1
+            self.db.execute(
+                "INSERT OR REPLACE INTO session (sid, version, accessed, data)"
+                " VALUES (?, ?, ?, ?)",
+                (sid, version, now, sqlite3.Binary(blob)))
+            self._remember(sid, version, data)
+
+            self.writes += 1
+            if self.writes % 100 == 0:
+                self.db.execute("DELETE FROM session WHERE accessed < ?",
+                                (now - self.timeout,))
+
+    def _delete(self, sid):
+        self.hot.pop(sid, None)
+        self.db.execute("DELETE FROM session WHERE sid=?", (sid,))
+
+    def delete(self, sid):
+        with self.lock:
+            self._delete(sid)
+
+
+class Session(dict):
+    """
+    The session as seen by the application, a dictionary that is written
+    back to the store at the end of each request.
+    """
+
+    def __init__(self, store, sid=None, data=None):
+        dict.__init__(self, data or {})
+        self.store = store
+        self.is_new = sid is None
+        self.id = sid or rndstr(32)
+
+    def save(self):
+        self.store.save(self.id, dict(self))
+
+    def invalidate(self):
+        self.store.delete(self.id)
+        self.clear()
+        self.id = rndstr(32)
+        self.is_new = True
+
+
+class SessionMiddleware(object):
+    """
+    WSGI middleware that places a Session instance in the environment.
+    By default under the same key as Beaker uses so it can be used as
+    a drop in replacement.
+    """
+
+    def __init__(self, app, store, cookie_name=COOKIE_NAME,
+                 environ_key="beaker.session"):
+        self.app = app
+        self.store = store
+        self.cookie_name = cookie_name
+        self.environ_key = environ_key
+
+    def _session(self, environ):
+        kaka = SimpleCookie()
+        try:
+            kaka.load(environ["HTTP_COOKIE"])
+        except KeyError:
+            pass
+
+        try:
+            sid = kaka[self.cookie_name].value
+        except KeyError:
+            pass
+        else:
+            data = self.store.load(sid)
+            if data is not None:
+                return Session(self.store, sid, data)
+
+        return Session(self.store)
+
+    def __call__(self, environ, start_response):
+        session = self._session(environ)
+        environ[self.environ_key] = session
+
+        def _start_response(status, headers, exc_info=None):
+            if session.is_new:
+                headers.append(("Set-Cookie", "%s=%s; Path=/; httponly" % (
+                    self.cookie_name, session.id)))
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.app(environ, _start_response)
+        finally:
+            session.save()
@@ -1,15 +1,18 @@
 #!/usr/bin/env python
 from oic.oic import OIDCONF_PATTERN
 from oic.utils.keyio import KeyBundle
+from oic.utils.keyio import UpdateFailed
 from oic.utils.keyio import dump_jwks
 from oic.utils.http_util import Response
 from oic.utils.webfinger import WebFinger
 from oic.utils.webfinger import OIC_ISSUER
 
 import copy
+import json
 from oic.oauth2.message import SchemeError
 from oic.oauth2.exception import NonFatalException
 
+from oictest.metadata import METADATA_CACHE
 from rrtest.request import BodyResponse
 from rrtest.request import GetRequest
 from rrtest.request import PostRequest
@@ -146,9 +149,13 @@ class DisplayIDToken(Notice):
 class FetchKeys(Process):
     def __call__(self, conv, **kwargs):
         pi = conv.client.provider_info
-        kb = KeyBundle(source=pi["jwks_uri"])
-        kb.verify_ssl = False
-        kb.update()
+        resp = METADATA_CACHE.fetch(pi["jwks_uri"], pi["issuer"],
+                                    conv.client.http_request,
+                                    conv.bypass_cache)
+        if resp.status_code != 200:
+            raise UpdateFailed(
+                "Fetching keys from '%s' failed" % pi["jwks_uri"])
+        kb = KeyBundle(json.loads(resp.text)["keys"])
 
         try:
             conv.keybundle.append(kb)
@@ -347,7 +354,8 @@ class Discover(Operation):
             self.trace.request("URL: %s" % OIDCONF_PATTERN % issuer)
 
         try:
-            pcr = client.provider_config(issuer)
+            pcr = METADATA_CACHE.provider_config(client, issuer,
+                                                 self.conv.bypass_cache)
         except NonFatalException as err:
             pcr = err.resp
             self.trace.info("Warning: {}".format(err.msg))
@@ -0,0 +1,157 @@
+"""
+Buffered writing of the trace logs kept by the OP used when testing RPs.
+
+Every call to an OP endpoint adds to the log of the test the RP is running.
+Instead of opening, writing and closing the log file each time, text is
+buffered per file and written by a background thread. A bounded number of
+files are kept open. When a test is done its log is flushed and synced to
+disc. A log that grows beyond a size limit is rotated.
+"""
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = 65536
+
+
+class TraceLog(object):
+    """
+    :param max_open: Max number of files kept open
+    :param max_size: Size in bytes a log file may grow to before it's
+        rotated, 0 means no limit
+    :param backups: Number of rotated files kept, <path>.1 is the newest
+    :param interval: Seconds between writes by the background thread
+    :param created: If given, called with the path of every new log file
+    """
+
+    def __init__(self, max_open=32, max_size=10485760, backups=3,
+                 interval=1.0, created=None):
+        self.max_open = max_open
+        self.max_size = max_size
+        self.backups = backups
+        self.interval = interval
+        self.created = created
+        self.buffers = {}
+        self.handles = OrderedDict()
+        self.written = weakref.WeakKeyDictionary()
+        self.lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def _start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run,
+                                           name="trace-log-flusher")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as err:
+                logger.error("Flushing trace logs failed: %s" % err)
+
+    def _handle(self, path):
+        try:
+            fp = self.handles.pop(path)
+        except KeyError:
+            _dir = os.path.dirname(path)
+            if _dir and not os.path.isdir(_dir):
+                os.makedirs(_dir)
+            _new = not os.path.exists(path)
+            fp = open(path, "a")
+            if _new and self.created:
+                self.created(path)
+            while len(self.handles) >= self.max_open:
+                _, _fp = self.handles.popitem(last=False)
+                _fp.close()
+        self.handles[path] = fp
+        return fp
+
+    def _rotate(self, path):
+        try:
+            self.handles.pop(path).close()
+        except KeyError:
+            pass
+        for i in range(self.backups - 1, 0, -1):
+            _src = "%s.%d" % (path, i)
+            if os.path.exists(_src):
+                os.rename(_src, "%s.%d" % (path, i + 1))
+        if self.backups:
+            os.rename(path, "%s.1" % path)
+        else:
+            os.unlink(path)
+
+    def _flush(self, path, sync=False):
+        data = "".join(self.buffers.pop(path, []))
+        if not data and not sync:
+            return
+
+        fp = self._handle(path)
+        if self.max_size:
+            _size = os.fstat(fp.fileno()).st_size
+            if _size and _size + len(data) > self.max_size:
+                self._rotate(path)
+                fp = self._handle(path)
+        fp.write(data)
+        fp.flush()
+        if sync:
+            os.fsync(fp.fileno())
+
+    def append(self, path, text):
+        with self.lock:
+            _buf = self.buffers.setdefault(path, [])
+            _buf.append(text)
+            if sum([len(t) for t in _buf]) > BUFFER_SIZE:
+                self._flush(path)
+        self._start()
+
+    def write(self, path, trace):
+        """
+        Add the events in trace that haven't been written before.
+        """
+        start = self.written.get(trace, 0)
+        lines = trace[start:]
+        self.written[trace] = start + len(lines)
+        if lines:
+            self.append(path, "\n".join(
+                [l.encode("utf-8", "replace") for l in lines]) + "\n\n")
+
+    def flush(self, path=None):
+        """
+        Write what's buffered, for one file or all of them.
+        """
+        with self.lock:
+            if path is None:
+                for _path in self.buffers.keys():
+                    self._flush(_path)
+            else:
+                self._flush(path)
+
+    def end(self, path):
+        """
+        The test is done, write everything to disc and close the file.
+        """
+        with self.lock:
+            if path not in self.buffers and path not in self.handles:
+                return
+            self._flush(path, sync=True)
+            self.handles.pop(path).close()
+
+    def close(self):
+        self.stopped.set()
+        with self.lock:
+            for path in self.buffers.keys():
+                self._flush(path)
+            for fp in self.handles.values():
+                fp.flush()
+                os.fsync(fp.fileno())
+                fp.close()
+            self.handles.clear()
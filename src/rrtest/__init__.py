@@ -34,77 +34,167 @@ def jwt_to_dict(resp):
     return _d
 
 
+def message_repr(resp):
+    """
+    The class name and a dictionary representation of a protocol message
+    as they should appear in a trace.
+
+    :return: (class name, dictionary) tuple or None if resp isn't a message
+    """
+    cl_name = resp.__class__.__name__
+    if cl_name == "IdToken":
+        return cl_name, {"id_token": jwt_to_dict(resp)}
+
+    try:
+        dat = resp.to_dict()
+    except AttributeError:
+        return None
+
+    if cl_name == "OpenIDSchema":
+        cl_name = "UserInfo"
+        if resp.jws_header or resp.jwe_header:
+            dat = jwt_to_dict(resp)
+    elif "id_token" in dat:
+        dat["id_token"] = jwt_to_dict(resp["id_token"])
+    return cl_name, dat
+
+
+# Trace event kinds
+TEXT = "text"
+INFO = "info"
+ERROR = "error"
+WARNING = "warning"
+MESSAGE = "message"
+
+EVENT_FORMAT = {
+    TEXT: "%f %s %s",
+    INFO: "%f%s %s",
+    ERROR: "%f%s [ERROR] %s",
+    WARNING: "%f%s [WARNING] %s"
+}
+
+
 class Trace(object):
+    """
+    What happened during a test. Events are kept as
+    (time since start, direction, kind, payload) tuples where the direction
+    is '-->' for requests, '<--' for replies and responses and '' otherwise.
+    Protocol messages are kept as references to the message instances and
+    only formatted when the trace is rendered.
+    """
+
     def __init__(self):
-        self.trace = []
+        self.events = []
         self.start = time.time()
 
+    def _add(self, direction, kind, payload):
+        self.events.append((time.time() - self.start, direction, kind,
+                            payload))
+
     def request(self, msg):
-        delta = time.time() - self.start
-        self.trace.append("%f --> %s" % (delta, msg))
+        self._add("-->", TEXT, msg)
 
     def reply(self, msg):
-        delta = time.time() - self.start
-        self.trace.append("%f <-- %s" % (delta, msg))
+        self._add("<--", TEXT, msg)
 
     def response(self, resp):
-        delta = time.time() - self.start
-        try:
-            cl_name = resp.__class__.__name__
-        except AttributeError:
-            cl_name = ""
-
-        if cl_name == "IdToken":
-            txt = json.dumps({"id_token": jwt_to_dict(resp)},
-                             sort_keys=True, indent=2, separators=(',', ': '))
-            self.trace.append("%f %s: %s" % (delta, cl_name, txt))
-        else:
-            try:
-                dat = resp.to_dict()
-            except AttributeError:
-                txt = resp
-                self.trace.append("%f %s" % (delta, txt))
-            else:
-                if cl_name == "OpenIDSchema":
-                    cl_name = "UserInfo"
-                    if resp.jws_header or resp.jwe_header:
-                        dat = jwt_to_dict(resp)
-                elif "id_token" in dat:
-                    dat["id_token"] = jwt_to_dict(resp["id_token"])
-
-                txt = json.dumps(dat, sort_keys=True, indent=2,
-                                 separators=(',', ': '))
-
-                self.trace.append("%f %s: %s" % (delta, cl_name, txt))
+        self._add("<--", MESSAGE, resp)
 
     def info(self, msg):
-        delta = time.time() - self.start
-        self.trace.append("%f %s" % (delta, msg))
+        self._add("", INFO, msg)
 
     def error(self, msg):
-        delta = time.time() - self.start
-        self.trace.append("%f [ERROR] %s" % (delta, msg))
+        self._add("", ERROR, msg)
 
     def warning(self, msg):
-        delta = time.time() - self.start
-        self.trace.append("%f [WARNING] %s" % (delta, msg))
+        self._add("", WARNING, msg)
+
+    @staticmethod
+    def render(event):
+        """
+        :return: The text representation of an event
+        """
+        delta, direction, kind, payload = event
+        if kind == MESSAGE:
+            _repr = message_repr(payload)
+            if _repr is None:
+                return "%f %s" % (delta, payload)
+            txt = json.dumps(_repr[1], sort_keys=True, indent=2,
+                             separators=(',', ': '))
+            return "%f %s: %s" % (delta, _repr[0], txt)
+        return EVENT_FORMAT[kind] % (delta, direction, payload)
+
+    @staticmethod
+    def event_dict(event):
+        """
+        :return: A dictionary representation of an event that can be
+            serialized as JSON
+        """
+        delta, direction, kind, payload = event
+        res = {"time": delta, "kind": kind}
+        if direction:
+            res["direction"] = direction
+        if kind == MESSAGE:
+            _repr = message_repr(payload)
+            if _repr is None:
+                res["kind"] = INFO
+                res["payload"] = "%s" % payload
+            else:
+                res["class"], res["payload"] = _repr
+        elif isinstance(payload, basestring):
+            res["payload"] = payload
+        else:
+            res["payload"] = "%s" % (payload,)
+        return res
+
+    def jsonl(self, start=0):
+        """
+        The trace as JSON lines, one event per line
+
+        :param start: The index of the first event to export
+        """
+        for event in self.events[start:]:
+            yield json.dumps(self.event_dict(event), sort_keys=True) + "\n"
+
+    @property
+    def trace(self):
+        """ The rendered trace """
+        return [self.render(e) for e in self.events]
+
+    def load(self, lines):
+        """
+        Restore a trace from rendered lines.
+        """
+        self.events = []
+        for line in lines:
+            delta, txt = line.split(" ", 1)
+            self.events.append((float(delta), "", INFO, txt))
 
     def __str__(self):
-        return "\n". join([t.encode("utf-8", 'replace') for t in self.trace])
+        return "\n". join([t.encode("utf-8", 'replace') for t in self])
 
     def clear(self):
-        self.trace = []
+        self.events = []
+
+    def __len__(self):
+        return len(self.events)
 
     def __getitem__(self, item):
-        return self.trace[item]
+        if isinstance(item, slice):
+            return [self.render(e) for e in self.events[item]]
+        return self.render(self.events[item])
+
+    def __iter__(self):
+        for event in self.events:
+            yield self.render(event)
 
     def next(self):
-        for line in self.trace:
-            yield line
+        for event in self.events:
+            yield self.render(event)
 
     def lastline(self):
         try:
-            return self.trace[-1]
+            return self.render(self.events[-1])
         except IndexError:
             return ""
 
@@ -1,4 +1,3 @@
-import inspect
 import json
 #from oic.oauth2 import SUCCESSFUL
 from oic.oauth2.message import ErrorResponse
@@ -9,6 +8,7 @@ __author__ = 'rolandh'
 
 import traceback
 import sys
+from collections import OrderedDict
 
 INFORMATION = 0
 OK = 1
@@ -25,16 +25,98 @@ CONT_JWT = "application/jwt"
 
 
 def get_protocol_response(conv, cls):
-    res = []
-    for instance, msg in conv.protocol_response:
-        if isinstance(instance, cls):
-            res.append((instance, msg))
-    return res
+    try:
+        return conv.protocol_response.all(cls)
+    except AttributeError:  # a plain list
+        return [(inst, msg) for inst, msg in conv.protocol_response if
+                isinstance(inst, cls)]
+
+
+def doc_name(doc):
+    """ The docstring of a check joined into one line """
+    try:
+        return " ".join([s.strip() for s in doc.strip().split("\n")])
+    except AttributeError:
+        return ""
+
+
+class Registry(object):
+    """
+    All checks by namespace and check id. The namespace of a check is the
+    name of the module it's defined in. A namespace can extend other
+    namespaces in which case its own checks override those with the same
+    id in the namespaces it extends.
+    """
+
+    def __init__(self):
+        self.checks = {}
+        self.bases = {}
+        self._view = {}
+
+    def add(self, cls):
+        # Only classes that define their own id, a subclass that inherits
+        # the id of its parent must be referred to by class.
+        try:
+            cid = cls.__dict__["cid"]
+        except KeyError:
+            return
+        try:
+            self.checks[cls.__module__][cid] = cls
+        except KeyError:
+            self.checks[cls.__module__] = OrderedDict([(cid, cls)])
+        self._view = {}
+
+    def extend(self, namespace, *bases):
+        self.bases[namespace] = bases
+        self._view = {}
+
+    def view(self, namespace):
+        """
+        :return: dictionary with all the checks that are visible in a
+            namespace keyed by check id
+        """
+        try:
+            return self._view[namespace]
+        except KeyError:
+            pass
+
+        res = {}
+        for base in self.bases.get(namespace, ()):
+            res.update(self.view(base))
+        res.update(self.checks.get(namespace, {}))
+        self._view[namespace] = res
+        return res
+
+    def get(self, cid, namespace):
+        return self.view(namespace).get(cid)
+
+    def describe(self, namespace):
+        """
+        :return: list of dictionaries with id, name, mti and class of all the
+            checks in a namespace sorted by id
+        """
+        return [{"id": cid, "name": cls.doc_name, "mti": cls.mti,
+                 "class": cls.__name__}
+                for cid, cls in sorted(self.view(namespace).items())]
+
+
+REGISTRY = Registry()
+
+
+class CheckMeta(type):
+    """ Registers checks and caches their descriptions when they are defined
+    """
+
+    def __init__(cls, name, bases, attrs):
+        super(CheckMeta, cls).__init__(name, bases, attrs)
+        cls.doc_name = doc_name(attrs.get("__doc__"))
+        REGISTRY.add(cls)
 
 
 class Check(object):
     """ General test
     """
+    __metaclass__ = CheckMeta
 
     cid = "check"
     msg = "OK"
@@ -57,16 +139,10 @@ class Check(object):
         return _stat
 
     def response(self, **kwargs):
-        try:
-            name = " ".join(
-                [s.strip() for s in self.__doc__.strip().split("\n")])
-        except AttributeError:
-            name = ""
-
         res = {
             "id": self.cid,
             "status": self._status,
-            "name": name,
+            "name": self.doc_name,
             "mti": self.mti
         }
 
@@ -622,16 +698,5 @@ class VerifyResponse(ExpectedError):
         return {}
 
 
-def factory(cid, classes):
-    if len(classes) == 0:
-        for name, obj in inspect.getmembers(sys.modules[__name__]):
-            if inspect.isclass(obj):
-                try:
-                    classes[obj.cid] = obj
-                except AttributeError:
-                    pass
-
-    if cid in classes:
-        return classes[cid]
-    else:
-        return None
+def factory(cid):
+    return REGISTRY.get(cid, __name__)
@@ -0,0 +1,98 @@
+"""
+Drives many conversations at the same time.
+
+Every conversation is advanced one phase at a time using
+Conversation.steps(). A fixed number of worker threads take turns picking
+the next conversation that is ready, so a process can keep hundreds of
+conversations going while waiting on slow OPs without having one thread per
+conversation. Checks are run by the conversations themselves, just as when
+Conversation.do_sequence() is used.
+"""
+import logging
+import threading
+import traceback
+import Queue
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+
+class Engine(object):
+    """
+    :param workers: Number of threads, the number of conversations that can
+        be waiting for a response at any one time. The shared HTTP
+        transport (rrtest.transport) should have a pool at least as large.
+    :param done: If given, called as done(key, conv, err) when a
+        conversation has finished, err is None if it ran to the end.
+    """
+
+    def __init__(self, workers=8, done=None):
+        self.workers = workers
+        self.done = done
+        self.conversations = []
+
+    def add(self, key, conv, oper):
+        """
+        :param key: What the conversation is known as in the result
+        :param conv: A Conversation instance
+        :param oper: The test specification as given to do_sequence()
+        """
+        self.conversations.append((key, conv, oper))
+
+    def run(self):
+        """
+        Runs all added conversations to the end.
+
+        :return: dictionary with the key as key and (conversation, exception)
+            as value, the exception is None if the conversation ended
+            normally
+        """
+        result = {}
+        if not self.conversations:
+            return result
+
+        ready = Queue.Queue()
+        for key, conv, oper in self.conversations:
+            ready.put((key, conv, conv.steps(oper)))
+        self.conversations = []
+        _total = ready.qsize()
+        lock = threading.Lock()
+
+        def finish(key, conv, err):
+            with lock:
+                result[key] = (conv, err)
+                if len(result) == _total:
+                    for _ in range(self.workers):
+                        ready.put(None)
+            if self.done:
+                try:
+                    self.done(key, conv, err)
+                except Exception:
+                    logger.error(traceback.format_exc())
+
+        def worker():
+            while True:
+                item = ready.get()
+                if item is None:
+                    return
+                key, conv, steps = item
+                try:
+                    steps.next()
+                except StopIteration:
+                    finish(key, conv, None)
+                except Exception as err:
+                    logger.debug(traceback.format_exc())
+                    finish(key, conv, err)
+                else:
+                    ready.put(item)  # back in line for its next phase
+
+        threads = [threading.Thread(target=worker, name="conv-worker-%d" % i)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return result
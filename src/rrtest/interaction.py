@@ -1,10 +1,13 @@
 __author__ = 'rohe0002'
 
 import json
+import threading
+from collections import OrderedDict
 from urlparse import urlparse
 import re
 
 from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 from mechanize import ParseResponseEx
 from mechanize import AmbiguityError
 from mechanize._form import ControlNotFoundError
@@ -92,39 +95,144 @@ class RResponse():
             return self.text
 
 
+# html.parser, unlike html5lib, honours parse_only
+TITLE_ONLY = SoupStrainer("title")
+PAGE_CACHE_SIZE = 64
+
+
+class PageCache(object):
+    """
+    What has been extracted from a page, keyed by the page content. The same
+    login and consent pages are seen over and over again.
+    """
+
+    def __init__(self, size=PAGE_CACHE_SIZE):
+        self.size = size
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    def title(self, content):
+        """
+        :return: The contents of the title element as a tuple or None if the
+            page has no title.
+        """
+        with self.lock:
+            try:
+                _title = self.pages.pop(content)
+            except KeyError:
+                pass
+            else:
+                self.pages[content] = _title
+                return _title
+
+        _bs = BeautifulSoup(content, "html.parser", parse_only=TITLE_ONLY)
+        if _bs.title is None:
+            _title = None
+        else:
+            _title = tuple(_bs.title.contents)
+
+        with self.lock:
+            self.pages[content] = _title
+            while len(self.pages) > self.size:
+                self.pages.popitem(last=False)
+        return _title
+
+
+PAGES = PageCache()
+
+
+def title_match(val, title):
+    if val in title:
+        return 1
+    _match = 0
+    for _line in title:
+        if val in _line:
+            _match += 1
+    return _match
+
+
+class Matcher(object):
+    """
+    The interaction specifications indexed by URL. Specifications with
+    something else then url, title and content to match on are never used
+    by pick_interaction and are left out.
+    """
+
+    def __init__(self, interactions):
+        self.by_url = {}
+        self.anywhere = []
+        for pos, interaction in enumerate(interactions):
+            _matches = interaction["matches"]
+            if set(_matches.keys()) - set(["url", "title", "content"]):
+                continue
+            try:
+                self.by_url.setdefault(_matches["url"], []).append(
+                    (pos, interaction))
+            except KeyError:
+                self.anywhere.append((pos, interaction))
+
+    def candidates(self, url):
+        try:
+            _cand = self.by_url[url]
+        except KeyError:
+            return [i for p, i in self.anywhere]
+        if not self.anywhere:
+            return [i for p, i in _cand]
+        return [i for p, i in sorted(_cand + self.anywhere)]
+
+
+def parse_forms(response, orig_response=None):
+    """
+    The forms on a page, parsed once per response.
+
+    :param response: A response that mechanize can handle
+    :param orig_response: The response (as returned by requests) the forms
+        are kept with.
+    :return: What ParseResponseEx returns
+    """
+    try:
+        return orig_response._rr_forms
+    except AttributeError:
+        pass
+    forms = ParseResponseEx(response)
+    if orig_response is not None:
+        orig_response._rr_forms = forms
+    return forms
+
+
 class Interaction(object):
     def __init__(self, httpc, interactions=None):
         self.httpc = httpc
         self.interactions = interactions
+        self._matcher = None
+        self._indexed = None
+
+    def matcher(self):
+        _key = (id(self.interactions), len(self.interactions))
+        if self._indexed != _key:
+            self._matcher = Matcher(self.interactions)
+            self._indexed = _key
+        return self._matcher
 
     def pick_interaction(self, _base="", content="", req=None):
         unic = content
-        if content:
-            _bs = BeautifulSoup(content)
-        else:
-            _bs = None
+        _title = None
+        _parsed = False
 
-        for interaction in self.interactions:
+        for interaction in self.matcher().candidates(_base):
             _match = 0
             for attr, val in interaction["matches"].items():
                 if attr == "url":
-                    if val == _base:
-                        _match += 1
+                    _match += 1
                 elif attr == "title":
-                    if _bs is None:
+                    if not content:
                         break
-                    if _bs.title is None:
+                    if not _parsed:
+                        _title = PAGES.title(content)
+                        _parsed = True
+                    if _title is None:
                         break
-                    if val in _bs.title.contents:
-                        _match += 1
-                    else:
-                        _c = _bs.title.contents
-                        if isinstance(_c, list) and not isinstance(_c,
-                                                                   basestring):
-                            for _line in _c:
-                                if val in _line:
-                                    _match += 1
-                                    continue
+                    _match += title_match(val, _title)
                 elif attr == "content":
                     if unic and val in unic:
                         _match += 1
@@ -144,7 +252,7 @@ class Interaction(object):
         :return: The picked form or None of no form matched the criteria.
         """
 
-        forms = ParseResponseEx(response)
+        forms = parse_forms(response, response._resp)
         if not forms:
             raise FlowException(content=response.text, url=url)
 
@@ -4,10 +4,11 @@ import json
 
 from urlparse import urlparse
 
-from mechanize import ParseResponseEx
 from mechanize._form import ControlNotFoundError, AmbiguityError
 from mechanize._form import ListControl
 
+from rrtest.interaction import parse_forms
+
 
 class FlowException(Exception):
     def __init__(self, function="", content="", url=""):
@@ -123,17 +124,18 @@ def do_request(client, url, method, body="", headers=None, trace=False):
     return url, response, response.text
 
 
-def pick_form(response, content, url=None, **kwargs):
+def pick_form(response, content, url=None, orig_response=None, **kwargs):
     """
     Picks which form in a web-page that should be used
 
     :param response: A HTTP request response. A DResponse instance
     :param content: The HTTP response content
     :param url: The url the request was sent to
+    :param orig_response: The response as returned by requests
     :return: The picked form or None of no form matched the criteria.
     """
 
-    forms = ParseResponseEx(response)
+    forms = parse_forms(response, orig_response)
     if not forms:
         raise FlowException(content=content, url=url)
 
@@ -255,7 +257,8 @@ def select_form(client, orig_response, content, **kwargs):
     response = DResponse(status=orig_response.status_code, url=_url)
     response.write(content)
 
-    form = pick_form(response, content, _url, **kwargs)
+    form = pick_form(response, content, _url, orig_response=orig_response,
+                     **kwargs)
     #form.backwards_compatible = False
     if not form:
         raise Exception("Can't pick a form !!")
@@ -328,7 +331,8 @@ def post_form(client, orig_response, content, **kwargs):
     response = DResponse(status=orig_response.status_code, url=_url)
     response.write(content)
 
-    form = pick_form(response, content, _url, **kwargs)
+    form = pick_form(response, content, _url, orig_response=orig_response,
+                     **kwargs)
 
     return do_click(client, form, **kwargs)
 
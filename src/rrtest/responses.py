@@ -0,0 +1,82 @@
+__author__ = 'roland'
+
+
+class ResponseStore(object):
+    """
+    The protocol messages received during a conversation in the order they
+    were received, as (instance, raw message) tuples. Apart from behaving
+    as a list the responses are also indexed by message class, which
+    includes all the classes the message class inherits from so lookups
+    match what isinstance() would.
+    """
+
+    def __init__(self, items=None):
+        self.items = []
+        self.index = {}
+        self._memo = {}
+        for item in items or []:
+            self.append(item)
+
+    def append(self, item):
+        self.items.append(item)
+        for cls in type(item[0]).__mro__:
+            try:
+                self.index[cls].append(item)
+            except KeyError:
+                self.index[cls] = [item]
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, item):
+        return self.items[item]
+
+    def all(self, cls):
+        """
+        :return: list of (instance, raw message) tuples for all the
+            responses that are instances of cls
+        """
+        return list(self.index.get(cls, []))
+
+    def latest(self, cls):
+        """
+        :return: The last (instance, raw message) tuple that is an instance
+            of cls or None if there is none
+        """
+        try:
+            return self.index[cls][-1]
+        except KeyError:
+            return None
+
+    def memo(self, key, func):
+        """
+        Something derived from the responses, only recomputed when
+        responses have been added.
+
+        :param key: What the derived value is cached under
+        :param func: Function that given the store computes the value
+        """
+        try:
+            size, val = self._memo[key]
+        except KeyError:
+            pass
+        else:
+            if size == len(self.items):
+                return val
+
+        val = func(self)
+        self._memo[key] = (len(self.items), val)
+        return val
+
+    def __getstate__(self):
+        # Derived values may not be picklable and are cheap to redo
+        _state = self.__dict__.copy()
+        _state["_memo"] = {}
+        return _state
@@ -0,0 +1,156 @@
+"""
+Request routing for the WSGI applications.
+
+A route is a regular expression, a callback and optionally the HTTP methods
+the callback accepts. The routes are compiled into one regular expression,
+with a named group per route, that is matched once per request instead of
+trying the routes one by one. The result is the same as walking a list of
+(regex, callback) with re.search, the first route, in the order they were
+added, that matches anywhere in the path wins.
+
+Paths that must match exactly are kept in a dictionary which is looked in
+before the regular expression is tried.
+"""
+import logging
+import re
+import threading
+
+from oic.utils.http_util import NotSupported
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+# Python's re module allows at most 100 named groups per expression
+MAX_GROUPS = 99
+
+
+class MethodNotAllowed(Exception):
+    def __init__(self, path, allowed):
+        Exception.__init__(self, path)
+        self.allowed = allowed
+
+
+class Route(object):
+    def __init__(self, regex, callback, methods=None):
+        self.regex = regex
+        self.pattern = re.compile(regex)  # catch syntax errors early
+        self.callback = callback
+        if methods:
+            methods = set([m.upper() for m in methods])
+            if "GET" in methods:
+                methods.add("HEAD")
+            self.methods = frozenset(methods)
+        else:
+            self.methods = None
+
+    def allowed(self, method):
+        return self.methods is None or method in self.methods
+
+
+class Router(object):
+    """
+    :param routes: (regex, callback) or (regex, callback, methods) tuples
+    """
+
+    def __init__(self, routes=None):
+        self.routes = []
+        self.exact = {}
+        self._compiled = None
+        self._lock = threading.Lock()
+        for route in routes or []:
+            self.add(*route)
+
+    def add(self, regex, callback, methods=None):
+        """
+        Add a route that is tried after the ones already added.
+        """
+        with self._lock:
+            self.routes.append(Route(regex, callback, methods))
+            self._compiled = None
+
+    def path(self, path, callback, methods=None):
+        """
+        Add a route for a path that must match exactly. These are tried
+        before the regular expression routes.
+        """
+        with self._lock:
+            self.exact[path] = Route("^%s$" % re.escape(path), callback,
+                                     methods)
+
+    def _compile(self):
+        """
+        Splits the routes into as few expressions as the group limit
+        allows. Every route is preceded by a lazy match of anything, that
+        way each alternative is tried at every position in the path before
+        the next one is.
+
+        :return: list of (compiled expression, {group name: (route, index
+            of the route's first own group)})
+        """
+        res = []
+        parts = []
+        names = {}
+        groups = 0
+        for i, route in enumerate(self.routes):
+            _need = route.pattern.groups + 1
+            if parts and groups + _need > MAX_GROUPS:
+                res.append((re.compile("|".join(parts)), names))
+                parts, names, groups = [], {}, 0
+            name = "_r%d" % i
+            parts.append(r"[\s\S]*?(?P<%s>%s)" % (name, route.regex))
+            groups += _need
+            names[name] = (route, groups - route.pattern.groups + 1)
+        if parts:
+            res.append((re.compile("|".join(parts)), names))
+        return res
+
+    def resolve(self, path, method=None):
+        """
+        :param path: The path, without the leading '/'
+        :param method: The HTTP method, if given it's checked against the
+            methods the matching route allows
+        :return: (callback, url_args) or None if no route matches. url_args
+            is the first group of the route's regular expression or the
+            whole path if there is none.
+        :raise: MethodNotAllowed if the route doesn't accept the method
+        """
+        try:
+            route = self.exact[path]
+        except KeyError:
+            pass
+        else:
+            return self._result(route, path, method, path)
+
+        compiled = self._compiled
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled = self._compile()
+
+        for regex, names in compiled:
+            match = regex.match(path)
+            if match is None:
+                continue
+            # the route's group is the outermost so it closes last
+            route, first = names[match.lastgroup]
+            if route.pattern.groups:
+                url_args = match.group(first)
+            else:
+                url_args = path
+            return self._result(route, path, method, url_args)
+        return None
+
+    @staticmethod
+    def _result(route, path, method, url_args):
+        if method is not None and not route.allowed(method):
+            raise MethodNotAllowed(path, sorted(route.methods))
+        return route.callback, url_args
+
+
+def not_allowed(err):
+    """
+    :param err: A MethodNotAllowed instance
+    :return: A 405 response listing the methods that are allowed
+    """
+    return NotSupported("Method not allowed",
+                        headers=[("Allow", ", ".join(err.allowed))])
@@ -0,0 +1,238 @@
+"""
+Serving files from disc.
+
+Small files, style sheets, scripts, icons, JWKS documents, are kept in
+memory. Larger ones, test logs and tar archives, are handed to the server
+using wsgi.file_wrapper if there is one, so they can be sent with
+sendfile(). Responses carry Content-Length, ETag, Last-Modified and
+Cache-Control and conditional and Range requests are supported.
+"""
+import logging
+import os
+import stat
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from email.utils import mktime_tz
+from email.utils import parsedate_tz
+
+from oic.utils.http_util import NotFound
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+CTYPE_MAP = {
+    "css": "text/css",
+    "gif": "image/gif",
+    "html": "text/html",
+    "ico": "image/x-icon",
+    "jpg": "image/jpeg",
+    "js": "text/javascript",
+    "json": "application/json",
+    "jwt": "application/jwt",
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "tar": "application/x-tar",
+    "txt": "text/plain",
+    "woff": "application/font-woff",
+    "xml": "text/xml",
+}
+
+DEFAULT_CTYPE = "text/plain"
+
+# Files that don't change while the server is running
+CACHEABLE = ["css", "gif", "ico", "jpg", "js", "png", "svg", "woff"]
+
+SMALL_FILE = 65536
+BLOCK_SIZE = 65536
+
+
+def content_type(path):
+    try:
+        return CTYPE_MAP[path.rsplit(".", 1)[1].lower()]
+    except (IndexError, KeyError):
+        return DEFAULT_CTYPE
+
+
+def byte_range(header, size):
+    """
+    :param header: The value of a Range header
+    :param size: The size of the file
+    :return: (first, last) byte, None if the header should be ignored and
+        the whole file sent, or False if the range can't be satisfied.
+    """
+    try:
+        unit, spec = header.split("=", 1)
+    except ValueError:
+        return None
+    if unit.strip() != "bytes" or "," in spec:  # only one range supported
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            _len = int(last)
+            if _len <= 0:
+                return False
+            return max(0, size - _len), size - 1
+        first = int(first)
+        last = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if first >= size:
+        return False
+    if last < first:
+        return None
+    return first, min(last, size - 1)
+
+
+def read_part(fp, length, block=BLOCK_SIZE):
+    try:
+        while length > 0:
+            data = fp.read(min(block, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        fp.close()
+
+
+class StaticFiles(object):
+    """
+    :param small: Files at most this large are kept in memory
+    :param entries: Max number of files kept in memory
+    :param max_age: How long clients may use cacheable files without asking
+    """
+
+    def __init__(self, small=SMALL_FILE, entries=256, max_age=3600):
+        self.small = small
+        self.entries = entries
+        self.max_age = max_age
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _content(self, path, version):
+        with self.lock:
+            try:
+                _version, text = self.cache.pop(path)
+            except KeyError:
+                pass
+            else:
+                if _version == version:
+                    self.cache[path] = (version, text)
+                    return text
+
+        text = open(path, "rb").read()
+        with self.lock:
+            self.cache[path] = (version, text)
+            while len(self.cache) > self.entries:
+                self.cache.popitem(last=False)
+        return text
+
+    def not_modified(self, environ, etag, mtime):
+        try:
+            _inm = environ["HTTP_IF_NONE_MATCH"]
+        except KeyError:
+            pass
+        else:
+            return _inm.strip() == "*" or etag in [
+                t.strip() for t in _inm.split(",")]
+
+        try:
+            _ims = parsedate_tz(environ["HTTP_IF_MODIFIED_SINCE"])
+        except KeyError:
+            return False
+        if _ims is None:
+            return False
+        return int(mtime) <= mktime_tz(_ims)
+
+    def __call__(self, environ, start_response, path):
+        logger.info("[static]sending: %s" % (path,))
+
+        try:
+            _stat = os.stat(path)
+        except OSError:
+            _stat = None
+        if _stat is None or not stat.S_ISREG(_stat.st_mode):
+            resp = NotFound()
+            return resp(environ, start_response)
+
+        size = _stat.st_size
+        etag = '"%x-%x"' % (int(_stat.st_mtime * 1000000), size)
+        headers = [("ETag", etag),
+                   ("Last-Modified", formatdate(_stat.st_mtime, usegmt=True)),
+                   ("Accept-Ranges", "bytes")]
+        _ctype = content_type(path)
+        if path.rsplit(".", 1)[-1].lower() in CACHEABLE:
+            headers.append(("Cache-Control", "max-age=%d" % self.max_age))
+        else:
+            headers.append(("Cache-Control", "no-cache"))
+
+        if self.not_modified(environ, etag, _stat.st_mtime):
+            start_response("304 Not Modified", headers)
+            return []
+
+        _range = None
+        if "HTTP_RANGE" in environ:
+            _if_range = environ.get("HTTP_IF_RANGE")
+            if _if_range is None or _if_range == etag:
+                _range = byte_range(environ["HTTP_RANGE"], size)
+        if _range is False:
+            headers.append(("Content-Range", "bytes */%d" % size))
+            start_response("416 Requested Range Not Satisfiable", headers)
+            return []
+
+        if _range:
+            first, last = _range
+            status = "206 Partial Content"
+            headers.append(("Content-Range",
+                            "bytes %d-%d/%d" % (first, last, size)))
+        else:
+            first, last = 0, size - 1
+            status = "200 OK"
+        length = last - first + 1
+        headers.extend([("Content-Type", _ctype),
+                        ("Content-Length", str(length))])
+
+        try:
+            if size <= self.small:
+                text = self._content(path, (_stat.st_mtime, size))
+                body = [text[first:last + 1]]
+            else:
+                fp = open(path, "rb")
+                if _range:
+                    fp.seek(first)
+                    body = read_part(fp, length)
+                else:
+                    try:
+                        body = environ["wsgi.file_wrapper"](fp, BLOCK_SIZE)
+                    except KeyError:
+                        body = read_part(fp, length)
+        except IOError:
+            resp = NotFound()
+            return resp(environ, start_response)
+
+        start_response(status, headers)
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            if hasattr(body, "close"):
+                body.close()
+            return []
+        return body
+
+
+STATIC = StaticFiles()
+
+
+class FileResponse(object):
+    """
+    For applications where the handlers return Response instances.
+    """
+
+    def __init__(self, path, files=STATIC):
+        self.path = path
+        self.files = files
+
+    def __call__(self, environ, start_response, **kwargs):
+        return self.files(environ, start_response, self.path)
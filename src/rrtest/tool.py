@@ -14,6 +14,7 @@ from rrtest.check import INTERACTION
 from rrtest.interaction import Interaction
 from rrtest.interaction import Action
 from rrtest.interaction import InteractionNeeded
+from rrtest.responses import ResponseStore
 from rrtest.status import STATUSCODE
 
 
@@ -45,7 +46,7 @@ class Conversation(object):
                      "rp": cookielib.MozillaCookieJar(),
                      "service": cookielib.MozillaCookieJar()}
 
-        self.protocol_response = []
+        self.protocol_response = ResponseStore()
         self.last_response = None
         self.last_content = None
         self.response = None
@@ -65,6 +66,7 @@ class Conversation(object):
         self.req = None
         self.request_spec = None
         self.last_url = ""
+        self.bypass_cache = False
         self.state = rndstr()
 
     def check_severity(self, stat):
@@ -291,6 +293,15 @@ class Conversation(object):
             self.handle_result()
 
     def do_sequence(self, oper):
+        for _ in self.steps(oper):
+            pass
+
+    def steps(self, oper):
+        """
+        Runs the sequence one phase at a time, yields the index of the
+        phase after it has been run. Used by rrtest.engine to interleave
+        conversations.
+        """
         self.sequence = oper
         try:
             self.test_sequence(oper["tests"]["pre"])
@@ -306,6 +317,7 @@ class Conversation(object):
             if not isinstance(phase, tuple):
                 _proc = phase()
                 _proc(self)
+                yield i
                 continue
 
             self.init(phase)
@@ -352,6 +364,7 @@ class Conversation(object):
                     if self.request_spec.request == "AuthorizationRequest":
                         self.cjar["browser"].save(
                             self.extra_args["cookie_exp"], ignore_discard=True)
+            yield i
 
         try:
             self.test_sequence(oper["tests"]["post"])
@@ -389,7 +402,7 @@ class Conversation(object):
         txt = open(filename).read()
         state = json.loads(txt)
         self.trace.start = state["trace_log"]["start"]
-        self.trace.trace = state["trace_log"]["trace"]
+        self.trace.load(state["trace_log"]["trace"])
         self.flow_index = state["flow_index"]
         self.client_config = state["client_config"]
         self.test_output = state["test_output"]
@@ -0,0 +1,131 @@
+"""
+A HTTP transport shared by all the test clients in a process.
+
+Connections are pooled per host and kept alive between requests, so
+consecutive steps in a test, and consecutive tests, against the same OP
+reuse the TCP connection and TLS session. Cookies are never kept by the
+transport, every client sends and receives cookies using its own jar.
+"""
+import cookielib
+import copy
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from six.moves.http_cookies import CookieError
+from six.moves.http_cookies import SimpleCookie
+
+from oic.oauth2.exception import NonFatalException
+from oic.oauth2.util import set_cookie
+
+__author__ = 'roland'
+
+logger = logging.getLogger(__name__)
+
+
+class NoCookies(cookielib.DefaultCookiePolicy):
+    """ Makes sure the shared session never stores a cookie """
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+class Transport(object):
+    """
+    :param pool_connections: Number of hosts to keep connection pools for
+    :param pool_maxsize: Max number of connections kept per host
+    :param timeout: Default (connect, read) timeout in seconds
+    :param max_retries: Retries on failed connection attempts
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, timeout=None,
+                 max_retries=0):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.cookies.set_policy(NoCookies())
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              max_retries=max_retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        if self.timeout is not None and "timeout" not in kwargs:
+            kwargs["timeout"] = self.timeout
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_TRANSPORT = None
+_LOCK = threading.Lock()
+
+
+def configure(**kwargs):
+    """
+    Replace the shared transport with one using these settings.
+
+    :param kwargs: Keyword arguments to Transport
+    """
+    global _TRANSPORT
+
+    with _LOCK:
+        _old = _TRANSPORT
+        _TRANSPORT = Transport(**kwargs)
+    if _old is not None:
+        _old.close()
+
+
+def transport():
+    global _TRANSPORT
+
+    with _LOCK:
+        if _TRANSPORT is None:
+            _TRANSPORT = Transport()
+        return _TRANSPORT
+
+
+class KeepAlive(object):
+    """
+    Mixin for oic.oauth2.base.PBase subclasses, sends the requests through
+    the shared transport instead of setting up a new connection each time.
+    """
+
+    def http_request(self, url, method="GET", **kwargs):
+        _kwargs = copy.copy(self.request_args)
+        if kwargs:
+            _kwargs.update(kwargs)
+
+        if self.cookiejar:
+            _kwargs["cookies"] = self._cookies()
+            logger.debug("SENT COOKIEs: %s" % (_kwargs["cookies"],))
+
+        try:
+            r = transport().request(method, url, **_kwargs)
+        except Exception as err:
+            logger.error(
+                "http_request failed: %s, url: %s, htargs: %s, method: %s" % (
+                    err, url, _kwargs, method))
+            raise
+
+        if self.event_store is not None:
+            self.event_store.store('http response header', r.headers, ref=url)
+
+        try:
+            _cookie = r.headers["set-cookie"]
+        except (AttributeError, KeyError):
+            pass
+        else:
+            logger.debug("RECEIVED COOKIEs: %s" % _cookie)
+            try:
+                set_cookie(self.cookiejar, SimpleCookie(_cookie))
+            except CookieError as err:
+                logger.error(err)
+                raise NonFatalException(r, "{}".format(err))
+
+        return r
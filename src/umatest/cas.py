@@ -31,6 +31,7 @@ from uma.authzsrv import OAuth2UmaAS
 from uma.message import PermissionRegistrationResponse
 from uma.message import RPTResponse
 from umatest.util import TraceHandler
+from rrtest.static import FileResponse
 
 __author__ = 'rolandh'
 
@@ -65,35 +66,9 @@ def get_body(environ):
 # -----------------------------------------------------------------------------
 # Callbacks
 # -----------------------------------------------------------------------------
-#noinspection PyUnresolvedReferences
-CTYPE_MAP = {
-    "ico": "image/x-icon",
-    "html": "text/html",
-    "json": 'application/json',
-    "txt": 'text/plain',
-    "css": 'text/css',
-    "xml": "text/xml",
-    "js": "text/javascript"
-}
-
-
 #noinspection PyUnusedLocal
 def static(environ, session, path):
-    logger.info("[static]sending: %s" % (path,))
-
-    try:
-        text = open(path).read()
-        ext = path.rsplit(".", 1)[-1]
-        try:
-            ctype = CTYPE_MAP[ext]
-        except KeyError:
-            ctype = CTYPE_MAP["txt"]
-
-        resp = Response(text, headers=[('Content-Type', ctype)])
-    except IOError:
-        resp = NotFound()
-
-    return resp
+    return FileResponse(path)
 
 # ........................................................................
 
@@ -491,7 +466,7 @@ def application(environ, start_response):
                     except Exception, err:
                         resp = ServiceError("%s" % err)
 
-    if isinstance(resp, Response):
+    if isinstance(resp, (Response, FileResponse)):
         pass
     else:
         resp = NotFound(path)
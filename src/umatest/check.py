@@ -4,13 +4,10 @@ from oauth2test import check
 
 __author__ = 'rohe0002'
 
-import inspect
-import sys
 from rrtest.check import ResponseInfo, Error
+from rrtest.check import REGISTRY
 from oic.oauth2.dynreg import ClientInfoResponse
 
-CLASS_CACHE = {}
-
 
 class RegistrationInfo(ResponseInfo):
     """
@@ -75,17 +72,8 @@ class VerifyRPTResponse(Error):
         return {}
 
 
-def factory(cid, classes=CLASS_CACHE):
-    if len(classes) == 0:
-        check.factory(cid, classes)
-        for name, obj in inspect.getmembers(sys.modules[__name__]):
-            if inspect.isclass(obj):
-                try:
-                    classes[obj.cid] = obj
-                except AttributeError:
-                    pass
-
-    if cid in classes:
-        return classes[cid]
-    else:
-        return None
+REGISTRY.extend(__name__, check.__name__)
+
+
+def factory(cid):
+    return REGISTRY.get(cid, __name__)
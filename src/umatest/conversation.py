@@ -13,6 +13,7 @@ from rrtest.check import STATUSCODE
 from rrtest.interaction import Interaction
 from rrtest.interaction import Action
 from rrtest.interaction import InteractionNeeded
+from rrtest.responses import ResponseStore
 
 __author__ = 'rolandh'
 
@@ -48,7 +49,7 @@ class Conversation(object):
                      "rp": cookielib.CookieJar(),
                      "service": cookielib.CookieJar()}
 
-        self.protocol_response = []
+        self.protocol_response = ResponseStore()
         self.last_response = None
         self.last_content = None
         self.response = None
@@ -294,12 +295,20 @@ class Conversation(object):
             self.handle_result()
 
     def do_sequence(self, oper):
+        for _ in self.steps(oper):
+            pass
+
+    def steps(self, oper):
+        """
+        Runs the sequence one phase at a time, yields the index of the
+        phase after it has been run.
+        """
         try:
             self.test_sequence(oper["tests"]["pre"])
         except KeyError:
             pass
 
-        for phase in oper["sequence"]:
+        for i, phase in enumerate(oper["sequence"]):
             self.init(phase)
             try:
                 self.do_query()
@@ -315,6 +324,7 @@ class Conversation(object):
             except Exception, err:
                 #self.err_check("exception", err)
                 raise
+            yield i
 
         try:
             self.test_sequence(oper["tests"]["post"])
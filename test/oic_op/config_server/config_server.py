@@ -26,6 +26,7 @@ from configuration_server.shell_commands import is_port_used_by_another_process,
     check_if_oprp_started, NoResponseException
 from configuration_server.test_instance_database import PortDatabase, NoPortAvailable
 from configuration_server.response_encoder import ResponseEncoder
+from rrtest.static import STATIC
 
 LOGGER = logging.getLogger("configuration_server")
 
@@ -52,26 +53,7 @@ def setup_logging(logfile):
 
 
 def static(environ, start_response, path):
-    try:
-        text = open(path).read()
-        if path.endswith(".ico"):
-            start_response('200 OK', [('Content-Type', "image/x-icon")])
-        elif path.endswith(".html"):
-            start_response('200 OK', [('Content-Type', 'text/html')])
-        elif path.endswith(".json"):
-            start_response('200 OK', [('Content-Type', 'application/json')])
-        elif path.endswith(".jwt"):
-            start_response('200 OK', [('Content-Type', 'application/jwt')])
-        elif path.endswith(".txt"):
-            start_response('200 OK', [('Content-Type', 'text/plain')])
-        elif path.endswith(".css"):
-            start_response('200 OK', [('Content-Type', 'text/css')])
-        else:
-            start_response('200 OK', [('Content-Type', "text/plain")])
-        return [text]
-    except IOError:
-        resp = NotFound()
-        return resp(environ, start_response)
+    return STATIC(environ, start_response, path)
 
 
 def op_config(environ, start_response, mako_template):
@@ -21,6 +21,7 @@ from oic.oic.message import RegistrationResponse
 
 from message import factory
 
+from oictest.cache import TTLCache
 from oictest.oidcrp import request_and_return
 from oictest.oprp import OPRP
 from oictest.oprp import CRYPTSUPPORT
@@ -263,6 +264,7 @@ class GSMAoprp(OPRP):
 
 
 RP_ARGS = None
+RP = None
 
 
 def application(environ, start_response):
@@ -272,10 +274,7 @@ def application(environ, start_response):
     path = environ.get('PATH_INFO', '').lstrip('/')
     LOGGER.info("path: %s" % path)
 
-    oprp = GSMAoprp(**RP_ARGS)
-
-    oprp.environ = environ
-    oprp.start_response = start_response
+    oprp = RP.context(environ, start_response)
 
     if path == "robots.txt":
         return oprp.static("static/robots.txt")
@@ -568,8 +567,9 @@ if __name__ == '__main__':
                             output_encoding='utf-8')
 
     RP_ARGS = {"lookup": LOOKUP, "conf": CONF, "test_flows": TEST_FLOWS,
-               "cache": {}, "test_profile": TEST_PROFILE, "profiles": PROFILES,
+               "cache": TTLCache(), "test_profile": TEST_PROFILE, "profiles": PROFILES,
                "test_class": TEST_CLASS, "check_factory": check_factory}
+    RP = GSMAoprp(**RP_ARGS)
 
     SRV = wsgiserver.CherryPyWSGIServer(('0.0.0.0', CONF.PORT),
                                         SessionMiddleware(application,
@@ -1,23 +1,26 @@
 <%!
 
-def op_choice(base, nodes, test_info, headlines):
+COLOR = ['<img src="static/black.png" alt="Black">',
+         '<img src="static/green.png" alt="Green">',
+         '<img src="static/yellow.png" alt="Yellow">',
+         '<img src="static/red.png" alt="Red">',
+         '<img src="static/qmark.jpg" alt="QuestionMark">',
+         '<img src="static/greybutton" alt="Grey">',
+         ]
+
+def state_icon(state):
+    return COLOR[state]
+
+def info_link(base, name):
+    return "<a href='%stest_info/%s'><img src='static/info32.png'></a>" % (
+        base, name)
+
+def op_choice(base, nodes, test_info, headlines, slot=None):
     """
-    Creates a list of test flows
+    Creates a list of test flows. If slot is given the state icons and
+    test information links are left as slots to be filled in later.
     """
-    #colordict = {
-    #    "OK":'<img src="static/green.png" alt="Green">',
-    #    "WARNING":'<img src="static/yellow.png" alt="Yellow">',
-    #    "ERROR":'<img src="static/red.png" alt="Red">',
-    #    "CRITICAL":'<img src="static/red.png" alt="Red">'
-    #}
     _grp = "_"
-    color = ['<img src="static/black.png" alt="Black">',
-             '<img src="static/green.png" alt="Green">',
-             '<img src="static/yellow.png" alt="Yellow">',
-             '<img src="static/red.png" alt="Red">',
-             '<img src="static/qmark.jpg" alt="QuestionMark">',
-             '<img src="static/greybutton" alt="Grey">',
-             ]
     element = "<ul>"
 
     for node in nodes:
@@ -25,16 +28,24 @@ def op_choice(base, nodes, test_info, headlines):
         if not grp == _grp:
             _grp = grp
             element += "<hr size=2><h3 id='%s'>%s</h3>" % (_grp, headlines[_grp])
-        element += "<li><a href='%s%s'>%s</a>%s (%s) " % (base,
-            node.name, color[node.state], node.desc, node.name)
+        if slot:
+            _icon = slot("state", node.name)
+        else:
+            _icon = state_icon(node.state)
+        element += "<li><a href='%s%s'><span id='state-%s'>%s</span></a>%s (%s) " % (
+            base, node.name, node.name, _icon, node.desc, node.name)
 
         if node.rmc:
             element += '<img src="static/delete-icon.png">'
         if node.experr:
             element += '<img src="static/beware.png">'
-        if node.name in test_info:
-            element += "<a href='%stest_info/%s'><img src='static/info32.png'></a>" % (
-                    base, node.name)
+        if slot:
+            _info = slot("info", node.name)
+        elif node.name in test_info:
+            _info = info_link(base, node.name)
+        else:
+            _info = ""
+        element += "<span id='info-%s'>%s</span>" % (node.name, _info)
         #if node.mti == "MUST":
         #    element += '<img src="static/must.jpeg">'
 
@@ -160,7 +171,7 @@ def legends():
         If you want to change this you can do it <a href="pedit">here</a>
 
         <h3>Chose the next test flow you want to run from this list: </h3>
-        ${op_choice(base, flows, test_info, headlines)}
+        ${op_choice(base, flows, test_info, headlines, context.get("slot"))}
         <h3>Legends</h3>
         ${legends()}
     </div>
@@ -168,6 +179,20 @@ def legends():
     <script src="/static/jquery.min.1.9.1.js"></script>
     <!-- Include all compiled plugins (below), or include individual files as needed -->
     <script src="/static/bootstrap/js/bootstrap.min.js"></script>
+    <script>
+        // A page brought back from the browser cache shows old states
+        $(window).on("pageshow", function (event) {
+            if (!event.originalEvent.persisted) {
+                return;
+            }
+            $.getJSON("${base}flow_states", function (flows) {
+                $.each(flows, function (name, flow) {
+                    $(document.getElementById("state-" + name)).html(flow.icon);
+                    $(document.getElementById("info-" + name)).html(flow.info);
+                });
+            });
+        });
+    </script>
 
 </body>
 </html>
\ No newline at end of file
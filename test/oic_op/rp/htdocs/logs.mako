@@ -1,3 +1,6 @@
+<%!
+from oictest.dir_index import paging
+%>
 <%
 import os
 
@@ -48,6 +51,7 @@ def display_log(logs, issuer, profile):
       <div class="jumbotron">
         <h1>OpenID Certification OP Test logs</h1>
             ${display_log(logs, issuer, profile)}
+            ${paging(context.get("page"))}
       </div>
 
     </div> <!-- /container -->
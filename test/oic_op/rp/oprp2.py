@@ -27,7 +27,6 @@ setup_common_log()
 
 
 try:
-    from mako.lookup import TemplateLookup
     from oic.oic.message import factory as message_factory
     from oic.oauth2 import ResponseError
     from oic.utils import exception_trace
@@ -35,9 +34,14 @@ try:
     from oic.utils.http_util import get_post
     from oic.utils.http_util import BadRequest
     from oictest.oprp import setup_logging
+    from oictest.cache import TTLCache
     from oictest.oprp import OPRP
     from oictest.oprp import CRYPTSUPPORT
     from oictest.oprp import post_tests
+    from oictest.pages import template_lookup
+    from rrtest.router import MethodNotAllowed
+    from rrtest.router import Router
+    from rrtest.router import not_allowed
 except Exception as ex:
     COMMON_LOGGER.exception(ex)
     raise ex
@@ -45,263 +49,328 @@ except Exception as ex:
 LOGGER = logging.getLogger("")
 
 RP_ARGS = None
+RP = None
 
-def application(environ, start_response):
-    LOGGER.info("Connection from: %s" % environ["REMOTE_ADDR"])
-    session = environ['beaker.session']
+def static_file(oprp, session, path):
+    return oprp.static(path)
 
-    path = environ.get('PATH_INFO', '').lstrip('/')
-    LOGGER.info("path: %s" % path)
 
-    oprp = OPRP(**RP_ARGS)
-    oprp.environ = environ
-    oprp.start_response = start_response
+def robots(oprp, session, path):
+    return oprp.static("static/robots.txt")
 
-    if path == "robots.txt":
-        return oprp.static("static/robots.txt")
-    elif path == "favicon.ico":
-        return oprp.static("static/favicon.ico")
-    elif path.startswith("static/"):
-        return oprp.static(path)
-    elif path.startswith("export/"):
-        return oprp.static(path)
 
-    if path == "":  # list
-        try:
-            if oprp.session_init(session):
-                return oprp.flow_list(session)
-            else:
-                try:
-                    resp = Redirect("%sopresult#%s" % (
-                        oprp.conf.BASE, session["testid"][0]))
-                except KeyError:
-                    return oprp.flow_list(session)
-                else:
-                    return resp(environ, start_response)
-        except Exception as err:
-            return oprp.err_response(session, "session_setup", err)
-    elif path == "logs":
-        return oprp.display_log("log", issuer="", profile="", testid="")
-    elif path.startswith("log"):
-        if path == "log" or path == "log/":
-            _cc = oprp.conf.CLIENT
+def favicon(oprp, session, path):
+    return oprp.static("static/favicon.ico")
+
+
+def flow_list(oprp, session, path):
+    try:
+        if oprp.session_init(session):
+            return oprp.flow_list(session)
+        else:
             try:
-                _iss = _cc["srv_discovery_url"]
+                resp = Redirect("%sopresult#%s" % (
+                    oprp.conf.BASE, session["testid"][0]))
             except KeyError:
-                _iss = _cc["provider_info"]["issuer"]
-            parts = [quote_plus(_iss)]
-        else:
-            parts = []
-            while path != "log":
-                head, tail = os.path.split(path)
-                # tail = tail.replace(":", "%3A")
-                # if tail.endswith("%2F"):
-                #     tail = tail[:-3]
-                parts.insert(0, tail)
-                path = head
-
-        return oprp.display_log("log", *parts)
-    elif path.startswith("tar"):
-        path = path.replace(":", "%3A")
-        return oprp.static(path)
-    elif "flow_names" not in session:
-        oprp.session_init(session)
-
-    if path == "reset":
-        oprp.reset_session(session)
-        return oprp.flow_list(session)
-    elif path == "pedit":
-        try:
-            return oprp.profile_edit(session)
-        except Exception as err:
-            return oprp.err_response(session, "pedit", err)
-    elif path == "profile":
-        info = parse_qs(get_post(environ))
+                return oprp.flow_list(session)
+            else:
+                return resp(oprp.environ, oprp.start_response)
+    except Exception as err:
+        return oprp.err_response(session, "session_setup", err)
+
+
+def all_logs(oprp, session, path):
+    return oprp.display_log("log", issuer="", profile="", testid="")
+
+
+def display_log(oprp, session, path):
+    if path == "log" or path == "log/":
+        _cc = oprp.conf.CLIENT
         try:
-            cp = session["profile"].split(".")
-            cp[0] = info["rtype"][0]
-
-            crsu = []
-            for name, cs in list(CRYPTSUPPORT.items()):
-                try:
-                    if info[name] == ["on"]:
-                        crsu.append(cs)
-                except KeyError:
-                    pass
-
-            if len(cp) == 3:
-                if len(crsu) == 3:
-                    pass
-                else:
-                    cp.append("".join(crsu))
-            else:  # len >= 4
-                cp[3] = "".join(crsu)
+            _iss = _cc["srv_discovery_url"]
+        except KeyError:
+            _iss = _cc["provider_info"]["issuer"]
+        parts = [quote_plus(_iss)]
+    else:
+        parts = []
+        while path != "log":
+            head, tail = os.path.split(path)
+            # tail = tail.replace(":", "%3A")
+            # if tail.endswith("%2F"):
+            #     tail = tail[:-3]
+            parts.insert(0, tail)
+            path = head
+
+    return oprp.display_log("log", *parts)
+
 
+def tar_archive(oprp, session, path):
+    path = path.replace(":", "%3A")
+    return oprp.tar_archive(path)
+
+
+def reset(oprp, session, path):
+    oprp.reset_session(session)
+    return oprp.flow_list(session)
+
+
+def flow_states(oprp, session, path):
+    return oprp.flow_states(session)
+
+
+def profile_edit(oprp, session, path):
+    try:
+        return oprp.profile_edit(session)
+    except Exception as err:
+        return oprp.err_response(session, "pedit", err)
+
+
+def profile(oprp, session, path):
+    info = parse_qs(get_post(oprp.environ))
+    try:
+        cp = session["profile"].split(".")
+        cp[0] = info["rtype"][0]
+
+        crsu = []
+        for name, cs in list(CRYPTSUPPORT.items()):
             try:
-                if info["extra"] == ['on']:
-                    if len(cp) == 3:
-                        cp.extend(["", "+"])
-                    elif len(cp) == 4:
-                        cp.append("+")
-                    elif len(cp) == 5:
-                        cp[4] = "+"
-                else:
-                    if len(cp) == 5:
-                        cp = cp[:-1]
+                if info[name] == ["on"]:
+                    crsu.append(cs)
             except KeyError:
+                pass
+
+        if len(cp) == 3:
+            if len(crsu) == 3:
+                pass
+            else:
+                cp.append("".join(crsu))
+        else:  # len >= 4
+            cp[3] = "".join(crsu)
+
+        try:
+            if info["extra"] == ['on']:
+                if len(cp) == 3:
+                    cp.extend(["", "+"])
+                elif len(cp) == 4:
+                    cp.append("+")
+                elif len(cp) == 5:
+                    cp[4] = "+"
+            else:
                 if len(cp) == 5:
                     cp = cp[:-1]
+        except KeyError:
+            if len(cp) == 5:
+                cp = cp[:-1]
+
+        # reset all test flows
+        RP.test_profile = ".".join(cp)
+        oprp.reset_session(session, ".".join(cp))
+        return oprp.flow_list(session)
+    except Exception as err:
+        return oprp.err_response(session, "profile", err)
+
+
+def test_info(oprp, session, path):
+    p = path.split("/")
+    try:
+        return oprp.test_info(p[1], session)
+    except KeyError:
+        return oprp.not_found()
+
+
+def next_step(oprp, session, path):
+    try:
+        sequence_info = session["seq_info"]
+    except KeyError:  # Cookie delete broke session
+        query = parse_qs(oprp.environ["QUERY_STRING"])
+        path = query["path"][0]
+        index = int(query["index"][0])
+        conv, sequence_info, ots, trace, index = oprp.session_setup(
+            session, path, index)
 
-            # reset all test flows
-            RP_ARGS["test_profile"] = ".".join(cp)
-            oprp.reset_session(session, ".".join(cp))
-            return oprp.flow_list(session)
-        except Exception as err:
-            return oprp.err_response(session, "profile", err)
-    elif path.startswith("test_info"):
-        p = path.split("/")
         try:
-            return oprp.test_info(p[1], session)
+            conv = RP_ARGS["cache"][query["ckey"][0]]
         except KeyError:
-            return oprp.not_found()
-    elif path == "continue":
-        try:
-            sequence_info = session["seq_info"]
-        except KeyError:  # Cookie delete broke session
-            query = parse_qs(environ["QUERY_STRING"])
-            path = query["path"][0]
-            index = int(query["index"][0])
-            conv, sequence_info, ots, trace, index = oprp.session_setup(
-                session, path, index)
+            pass
+        else:
+            ots.client = conv.client
+            session["conv"] = conv
+    except Exception as err:
+        return oprp.err_response(session, "session_setup", err)
+    else:
+        index = session["index"]
+        ots = session["ots"]
+        conv = session["conv"]
+
+    index += 1
+    try:
+        return oprp.run_sequence(sequence_info, session, conv, ots,
+                                 conv.trace, index)
+    except Exception as err:
+        return oprp.err_response(session, "run_sequence", err)
+
+
+def opresult(oprp, session, path):
+    try:
+        conv = session["conv"]
+    except KeyError as err:
+        homepage = ""
+        return oprp.sorry_response(homepage, err)
+
+    return oprp.opresult(conv, session)
+
+
+def run_flow(oprp, session, path):
+    LOGGER.info("<=<=<=<=< %s >=>=>=>=>" % path)
+    conv, sequence_info, ots, trace, index = oprp.session_setup(session, path)
+    session["node"].complete = False
+    try:
+        return oprp.run_sequence(sequence_info, session, conv, ots,
+                                 trace, index)
+    except Exception as err:
+        return oprp.err_response(session, "run_sequence", err)
 
+
+def authz_response(oprp, session, path):
+    environ = oprp.environ
+    try:
+        sequence_info = session["seq_info"]
+        index = session["index"]
+        ots = session["ots"]
+        conv = session["conv"]
+    except KeyError as err:
+        # Todo: find out which port I'm listening on
+        return oprp.sorry_response(oprp.conf.BASE, err)
+    (req_c, resp_c), _ = sequence_info["sequence"][index]
+    try:
+        response_mode = conv.AuthorizationRequest["response_mode"]
+    except KeyError:
+        response_mode = None
+
+    if path == "authz_cb":
+        if response_mode == "form_post":
+            pass
+        elif session["response_type"] and not \
+                session["response_type"] == ["code"]:
+            # but what if it's all returned as a query ?
             try:
-                conv = RP_ARGS["cache"][query["ckey"][0]]
+                qs = environ["QUERY_STRING"]
             except KeyError:
                 pass
             else:
-                ots.client = conv.client
-                session["conv"] = conv
-        except Exception as err:
-            return oprp.err_response(session, "session_setup", err)
-        else:
-            index = session["index"]
-            ots = session["ots"]
-            conv = session["conv"]
+                session["conv"].trace.response("QUERY_STRING:%s" % qs)
+                session["conv"].query_component = qs
 
-        index += 1
-        try:
-            return oprp.run_sequence(sequence_info, session, conv, ots,
-                                     conv.trace, index)
-        except Exception as err:
-            return oprp.err_response(session, "run_sequence", err)
-    elif path == "opresult":
+            return oprp.opresult_fragment()
 
-        try:
-            conv = session["conv"]
-        except KeyError as err:
-            homepage = ""
-            return oprp.sorry_response(homepage, err)
+    if resp_c:  # None in cases where no OIDC response is expected
+        _ctype = resp_c.ctype
+
+        # parse the response
+        if response_mode == "form_post":
+            info = parse_qs(get_post(environ))
+            _ctype = "dict"
+        elif path == "authz_post":
+            query = parse_qs(get_post(environ))
+            try:
+                info = query["fragment"][0]
+            except KeyError:
+                return oprp.sorry_response(oprp.conf.BASE,
+                                           "missing fragment ?!")
+            _ctype = "urlencoded"
+        elif resp_c.where == "url":
+            info = environ["QUERY_STRING"]
+            _ctype = "urlencoded"
+        else:  # resp_c.where == "body"
+            info = get_post(environ)
+
+        LOGGER.info("Response: %s" % info)
+        conv.trace.reply(info)
+        resp_cls = message_factory(resp_c.response)
+
+        kwargs = {
+            "algs": ots.client.sign_enc_algs("id_token"),
+            "keyjar": ots.client.keyjar
+        }
+        if "issuer_mismatch" in ots.client.allow:
+            kwargs["sender"] = ots.client.provider_info["issuer"]
 
-        return oprp.opresult(conv, session)
-    # expected path format: /<testid>[/<endpoint>]
-    elif path in session["flow_names"]:
-        LOGGER.info("<=<=<=<=< %s >=>=>=>=>" % path)
-        conv, sequence_info, ots, trace, index = oprp.session_setup(session,
-                                                                    path)
-        session["node"].complete = False
         try:
-            return oprp.run_sequence(sequence_info, session, conv, ots,
-                                     trace, index)
+            response = ots.client.parse_response(
+                resp_cls, info, _ctype,
+                conv.AuthorizationRequest["state"],
+                **kwargs)
+        except ResponseError as err:
+            return oprp.err_response(session, "run_sequence", err)
         except Exception as err:
             return oprp.err_response(session, "run_sequence", err)
-    elif path in ["authz_cb", "authz_post"]:
-        try:
-            sequence_info = session["seq_info"]
-            index = session["index"]
-            ots = session["ots"]
-            conv = session["conv"]
-        except KeyError as err:
-            # Todo: find out which port I'm listening on
-            return oprp.sorry_response(oprp.conf.BASE, err)
-        (req_c, resp_c), _ = sequence_info["sequence"][index]
-        try:
-            response_mode = conv.AuthorizationRequest["response_mode"]
-        except KeyError:
-            response_mode = None
 
-        if path == "authz_cb":
-            if response_mode == "form_post":
-                pass
-            elif session["response_type"] and not \
-                    session["response_type"] == ["code"]:
-                # but what if it's all returned as a query ?
-                try:
-                    qs = environ["QUERY_STRING"]
-                except KeyError:
-                    pass
-                else:
-                    session["conv"].trace.response("QUERY_STRING:%s" % qs)
-                    session["conv"].query_component = qs
-
-                return oprp.opresult_fragment()
-
-        if resp_c:  # None in cases where no OIDC response is expected
-            _ctype = resp_c.ctype
-
-            # parse the response
-            if response_mode == "form_post":
-                info = parse_qs(get_post(environ))
-                _ctype = "dict"
-            elif path == "authz_post":
-                query = parse_qs(get_post(environ))
-                try:
-                    info = query["fragment"][0]
-                except KeyError:
-                    return oprp.sorry_response(oprp.conf.BASE,
-                                               "missing fragment ?!")
-                _ctype = "urlencoded"
-            elif resp_c.where == "url":
-                info = environ["QUERY_STRING"]
-                _ctype = "urlencoded"
-            else:  # resp_c.where == "body"
-                info = get_post(environ)
-
-            LOGGER.info("Response: %s" % info)
-            conv.trace.reply(info)
-            resp_cls = message_factory(resp_c.response)
-
-            kwargs = {
-                "algs": ots.client.sign_enc_algs("id_token"),
-                "keyjar": ots.client.keyjar
-            }
-            if "issuer_mismatch" in ots.client.allow:
-                kwargs["sender"] = ots.client.provider_info["issuer"]
+        LOGGER.info("Parsed response: %s" % response.to_dict())
+        conv.protocol_response.append((response, info))
+        conv.trace.response(response)
 
-            try:
-                response = ots.client.parse_response(
-                    resp_cls, info, _ctype,
-                    conv.AuthorizationRequest["state"],
-                    **kwargs)
-            except ResponseError as err:
-                return oprp.err_response(session, "run_sequence", err)
-            except Exception as err:
-                return oprp.err_response(session, "run_sequence", err)
-
-            LOGGER.info("Parsed response: %s" % response.to_dict())
-            conv.protocol_response.append((response, info))
-            conv.trace.response(response)
+    try:
+        post_tests(conv, req_c, resp_c)
+    except Exception as err:
+        return oprp.err_response(session, "post_test", err)
 
-        try:
-            post_tests(conv, req_c, resp_c)
-        except Exception as err:
-            return oprp.err_response(session, "post_test", err)
+    index += 1
+    try:
+        return oprp.run_sequence(sequence_info, session, conv, ots,
+                                 conv.trace, index)
+    except Exception as err:
+        return oprp.err_response(session, "run_sequence", err)
+
+
+# Pages that don't need the test flows to be set up in the session
+PAGES = Router([
+    (r'^static/', static_file, ["GET"]),
+    (r'^export/', static_file, ["GET"]),
+    (r'^log', display_log, ["GET"]),
+    (r'^tar', tar_archive, ["GET"]),
+])
+PAGES.path("robots.txt", robots, ["GET"])
+PAGES.path("favicon.ico", favicon, ["GET"])
+PAGES.path("", flow_list, ["GET"])
+PAGES.path("logs", all_logs, ["GET"])
+
+ACTIONS = Router([
+    (r'^test_info', test_info, ["GET"]),
+])
+ACTIONS.path("reset", reset)
+ACTIONS.path("flow_states", flow_states, ["GET"])
+ACTIONS.path("pedit", profile_edit)
+ACTIONS.path("profile", profile)
+ACTIONS.path("continue", next_step)
+ACTIONS.path("opresult", opresult)
+ACTIONS.path("authz_cb", authz_response)
+ACTIONS.path("authz_post", authz_response)
 
-        index += 1
-        try:
-            return oprp.run_sequence(sequence_info, session, conv, ots,
-                                     conv.trace, index)
-        except Exception as err:
-            return oprp.err_response(session, "run_sequence", err)
+
+def application(environ, start_response):
+    LOGGER.info("Connection from: %s" % environ["REMOTE_ADDR"])
+    session = environ['beaker.session']
+
+    path = environ.get('PATH_INFO', '').lstrip('/')
+    LOGGER.info("path: %s" % path)
+    method = environ.get("REQUEST_METHOD")
+
+    oprp = RP.context(environ, start_response)
+
+    try:
+        route = PAGES.resolve(path, method)
+        if route is None:
+            if "flow_names" not in session:
+                oprp.session_init(session)
+            route = ACTIONS.resolve(path, method)
+    except MethodNotAllowed as err:
+        return not_allowed(err)(environ, start_response)
+
+    if route is not None:
+        return route[0](oprp, session, path)
+    # expected path format: /<testid>[/<endpoint>]
+    elif path in oprp.registry:
+        return run_flow(oprp, session, path)
     else:
         resp = BadRequest()
         return resp(environ, start_response)
@@ -310,6 +379,7 @@ def application(environ, start_response):
 if __name__ == '__main__':
     from beaker.middleware import SessionMiddleware
     from cherrypy import wsgiserver
+    from oictest.archive import TarArchiver
     from oictest.check import factory as check_factory, get_provider_info
 
     parser = argparse.ArgumentParser()
@@ -319,6 +389,8 @@ if __name__ == '__main__':
     parser.add_argument('-d', dest='directory')
     parser.add_argument('-p', dest='profile')
     parser.add_argument('-P', dest='profiles')
+    parser.add_argument('-S', dest='session_db',
+                        help="Keep sessions in this SQLite database")
     parser.add_argument(dest="config")
     args = parser.parse_args()
 
@@ -368,18 +440,33 @@ if __name__ == '__main__':
     else:
         TEST_PROFILE = "C.T.T.ns"
 
-    LOOKUP = TemplateLookup(directories=[_dir + 'templates', _dir + 'htdocs'],
-                            module_directory=_dir + 'modules',
-                            input_encoding='utf-8',
-                            output_encoding='utf-8')
+    LOOKUP = template_lookup(_dir)
+
+    try:
+        CACHE = TTLCache(**CONF.RP_CACHE)
+    except AttributeError:
+        CACHE = TTLCache()
 
     RP_ARGS = {"lookup": LOOKUP, "conf": CONF, "test_flows": TEST_FLOWS,
-               "cache": {}, "test_profile": TEST_PROFILE, "profiles": PROFILES,
-               "test_class": test_class, "check_factory": check_factory}
+               "cache": CACHE, "test_profile": TEST_PROFILE,
+               "profiles": PROFILES,
+               "test_class": test_class, "check_factory": check_factory,
+               "archiver": TarArchiver()}
+    RP_ARGS["archiver"].start()
+    RP = OPRP(**RP_ARGS)
+
+    if args.session_db:
+        from oictest.session import SessionStore
+        from oictest.session import SessionMiddleware as ServerSideSession
+
+        STORE = SessionStore(args.session_db,
+                             timeout=session_opts["session.timeout"],
+                             shared={"cache": RP_ARGS["cache"]})
+        APP = ServerSideSession(application, STORE)
+    else:
+        APP = SessionMiddleware(application, session_opts)
 
-    SRV = wsgiserver.CherryPyWSGIServer(('0.0.0.0', CONF.PORT),
-                                        SessionMiddleware(application,
-                                                          session_opts))
+    SRV = wsgiserver.CherryPyWSGIServer(('0.0.0.0', CONF.PORT), APP)
 
     if CONF.BASE.startswith("https"):
         import cherrypy
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Runs all the test flows of a profile against an OP without a browser.
+
+The OP's login and consent pages are handled using the INTERACTION
+specifications in the configuration module, the same format as is used by
+the command line tools.
+"""
+from __future__ import print_function
+import argparse
+import importlib
+import json
+import sys
+
+__author__ = 'roland'
+
+if __name__ == '__main__':
+    from oictest.archive import TarArchiver
+    from oictest.batch import BatchRunner
+    from oictest.cache import TTLCache
+    from oictest.check import factory as check_factory
+    from oictest.metadata import METADATA_CACHE
+    from oictest.oprp import OPRP
+    from oictest.oprp import setup_logging
+    from oictest.pages import template_lookup
+    from rrtest.check import STATUSCODE
+
+    import oprp2
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-t', dest='testflows', default="tflow")
+    parser.add_argument('-c', dest='testclass')
+    parser.add_argument('-P', dest='profiles', default="profiles")
+    parser.add_argument('-p', dest='profile', default="C.T.T.ns")
+    parser.add_argument('-w', dest='workers', type=int, default=4,
+                        help="Number of flows to run at the same time")
+    parser.add_argument('-f', dest='prefix', default="",
+                        help="Only run flows whose id starts with this")
+    parser.add_argument('-o', dest='output',
+                        help="Write the result as JSON to this file")
+    parser.add_argument(dest="config")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ".")
+    CONF = importlib.import_module(args.config)
+    setup_logging("%s/batch_%s.log" % (oprp2.SERVER_LOG_FOLDER, CONF.PORT),
+                  oprp2.LOGGER)
+
+    if args.testclass:
+        test_class = importlib.import_module(args.testclass)
+    else:
+        from oictest import testclass as test_class
+
+    LOOKUP = template_lookup()
+
+    ARCHIVER = TarArchiver()
+    oprp2.RP_ARGS = {
+        "lookup": LOOKUP, "conf": CONF,
+        "test_flows": importlib.import_module(args.testflows),
+        "cache": TTLCache(), "test_profile": args.profile,
+        "profiles": importlib.import_module(args.profiles),
+        "test_class": test_class, "check_factory": check_factory,
+        "archiver": ARCHIVER}
+    oprp2.RP = OPRP(**oprp2.RP_ARGS)
+
+    runner = BatchRunner(oprp2.application, oprp2.RP, args.profile,
+                         args.workers, getattr(CONF, "INTERACTION", []),
+                         getattr(CONF, "VERIFY_SSL", False))
+    result = runner.run(runner.flows(args.prefix))
+    ARCHIVER.flush()
+
+    for item in result:
+        print("%s: %s" % (item["id"], STATUSCODE[item["status"]]))
+    print("Metadata cache: %s" % ", ".join(
+        ["%s=%d" % item for item in sorted(METADATA_CACHE.counters.items())]))
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(result, fp, indent=2, default=str)
@@ -8,6 +8,7 @@ from oic.oauth2 import Message
 from oic.oic.message import factory as oic_factory
 from oic.oauth2.message import factory as oauth2_factory
 from oic.oic.message import OpenIDSchema
+from oictest.log_index import LogIndex
 from rrtest import Trace
 
 __author__ = 'roland'
@@ -267,6 +268,22 @@ def do_dir(dirname):
     return res
 
 
+def do_index(dirname):
+    """
+    Same as do_dir but using the log catalogue, see oictest.log_index.
+    The catalogue is first brought up to date with the log files, the
+    ones it doesn't know about are read and the ones that are gone dropped.
+    """
+    index = LogIndex(dirname)
+    index.update()
+
+    res = {}
+    for (_iss, _prof, _tid), entry in index.latest().items():
+        res.setdefault(_iss, {}).setdefault(_prof, {})[_tid] = \
+            " %s" % entry["result"]
+    return res
+
+
 def normalize(a):
     pa = a.split(".")
     if pa[3]:
@@ -333,27 +350,21 @@ def prof_sort(a, b):
 
 
 def profiles(res):
-    profs = []
+    profs = set()
     for info in res.values():
         for prof in info.keys():
             if prof.endswith(".extras"):
                 prof = prof[:-7]
-            p = normalize(prof)
-            if p not in profs:
-                profs.append(p)
-    profs.sort(prof_sort)
-    return profs
+            profs.add(normalize(prof))
+    return sorted(profs, prof_sort)
 
 
 def tests(res):
-    all = []
+    all = set()
     for iss, info in res.items():
         for prof, tests in info.items():
-            for testname, val in tests.items():
-                if testname not in all:
-                    all.append(testname)
-    all.sort()
-    return all
+            all.update(tests.keys())
+    return sorted(all)
 
 
 if __name__ == "__main__":
@@ -369,6 +380,11 @@ if __name__ == "__main__":
     parser.add_argument('-d', dest='dir')
     parser.add_argument('-c', dest="config")
     parser.add_argument('-D', dest="rec")
+    parser.add_argument('-I', dest="index",
+                        help="Same as -D but using the log catalogue, which "
+                             "is first updated with logs it's missing")
+    parser.add_argument('-R', dest="rebuild",
+                        help="Rebuild the log catalogue of a log directory")
     args = parser.parse_args()
 
     if args.config:
@@ -388,3 +404,9 @@ if __name__ == "__main__":
         mat = {}
         res = do_dir(args.rec)
         print json.dumps(res)
+
+    if args.rebuild:
+        LogIndex(args.rebuild).rebuild()
+
+    if args.index:
+        print json.dumps(do_index(args.index))
@@ -9,5 +9,7 @@ from oictest.oprp import create_tar_archive
 
 for iss in os.listdir("log"):
     _dir = os.path.join("log", iss)
+    if iss.startswith(".") or not os.path.isdir(_dir):
+        continue
     for profile in os.listdir(_dir):
         create_tar_archive(iss, profile)
@@ -40,7 +40,10 @@ CA_BUNDLE = None
 
 KEY_EXPORT_URL = "%sexport/jwk.json" % issuer
 
-CLIENT_DB = "client_db"
+# SQLite database with the registered clients
+CLIENT_DB = "client_db.sqlite"
+# Seconds clients registered by RPs are kept, 0 means forever
+CLIENT_TTL = 86400
 
 # =======  SIMPLE DATABASE ==============
 
@@ -1,3 +1,6 @@
+<%!
+from oictest.dir_index import paging
+%>
 <%
 def display_log(logs):
     el = "<ul>"
@@ -29,6 +32,7 @@ def display_log(logs):
         <h1>OpenID Certification OP Test logs</h1>
           <h3>A list of test results that are saved on disc:</h3>
             ${display_log(logs)}
+            ${paging(context.get("page"))}
       </div>
 
     </div> <!-- /container -->
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import json
-import re
 import os
 import sys
 import traceback
@@ -21,22 +20,31 @@ from oic.oic.provider import EndSessionEndpoint
 from oic.utils.authn.authn_context import AuthnBroker
 from oic.utils.authn.client import verify_client
 from oic.utils.authz import AuthzHandling
-from oic.utils.client_management import CDB
 from oic.utils.http_util import BadRequest
 from oic.utils.http_util import Unauthorized
 from oic.utils.http_util import Response
 from oic.utils.http_util import NotFound
 from oic.utils.http_util import ServiceError
 from oic.utils.http_util import extract_from_request
-from oic.utils.keyio import keyjar_init
 from oic.utils.sdb import SessionDB
 from oic.utils.userinfo import UserInfo
 from oic.utils.webfinger import WebFinger
 from oic.utils.webfinger import OIC_ISSUER
 
 from rrtest import Trace
-from oictest.mode import extract_mode
-from oictest.mode import setup_op
+from rrtest.router import MethodNotAllowed
+from rrtest.router import Router
+from rrtest.router import not_allowed
+from rrtest.static import STATIC
+from oictest.client_db import ClientDB
+from oictest.dir_index import DIR_INDEX
+from oictest.dir_index import LISTING_PAGES
+from oictest.dir_index import page_args
+from oictest.dir_index import paginate
+from oictest.key_material import load_keys
+from oictest.mode import MODES
+from oictest.mode import ProviderPool
+from oictest.trace_log import TraceLog
 from oictest.mode import mode2path
 from response_encoder import ResponseEncoder
 
@@ -104,13 +112,7 @@ def safe(environ, start_response):
 
 #noinspection PyUnusedLocal
 def css(environ, start_response, session):
-    try:
-        _info = open(environ["PATH_INFO"]).read()
-        resp = Response(_info)
-    except (OSError, IOError):
-        resp = NotFound(environ["PATH_INFO"])
-
-    return resp(environ, start_response)
+    return STATIC(environ, start_response, environ["PATH_INFO"])
 
 # ----------------------------------------------------------------------------
 
@@ -124,48 +126,34 @@ def display_log(environ, start_response):
         path = "log"
 
     if os.path.isfile(path):
+        TRACE_LOG.flush(path)
         return static(environ, start_response, path)
-    elif os.path.isdir(path):
-        item = []
-        for (dirpath, dirnames, filenames) in os.walk(path):
-            if dirnames:
-                item = [(fn, os.path.join(path, fn)) for fn in dirnames]
-                break
-            if filenames:
-                item = [(fn, os.path.join(path, fn)) for fn in filenames]
-                break
-
-        item.sort()
-        resp = Response(mako_template="logs.mako",
-                        template_lookup=LOOKUP,
-                        headers=[])
-        argv = {"logs": item}
-
-        return resp(environ, start_response, **argv)
-    else:
+
+    _listing = DIR_INDEX.listing(path)
+    if _listing is None:
         resp = Response("No saved logs")
         return resp(environ, start_response)
 
+    _args = page_args(environ)
+    item = [(fn, os.path.join(path, fn)) for fn in
+            (_listing.dirs or _listing.files)]
+    logs, page = paginate(item, _args)
+    etag = LISTING_PAGES.etag(path, sorted(page.items()), logs)
+    return LISTING_PAGES.respond(environ, start_response, etag, LOOKUP,
+                                 "logs.mako", logs=logs, page=page)
 
-def dump_log(session, trace):
+
+def log_path(session):
     try:
-        _path = session["path"]
+        return session["path"]
     except KeyError:
-        base = "log"
         addr = session._environ["REMOTE_ADDR"]
-        _base = os.path.join(base, addr)
-
-        if not os.path.isdir(_base):
-            os.makedirs(_base)
+        return os.path.join("log", addr, session["test_id"])
 
-        _path = os.path.join(base, addr, session["test_id"])
 
-    output = "%s" % trace
-    output += "\n\n"
-
-    fil = open(_path, "a")
-    fil.write(output)
-    fil.close()
+def dump_log(session, trace):
+    _path = log_path(session)
+    TRACE_LOG.write(_path, trace)
     return _path
 
 
@@ -328,26 +316,7 @@ def static_file(path):
 
 #noinspection PyUnresolvedReferences
 def static(environ, start_response, path):
-    LOGGER.info("[static]sending: %s" % (path,))
-
-    try:
-        text = open(path).read()
-        if path.endswith(".ico"):
-            start_response('200 OK', [('Content-Type', "image/x-icon")])
-        elif path.endswith(".html"):
-            start_response('200 OK', [('Content-Type', 'text/html')])
-        elif path.endswith(".json"):
-            start_response('200 OK', [('Content-Type', 'application/json')])
-        elif path.endswith(".txt"):
-            start_response('200 OK', [('Content-Type', 'text/plain')])
-        elif path.endswith(".css"):
-            start_response('200 OK', [('Content-Type', 'text/css')])
-        else:
-            start_response('200 OK', [('Content-Type', 'text/plain')])
-        return [text]
-    except IOError:
-        resp = NotFound()
-        return resp(environ, start_response)
+    return STATIC(environ, start_response, path)
 
 # ----------------------------------------------------------------------------
 from oic.oic.provider import AuthorizationEndpoint
@@ -365,19 +334,22 @@ ENDPOINTS = [
 
 URLS = [
     (r'^verify', verify),
-    (r'.well-known/openid-configuration', op_info),
-    (r'.well-known/webfinger', webfinger),
-    (r'.+\.css$', css),
+    (r'.well-known/openid-configuration', op_info, ["GET"]),
+    (r'.well-known/webfinger', webfinger, ["GET"]),
+    (r'.+\.css$', css, ["GET"]),
     (r'safe', safe),
-    (r'log', display_log)
+    (r'log', display_log, ["GET"])
 ]
 
+ROUTER = Router(URLS)
+
 
 def add_endpoints(extra):
     global URLS
 
     for endp in extra:
         URLS.append(("^%s" % endp.etype, endp))
+        ROUTER.add("^%s" % endp.etype, endp)
 
 # ----------------------------------------------------------------------------
 
@@ -387,6 +359,8 @@ LOOKUP = TemplateLookup(directories=[ROOT + 'templates', ROOT + 'htdocs'],
                         module_directory=ROOT + 'modules',
                         input_encoding='utf-8', output_encoding='utf-8')
 
+TRACE_LOG = TraceLog(created=DIR_INDEX.invalidate)
+
 # ----------------------------------------------------------------------------
 
 
@@ -407,14 +381,61 @@ def registration(environ, start_response):
 def generate_static_client_credentials(parameters):
     redirect_uris = parameters['redirect_uris']
     jwks_uri = str(parameters['jwks_uri'][0])
-    _cdb = CDB(config.CLIENT_DB)
-    static_client = _cdb.create(redirect_uris=redirect_uris,
-                                # policy_uri="example.com",
-                                # logo_uri="example.com",
-                                jwks_uri=jwks_uri)
+    static_client = COM_ARGS["cdb"].create(redirect_uris=redirect_uris,
+                                           # policy_uri="example.com",
+                                           # logo_uri="example.com",
+                                           jwks_uri=jwks_uri)
     return static_client['client_id'], static_client['client_secret']
 
 
+def robots(environ, start_response):
+    return static(environ, start_response, "static/robots.txt")
+
+
+def static_path(environ, start_response):
+    return static(environ, start_response,
+                  environ.get('PATH_INFO', '').lstrip('/'))
+
+
+def client_credentials(environ, start_response):
+    parameters = parse_qs(environ["QUERY_STRING"])
+    client_id, client_secret = generate_static_client_credentials(parameters)
+    response_encoder = ResponseEncoder(environ=environ,
+                                       start_response=start_response)
+    return response_encoder.return_json(
+        json.dumps({"client_id": client_id, "client_secret": client_secret}))
+
+
+def claim(environ, start_response):
+    authz = environ["HTTP_AUTHORIZATION"]
+    try:
+        assert authz.startswith("Bearer")
+    except AssertionError:
+        resp = BadRequest()
+    else:
+        tok = authz[7:]
+        try:
+            _claims = PROVIDERS.claim_access_token.pop(tok)
+        except KeyError:
+            resp = BadRequest()
+        else:
+            resp = Response(json.dumps(_claims), content='application/json')
+    return resp(environ, start_response)
+
+
+# Pages that don't belong to a test, tried before the mode is extracted
+PAGES = Router([
+    (r'^static/', static_path, ["GET"]),
+    (r'^log', display_log, ["GET"]),
+    (r'^_static/', static_path, ["GET"]),
+])
+PAGES.path("robots.txt", robots, ["GET"])
+PAGES.path("test_list", rp_test_list, ["GET"])
+PAGES.path("", registration, ["GET"])
+PAGES.path("generate_client_credentials", client_credentials)
+PAGES.path("claim", claim)
+
+
 def application(environ, start_response):
     """
     :param environ: The HTTP application environment
@@ -425,50 +446,19 @@ def application(environ, start_response):
     global OAS
     session = environ['beaker.session']
     path = environ.get('PATH_INFO', '').lstrip('/')
-    response_encoder = ResponseEncoder(environ=environ,
-                                       start_response=start_response)
+    method = environ.get("REQUEST_METHOD")
     parameters = parse_qs(environ["QUERY_STRING"])
 
-    if path == "robots.txt":
-        return static(environ, start_response, "static/robots.txt")
+    try:
+        page = PAGES.resolve(path, method)
+    except MethodNotAllowed as err:
+        return not_allowed(err)(environ, start_response)
+    if page is not None:
+        return page[0](environ, start_response)
 
-    if path.startswith("static/"):
-        return static(environ, start_response, path)
-    elif path.startswith("log"):
-        return display_log(environ, start_response)
-    elif path.startswith("_static/"):
-        return static(environ, start_response, path)
-    
     trace = Trace()
 
-    if path == "test_list":
-        return rp_test_list(environ, start_response)
-    elif path == "":
-        return registration(environ, start_response)
-    elif path == "generate_client_credentials":
-        client_id, client_secret = generate_static_client_credentials(parameters)
-        return response_encoder.return_json(
-            json.dumps({"client_id": client_id,
-                        "client_secret": client_secret}))
-    elif path == "claim":
-        _oas = session["op"]
-        authz = environ["HTTP_AUTHORIZATION"]
-        try:
-            assert authz.startswith("Bearer")
-        except AssertionError:
-            resp = BadRequest()
-        else:
-            tok = authz[7:]
-            try:
-                _claims = _oas.claim_access_token[tok]
-            except KeyError:
-                resp = BadRequest()
-            else:
-                del _oas.claim_access_token[tok]
-                resp = Response(json.dumps(_claims), content='application/json')
-        return resp(environ, start_response)
-
-    mode, endpoint = extract_mode(path)
+    mode, endpoint = MODES(path)
 
     if endpoint == ".well-known/webfinger":
         _p = urlparse(parameters["resource"][0])
@@ -482,43 +472,42 @@ def application(environ, start_response):
             return resp(environ, start_response)
 
     if mode:
-        session["test_id"] = mode["test_id"]
-
-    if "op" not in session:
-        session["op"] = setup_op(mode, COM_ARGS, OP_ARG)
-        session["mode_path"] = mode2path(mode)
-    else:  # may be a new mode
-        _path = mode2path(mode)
-        if session["mode_path"] != _path:
-            session["op"] = setup_op(mode, COM_ARGS, OP_ARG)
-            session["mode_path"] = _path
-
-    for regex, callback in URLS:
-        match = re.search(regex, endpoint)
-        if match is not None:
-            trace.request("PATH: %s" % endpoint)
-            trace.request("METHOD: %s" % environ["REQUEST_METHOD"])
+        if "test_id" in session and session["test_id"] != mode["test_id"]:
+            # a new test, the log of the previous one is complete
             try:
-                trace.request(
-                    "HTTP_AUTHORIZATION: %s" % environ["HTTP_AUTHORIZATION"])
+                TRACE_LOG.end(log_path(session))
             except KeyError:
                 pass
+        session["test_id"] = mode["test_id"]
 
-            try:
-                environ['oic.url_args'] = match.groups()[0]
-            except IndexError:
-                environ['oic.url_args'] = endpoint
+    session["op"] = PROVIDERS.get(mode)
+    session["mode_path"] = mode2path(mode)
 
-            LOGGER.info("callback: %s" % callback)
-            try:
-                return callback(environ, start_response, session, trace)
-            except Exception as err:
-                print >> sys.stderr, "%s" % err
-                message = traceback.format_exception(*sys.exc_info())
-                print >> sys.stderr, message
-                LOGGER.exception("%s" % err)
-                resp = ServiceError("%s" % err)
-                return resp(environ, start_response)
+    try:
+        route = ROUTER.resolve(endpoint, method)
+    except MethodNotAllowed as err:
+        return not_allowed(err)(environ, start_response)
+
+    if route is not None:
+        callback, environ['oic.url_args'] = route
+        trace.request("PATH: %s" % endpoint)
+        trace.request("METHOD: %s" % environ["REQUEST_METHOD"])
+        try:
+            trace.request(
+                "HTTP_AUTHORIZATION: %s" % environ["HTTP_AUTHORIZATION"])
+        except KeyError:
+            pass
+
+        LOGGER.info("callback: %s" % callback)
+        try:
+            return callback(environ, start_response, session, trace)
+        except Exception as err:
+            print >> sys.stderr, "%s" % err
+            message = traceback.format_exception(*sys.exc_info())
+            print >> sys.stderr, message
+            LOGGER.exception("%s" % err)
+            resp = ServiceError("%s" % err)
+            return resp(environ, start_response)
 
     LOGGER.debug("unknown side: %s" % endpoint)
     resp = NotFound("Couldn't find the side you asked for!")
@@ -530,7 +519,6 @@ def application(environ, start_response):
 
 if __name__ == '__main__':
     import argparse
-    import shelve
     import importlib
     import pathmap
 
@@ -561,7 +549,10 @@ if __name__ == '__main__':
     config.SERVICE_URL = config.SERVICE_URL % args.port
 
     # Client data base
-    cdb = shelve.open(config.CLIENT_DB, writeback=True)
+    try:
+        cdb = ClientDB(config.CLIENT_DB, ttl=config.CLIENT_TTL)
+    except AttributeError:
+        cdb = ClientDB(config.CLIENT_DB)
 
     SETUP = {}
 
@@ -653,17 +644,21 @@ if __name__ == '__main__':
     # Add own keys for signing/encrypting JWTs
     try:
         OAS = Provider(**COM_ARGS)
-        jwks = keyjar_init(OAS, config.keys)
+        KEYS = load_keys(config.keys)
+        KEYS.init(OAS)
     except KeyError:
         pass
     else:
         # export JWKS
         p = urlparse(config.KEY_EXPORT_URL % args.port)
         f = open("."+p.path, "w")
-        f.write(json.dumps(jwks))
+        f.write(KEYS.export())
         f.close()
         OP_ARG["keyjar"] = OAS.keyjar
         OP_ARG["jwks_uri"] = p.geturl()
+        OP_ARG["key_material"] = KEYS
+
+    PROVIDERS = ProviderPool(COM_ARGS, OP_ARG)
 
     # Setup the web server
     SRV = wsgiserver.CherryPyWSGIServer(('0.0.0.0', args.port),
@@ -694,3 +689,4 @@ if __name__ == '__main__':
         SRV.start()
     except KeyboardInterrupt:
         SRV.stop()
+        TRACE_LOG.close()
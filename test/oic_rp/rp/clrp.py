@@ -5,7 +5,6 @@ import json
 import logging
 import argparse
 import rrtest
-import time
 
 from urlparse import urlparse
 from rrtest import FatalError
@@ -37,47 +36,6 @@ __author__ = 'roland'
 logger = None
 
 
-class Trace(rrtest.Trace):
-    @staticmethod
-    def format(resp):
-        _d = {"claims": resp.to_dict()}
-        if resp.jws_header:
-            _d["jws header parameters"] = resp.jws_header
-        if resp.jwe_header:
-            _d["jwe header parameters"] = resp.jwe_header
-        return _d
-
-    def response(self, resp):
-        delta = time.time() - self.start
-        try:
-            cl_name = resp.__class__.__name__
-        except AttributeError:
-            cl_name = ""
-
-        if cl_name == "IdToken":
-            txt = json.dumps({"id_token": self.format(resp)},
-                             sort_keys=True, indent=2, separators=(',', ': '))
-            self.trace.append("%f %s: %s" % (delta, cl_name, txt))
-        else:
-            try:
-                dat = resp.to_dict()
-            except AttributeError:
-                txt = resp
-                self.trace.append("%f %s" % (delta, txt))
-            else:
-                if cl_name == "OpenIDSchema":
-                    cl_name = "UserInfo"
-                    if resp.jws_header or resp.jwe_header:
-                        dat = self.format(resp)
-                elif "id_token" in dat:
-                    dat["id_token"] = self.format(resp["id_token"])
-
-                txt = json.dumps(dat, sort_keys=True, indent=2,
-                                 separators=(',', ': '))
-
-                self.trace.append("%f %s: %s" % (delta, cl_name, txt))
-
-
 def setup_logger(log_file_name="rprp.log"):
     logger = logging.getLogger("")
     hdlr = logging.FileHandler(log_file_name)
@@ -109,7 +67,7 @@ class Conversation(object):
         self.flow = flow
         self.client = client
         self.callback_uris = cb_uris
-        self.trace = Trace()
+        self.trace = rrtest.Trace()
         self.response = []
         self.last_url = ""
         self.test_id = ""
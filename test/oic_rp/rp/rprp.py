@@ -22,6 +22,8 @@ from oic.utils.http_util import ServiceError
 from oic.utils.http_util import NotFound
 from oic.utils.keyio import build_keyjar
 
+from rrtest.static import STATIC
+
 __author__ = 'roland'
 
 LOGGER = logging.getLogger("")
@@ -43,28 +45,7 @@ LOOKUP = TemplateLookup(directories=['templates', 'htdocs'],
 
 #noinspection PyUnresolvedReferences
 def static(environ, start_response, logger, path):
-    logger.info("[static]sending: %s" % (path,))
-
-    try:
-        text = open(path).read()
-        if path.endswith(".ico"):
-            start_response('200 OK', [('Content-Type', "image/x-icon")])
-        elif path.endswith(".html"):
-            start_response('200 OK', [('Content-Type', 'text/html')])
-        elif path.endswith(".json"):
-            start_response('200 OK', [('Content-Type', 'application/json')])
-        elif path.endswith(".jwt"):
-            start_response('200 OK', [('Content-Type', 'application/jwt')])
-        elif path.endswith(".txt"):
-            start_response('200 OK', [('Content-Type', 'text/plain')])
-        elif path.endswith(".css"):
-            start_response('200 OK', [('Content-Type', 'text/css')])
-        else:
-            start_response('200 OK', [('Content-Type', "text/plain")])
-        return [text]
-    except IOError:
-        resp = NotFound()
-        return resp(environ, start_response)
+    return STATIC(environ, start_response, path)
 
 
 def opresult_fragment(environ, start_response):
@@ -1,14 +1,11 @@
-import inspect
-import sys
 from uma import message
 from rrtest.check import Error, get_protocol_response
+from rrtest.check import REGISTRY
 from rrtest import Unknown
 from oictest import check
 
 __author__ = 'roland'
 
-CLASS_CACHE = {}
-
 
 class MatchResourceSet(Error):
     """
@@ -43,17 +40,11 @@ class MatchResourceSet(Error):
         return {}
 
 
-def factory(cid, classes=CLASS_CACHE):
-    if len(classes) == 0:
-        for name, obj in inspect.getmembers(sys.modules[__name__]):
-            if inspect.isclass(obj):
-                try:
-                    classes[obj.cid] = obj
-                except AttributeError:
-                    pass
-
-    if cid in classes:
-        return classes[cid]
-    else:
-        classes = {}
-        return check.factory(cid, classes)
+REGISTRY.extend(__name__, check.__name__)
+
+
+def factory(cid):
+    _cls = REGISTRY.get(cid, __name__)
+    if _cls is None:
+        raise Unknown("Couldn't find the check: '%s'" % cid)
+    return _cls
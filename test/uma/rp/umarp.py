@@ -56,6 +56,7 @@ MODULE2FACTORY = {
 }
 
 RP_ARGS = {}
+RP = None
 
 
 class UmaClient(umaClient):
@@ -388,10 +389,7 @@ def application(environ, start_response):
     path = environ.get('PATH_INFO', '').lstrip('/')
     LOGGER.info("path: %s" % path)
 
-    oprp = UMAoprp(**RP_ARGS)
-
-    oprp.environ = environ
-    oprp.start_response = start_response
+    oprp = RP.context(environ, start_response)
 
     if path == "robots.txt":
         return oprp.static("static/robots.txt")
@@ -682,6 +680,7 @@ if __name__ == '__main__':
     RP_ARGS = {"lookup": LOOKUP, "conf": CONF, "test_flows": TEST_FLOWS,
                "cache": {}, "test_profile": TEST_PROFILE, "profiles": PROFILES,
                "test_class": TEST_CLASS, "check_factory": factory}
+    RP = UMAoprp(**RP_ARGS)
 
     SRV = wsgiserver.CherryPyWSGIServer(('0.0.0.0', CONF.PORT),
                                         SessionMiddleware(application,
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tarfile
+import tempfile
+
+from oictest.archive import TarArchiver
+from oictest.archive import update_archive
+
+__author__ = 'roland'
+
+
+def _write(path, txt):
+    f = open(path, "w")
+    f.write(txt)
+    f.close()
+
+
+def _members(tarname):
+    tar = tarfile.open(tarname)
+    try:
+        return [(m.name, tar.extractfile(m).read()) for m in tar.getmembers()]
+    finally:
+        tar.close()
+
+
+def test_update_archive():
+    wd = tempfile.mkdtemp()
+    logdir = os.path.join(wd, "C.T.T.ns")
+    os.mkdir(logdir)
+    tarname = os.path.join(wd, "C.T.T.ns.tar")
+    try:
+        _write(os.path.join(logdir, "OP-A-1"), "first")
+        manifest = update_archive(logdir, tarname, "C.T.T.ns")
+        assert _members(tarname) == [("C.T.T.ns/OP-A-1.txt", "first")]
+
+        # only additions, appended
+        _write(os.path.join(logdir, "OP-A-2"), "second")
+        manifest = update_archive(logdir, tarname, "C.T.T.ns", manifest)
+        assert _members(tarname) == [("C.T.T.ns/OP-A-1.txt", "first"),
+                                     ("C.T.T.ns/OP-A-2.txt", "second")]
+
+        # changed file, rewritten
+        _write(os.path.join(logdir, "OP-A-1"), "first again")
+        manifest = update_archive(logdir, tarname, "C.T.T.ns", manifest)
+        assert _members(tarname) == [("C.T.T.ns/OP-A-1.txt", "first again"),
+                                     ("C.T.T.ns/OP-A-2.txt", "second")]
+        # manifest read from the archive itself
+        assert update_archive(logdir, tarname, "C.T.T.ns") == manifest
+    finally:
+        shutil.rmtree(wd)
+
+
+def test_archiver_build_on_demand():
+    wd = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    logdir = os.path.join(wd, "log", "https%3A%2F%2Fexample.com", "C.T.T.ns")
+    os.makedirs(logdir)
+    try:
+        archiver = TarArchiver(os.path.join(wd, "log"),
+                               os.path.join(wd, "tar"))
+        _write(os.path.join(logdir, "OP-A-1"), "first")
+        archiver.mark("https%3A%2F%2Fexample.com", "C.T.T.ns")
+        tarname = archiver.build("https%3A%2F%2Fexample.com", "C.T.T.ns")
+        assert _members(tarname) == [("C.T.T.ns/OP-A-1.txt", "first")]
+        assert archiver.dirty == {}
+        assert os.getcwd() == cwd
+    finally:
+        shutil.rmtree(wd)
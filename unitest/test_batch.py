@@ -0,0 +1,129 @@
+import threading
+import time
+from urlparse import parse_qs
+
+import responses
+
+from oictest.batch import Browser
+from oictest.batch import run_graph
+from oictest.testclass import RmCookie
+
+__author__ = 'roland'
+
+BASE = "https://rp.example.com/"
+OP = "https://op.example.com/"
+
+
+class FakeApp(object):
+    """
+    Sends the user agent to the OP, expects it back with a code, shows a
+    notice and then finishes.
+    """
+
+    def __init__(self):
+        self.paths = []
+
+    def __call__(self, environ, start_response):
+        session = environ["beaker.session"]
+        path = environ["PATH_INFO"].lstrip("/")
+        self.paths.append(path)
+        if path == "OP-A-1":
+            session["seq_info"] = {"sequence": [((None, None), {}),
+                                                (RmCookie, {})]}
+            session["index"] = 0
+            session["test_info"] = {path: {"test_output": []}}
+            start_response("302 Found", [("Location", OP + "authz?x=1")])
+        elif path == "authz_cb":
+            code = parse_qs(environ["QUERY_STRING"])["code"][0]
+            session["test_info"]["OP-A-1"]["test_output"].append(
+                {"id": "check", "status": 1, "message": code})
+            session["index"] = 1
+            start_response("200 OK", [("Content-Type", "text/html")])
+        elif path == "continue":
+            start_response("302 Found", [("Location", BASE + "opresult#A")])
+        else:
+            start_response("404 Not Found", [])
+        return [""]
+
+
+@responses.activate
+def test_browser():
+    responses.add(responses.GET, OP + "authz", status=302,
+                  adding_headers={"Location": BASE + "authz_cb?code=abc"})
+    app = FakeApp()
+    browser = Browser(app, BASE)
+    res = browser.test("OP-A-1")
+    assert app.paths == ["OP-A-1", "authz_cb", "continue"]
+    assert res["id"] == "OP-A-1"
+    assert res["status"] == 1
+    assert res["tests"][0]["message"] == "abc"
+
+
+@responses.activate
+def test_browser_failure():
+    responses.add(responses.GET, OP + "authz", status=500)
+    browser = Browser(FakeApp(), BASE)
+    res = browser.test("OP-A-1")
+    assert res["status"] == 4
+    assert "500" in res["tests"][-1]["message"]
+
+
+def test_run_graph():
+    deps = {"a": [], "b": ["a"], "c": [], "d": ["b", "c"]}
+    done = []
+    lock = threading.Lock()
+
+    def func(index, item):
+        for dep in deps[item]:
+            assert dep in done
+        time.sleep(0.01)
+        with lock:
+            done.append(item)
+        return item.upper()
+
+    res = run_graph(["a", "b", "c", "d"], deps.get, func, 3)
+    assert res == {"a": "A", "b": "B", "c": "C", "d": "D"}
+    assert done.index("a") < done.index("b") < done.index("d")
+
+
+def test_run_graph_ignores_outside_dependencies():
+    res = run_graph(["b"], lambda x: ["a"], lambda i, x: i, 2)
+    assert res["b"] in [0, 1]
+
+
+def test_run_graph_skips_children_of_failed():
+    deps = {"a": [], "b": ["a"], "c": ["b"], "d": ["c", "e"], "e": []}
+    run = []
+
+    def func(index, item):
+        run.append(item)
+        return item != "b"
+
+    res = run_graph(["a", "b", "c", "d", "e"], deps.get, func, 2,
+                    lambda r: r)
+    assert sorted(run) == ["a", "b", "e"]
+    assert res == {"a": True, "b": False, "c": None, "d": None, "e": True}
+
+
+def test_run_graph_skips_children_of_raising():
+    deps = {"a": [], "b": ["a"], "c": [], "d": ["c"]}
+    run = []
+
+    def func(index, item):
+        run.append(item)
+        if item in "ac":
+            raise ValueError(item)
+        return {"status": 1}
+
+    def proceed(r):
+        return r["status"] < 3
+
+    for _proceed in [proceed, None]:
+        del run[:]
+        res = run_graph(["a", "b", "c", "d"], deps.get, func, 2, _proceed)
+        assert sorted(run) == ["a", "c"]
+        assert isinstance(res["a"], ValueError)
+        assert res["b"] is None and res["d"] is None
+
+    res = run_graph(["c", "d"], deps.get, lambda i, x: {}, 2, proceed)
+    assert res == {"c": {}, "d": None}
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+
+from oictest import oprp
+from oictest.cache import TTLCache
+
+__author__ = 'roland'
+
+
+def test_lru():
+    cache = TTLCache(max_entries=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1
+    cache["c"] = 3
+    assert "b" not in cache
+    assert cache["a"] == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert cache.counters["eviction"] == 1
+    assert cache.counters["miss"] == 1
+
+
+def test_ttl():
+    cache = TTLCache(ttl=60)
+    cache["a"] = {"id_token": ["x"]}
+    cache.entries["a"] = (time.time() - 1, cache.entries["a"][1])
+    try:
+        cache["a"]
+    except KeyError:
+        pass
+    else:
+        assert False
+    assert cache.counters["expired"] == 1
+    cache["a"] = 1
+    del cache["a"]
+    assert cache.get("a") is None
+
+
+def test_spill():
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        cache = TTLCache(max_entries=1, spill=path)
+        node = oprp.Node("OP-A-1", "desc")
+        node.cache = cache
+        cache["a"] = node
+        cache["b"] = 2
+        assert len(cache) == 1
+        assert cache.counters["spilled"] == 1
+
+        _node = cache["a"]
+        assert _node.name == "OP-A-1"
+        assert _node.cache is cache
+        # and now b is on disc
+        assert cache["b"] == 2
+    finally:
+        os.unlink(path)
@@ -0,0 +1,86 @@
+import pytest
+
+from oictest import check
+from oauth2test.check import CheckErrorResponseForInvalidType
+from rrtest import Unknown
+from rrtest.check import REGISTRY
+from rrtest.check import CheckErrorResponse
+from rrtest.check import CheckHTTPResponse
+from rrtest.check import Error
+from rrtest.check import Registry
+
+__author__ = 'roland'
+
+
+class MultiLine(Error):
+    """
+    A check with
+      a docstring over
+    several lines
+    """
+    cid = "multi-line"
+    mti = False
+
+
+class NoDoc(MultiLine):
+    pass
+
+
+def test_doc_name():
+    assert MultiLine.doc_name == "A check with a docstring over several lines"
+    assert NoDoc.doc_name == ""
+    res = MultiLine().response()
+    assert res["name"] == MultiLine.doc_name
+    assert res["mti"] is False
+    assert res["id"] == "multi-line"
+
+
+def test_registered():
+    assert REGISTRY.get("multi-line", __name__) == MultiLine
+    # only visible within its own namespace
+    assert REGISTRY.get("multi-line", "oictest.check") is None
+
+
+def test_factory():
+    assert check.factory("check-http-response") == CheckHTTPResponse
+    assert check.factory("verify-access-token-response") == \
+        check.VerifyAccessTokenResponse
+    with pytest.raises(Unknown):
+        check.factory("no-such-check")
+
+
+def test_inherited_cid():
+    # A subclass that doesn't define its own id doesn't replace its parent
+    from oauth2test.check import factory
+    assert CheckErrorResponseForInvalidType.cid == "check-error-response"
+    assert factory("check-error-response") == CheckErrorResponse
+
+
+def test_namespaces():
+    reg = Registry()
+
+    class A(object):
+        cid = "a"
+        mti = True
+        doc_name = "A"
+
+    class B(A):
+        cid = "b"
+
+    class A2(A):
+        cid = "a"
+        doc_name = "A2"
+
+    A.__module__ = "base"
+    B.__module__ = "base"
+    A2.__module__ = "derived"
+    for cls in [A, B, A2]:
+        reg.add(cls)
+    reg.extend("derived", "base")
+
+    assert reg.get("a", "base") == A
+    assert reg.get("a", "derived") == A2
+    assert reg.get("b", "derived") == B
+    assert reg.describe("derived") == [
+        {"id": "a", "name": "A2", "mti": True, "class": "A2"},
+        {"id": "b", "name": "A", "mti": True, "class": "B"}]
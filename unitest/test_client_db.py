@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+
+from oictest.client_db import ClientDB
+
+__author__ = 'roland'
+
+
+def test_mapping():
+    cdb = ClientDB()
+    cdb["abcdef"] = {"client_id": "abcdef", "client_secret": "secret",
+                     "redirect_uris": [["https://rp.example.com/cb", None]]}
+    cdb["rat"] = "abcdef"
+    assert "abcdef" in cdb
+    assert cdb[cdb["rat"]]["client_secret"] == "secret"
+    assert sorted(cdb.keys()) == ["abcdef", "rat"]
+    assert cdb.by_redirect_uri("https://rp.example.com/cb") == ["abcdef"]
+
+    cdb.cache.clear()
+    assert cdb["abcdef"]["redirect_uris"] == [["https://rp.example.com/cb",
+                                               None]]
+    assert cdb.remove_client("abcdef") == 2
+    assert "rat" not in cdb
+    assert cdb.by_redirect_uri("https://rp.example.com/cb") == []
+    try:
+        del cdb["abcdef"]
+    except KeyError:
+        pass
+    else:
+        assert False
+
+
+def test_expiry():
+    tdir = tempfile.mkdtemp()
+    path = os.path.join(tdir, "client_db.sqlite")
+    try:
+        cdb = ClientDB(path, ttl=-1)
+        cdb["dynamic"] = {"client_id": "dynamic"}
+        static = cdb.create(["https://rp.example.com/cb"])
+        assert "dynamic" not in cdb
+        assert static["client_id"] in cdb
+        assert cdb.purge() == 1
+
+        # another process using the same database
+        assert ClientDB(path).keys() == [static["client_id"]]
+    finally:
+        shutil.rmtree(tdir)
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+
+from mako.lookup import TemplateLookup
+
+from oictest.dir_index import DirIndex
+from oictest.dir_index import ListingPages
+from oictest.dir_index import page_args
+from oictest.dir_index import page_links
+from oictest.dir_index import paginate
+from oictest.dir_index import paging
+
+__author__ = 'roland'
+
+
+def touch(*path):
+    if not os.path.isdir(os.path.dirname(os.path.join(*path))):
+        os.makedirs(os.path.dirname(os.path.join(*path)))
+    open(os.path.join(*path), "w").close()
+
+
+def test_listing():
+    root = tempfile.mkdtemp()
+    try:
+        touch(root, "iss%2F", "C.T.T.ns", "OP-A-1")
+        touch(root, "iss%2F", ".hidden")
+        index = DirIndex()
+        _listing = index.listing(root)
+        assert _listing.dirs == ["iss%2F"]
+        assert index.listing(root) is _listing
+        assert index.listing(os.path.join(root, "iss%2F")).files == []
+
+        _prof = os.path.join(root, "iss%2F", "C.T.T.ns")
+        assert index.listing(_prof).files == ["OP-A-1"]
+        touch(_prof, "OP-A-2")
+        index.invalidate(os.path.join(_prof, "OP-A-2"))
+        assert index.listing(_prof).files == ["OP-A-1", "OP-A-2"]
+
+        assert index.with_or_without_slash(
+            os.path.join(root, "iss")) == os.path.join(root, "iss%2F")
+        assert index.with_or_without_slash(os.path.join(root, "x")) is None
+        assert index.listing(os.path.join(root, "x")) is None
+    finally:
+        shutil.rmtree(root)
+
+
+def test_paginate():
+    args = page_args({"QUERY_STRING": "offset=2&limit=2&name=op-a"})
+    items = [("OP-A-%d" % i, "p/OP-A-%d" % i) for i in range(5)]
+    items.append(("OP-B-1", "p/OP-B-1"))
+    logs, page = paginate(items, args)
+    assert logs == items[2:4]
+    assert page["total"] == 5
+    assert page_links(page) == ["?offset=0&limit=2&name=op-a",
+                                "?offset=4&limit=2&name=op-a"]
+    assert paging(page) == (
+        '<p>3-4 of 5 <a href="?offset=0&limit=2&name=op-a">Previous</a>'
+        ' <a href="?offset=4&limit=2&name=op-a">Next</a></p>')
+    assert paging(paginate(items, page_args({}))[1]) == ""
+
+    args = page_args({"QUERY_STRING": "offset=x&limit=0"})
+    assert args["offset"] == 0 and args["limit"] > 0
+
+
+def test_not_modified():
+    tdir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(tdir, "logs.mako"), "w") as fp:
+            fp.write("${len(logs)}")
+        lookup = TemplateLookup(directories=[tdir])
+        pages = ListingPages()
+        etag = pages.etag("log", 1)
+        status = []
+
+        def start_response(sta, headers):
+            status.append((sta, dict(headers)))
+
+        body = pages.respond({}, start_response, etag, lookup, "logs.mako",
+                             logs=[1, 2])
+        assert "".join(body) == "2"
+        assert status[-1][1]["ETag"] == etag
+
+        # rendered once
+        body = pages.respond({}, start_response, etag, lookup, "logs.mako",
+                             logs=[])
+        assert "".join(body) == "2"
+
+        assert pages.respond({"HTTP_IF_NONE_MATCH": etag}, start_response,
+                             etag, lookup, "logs.mako", logs=[]) == []
+        assert status[-1][0] == "304 Not Modified"
+    finally:
+        shutil.rmtree(tdir)
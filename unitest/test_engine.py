@@ -0,0 +1,60 @@
+from rrtest import Trace
+from rrtest.engine import Engine
+from rrtest.tool import Conversation
+
+__author__ = 'roland'
+
+LOG = []
+
+
+class Client(object):
+    provider_info = {}
+
+
+class Step(object):
+    def __call__(self, conv):
+        LOG.append((conv.client_config["name"], conv.flow_index))
+
+
+class Fail(object):
+    def __call__(self, conv):
+        raise ValueError("bad")
+
+
+def oper(*phases):
+    return {"sequence": list(phases),
+            "flow": [p.__name__ for p in phases]}
+
+
+def conversation(name):
+    return Conversation(Client(), {"name": name}, Trace(), [])
+
+
+def test_steps():
+    conv = conversation("a")
+    assert list(conv.steps(oper(Step, Step, Step))) == [0, 1, 2]
+
+
+def test_interleave():
+    del LOG[:]
+    done = []
+    engine = Engine(1, lambda key, conv, err: done.append(key))
+    for name in ["a", "b"]:
+        engine.add(name, conversation(name), oper(Step, Step))
+    engine.add("c", conversation("c"), oper(Step, Fail, Step))
+    res = engine.run()
+
+    # with a single worker the conversations take turns
+    assert LOG == [("a", 0), ("b", 0), ("c", 0), ("a", 1), ("b", 1)]
+    assert res["a"][1] is None
+    assert isinstance(res["c"][1], ValueError)
+    assert sorted(done) == ["a", "b", "c"]
+
+
+def test_many():
+    engine = Engine(4)
+    for i in range(100):
+        engine.add(i, conversation(str(i)), oper(Step, Step, Step))
+    res = engine.run()
+    assert len(res) == 100
+    assert all([err is None for conv, err in res.values()])
@@ -0,0 +1,51 @@
+from oictest.graph import FlowRegistry
+from oictest.graph import flatten
+from oictest.graph import node_index
+from oictest.graph import sort_flows_into_graph
+from oictest.graph import sorted_flows
+
+__author__ = 'roland'
+
+FLOWS = {
+    "OP-A-1": {"name": "a1", "sequence": [], "profile": "C.."},
+    "OP-A-2": {"name": "a2", "sequence": ["rm_cookie"], "profile": "I..",
+               "depends": ["OP-A-1"]},
+    "OP-B-1": {"name": "b1", "sequence": [], "profile": "C..",
+               "depends": ["OP-A-1", "OP-A-2"]},
+    "OP-B-2": {"name": "b2", "sequence": [], "profile": "C,I.."},
+}
+
+
+def test_registry():
+    reg = FlowRegistry(FLOWS)
+    assert "OP-A-2" in reg
+    assert "OP-C-1" not in reg
+    assert reg.group("OP-A") == ["OP-A-1", "OP-A-2"]
+    assert reg.group("OP-B-") == ["OP-B-1", "OP-B-2"]
+    assert reg.group("OP") == ["OP-A-1", "OP-A-2", "OP-B-1", "OP-B-2"]
+    assert reg.profile_flows("C.T.T") == ["OP-A-1", "OP-B-1", "OP-B-2"]
+    assert reg.profile_flows("I.T.T") == ["OP-A-2", "OP-B-2"]
+
+
+def test_order():
+    order = sorted_flows(FLOWS)
+    assert sorted(order) == sorted(FLOWS.keys())
+    for fid, spec in FLOWS.items():
+        for dep in spec.get("depends", []):
+            assert order.index(dep) < order.index(fid)
+
+
+def test_graph():
+    root = sort_flows_into_graph(FLOWS)
+    assert sorted(root.keys()) == ["OP-A-1", "OP-B-2"]
+    index = node_index(root)
+    assert sorted(index.keys()) == sorted(FLOWS.keys())
+    assert index["OP-A-2"].rmc
+    assert [p.name for p in index["OP-B-1"].parent] == ["OP-A-1", "OP-A-2"]
+    assert index["OP-A-2"].children["OP-B-1"] is index["OP-B-1"]
+    # OP-B-1 has two parents
+    assert len(flatten(root)) == 5
+
+    # dependencies outside the group are included
+    root = sort_flows_into_graph(FLOWS, "OP-B-1")
+    assert sorted(node_index(root).keys()) == ["OP-A-1", "OP-A-2", "OP-B-1"]
@@ -0,0 +1,86 @@
+import pytest
+import requests
+
+from rrtest import interaction
+from rrtest.interaction import InteractionNeeded
+from rrtest.interaction import Interaction
+from rrtest.interaction import PageCache
+from rrtest.interaction import RResponse
+from rrtest.interaction import parse_forms
+
+__author__ = 'roland'
+
+LOGIN = """<html><head><title>Login page</title></head>
+<body><form action="/login" method="POST">
+<input type="text" name="login"/><input type="submit" name="ok"/>
+</form></body></html>"""
+
+CONSENT = "<html><head><title>Consent</title></head><body></body></html>"
+
+INTERACTIONS = [
+    {"matches": {"class": "Discover"}, "args": {}},
+    {"matches": {"url": "https://op.example.com/login",
+                 "title": "Login page"}, "page-type": "login", "control": {}},
+    {"matches": {"title": "Consent"}, "page-type": "user-consent",
+     "control": {}},
+    {"matches": {"url": "https://op.example.com/login"},
+     "page-type": "other", "control": {}},
+    {"matches": {"content": "Oops"}, "page-type": "error", "control": {}},
+]
+
+
+def test_pick_interaction():
+    intact = Interaction(None, INTERACTIONS)
+    _login = "https://op.example.com/login"
+    assert intact.pick_interaction(_login, LOGIN)["page-type"] == "login"
+    assert intact.pick_interaction(_login, CONSENT)["page-type"] == \
+        "user-consent"
+    assert intact.pick_interaction(_login, "")["page-type"] == "other"
+    assert intact.pick_interaction("https://op.example.com/x",
+                                   "Oops")["page-type"] == "error"
+    with pytest.raises(InteractionNeeded):
+        intact.pick_interaction("https://op.example.com/x", LOGIN)
+
+
+def test_reindex():
+    _list = []
+    intact = Interaction(None, _list)
+    with pytest.raises(InteractionNeeded):
+        intact.pick_interaction("", CONSENT)
+    _list.append(INTERACTIONS[2])
+    assert intact.pick_interaction("", CONSENT) == INTERACTIONS[2]
+
+
+def test_page_cache():
+    cache = PageCache(2)
+    assert cache.title(LOGIN) == (u"Login page",)
+    assert cache.title("<html><body></body></html>") is None
+    cache.title(CONSENT)
+    assert list(cache.pages.keys()) == ["<html><body></body></html>",
+                                        CONSENT]
+
+
+def test_page_cache_parses_title_only(monkeypatch):
+    soups = []
+    _soup = interaction.BeautifulSoup
+
+    def soup(*args, **kwargs):
+        _bs = _soup(*args, **kwargs)
+        soups.append(_bs)
+        return _bs
+
+    monkeypatch.setattr(interaction, "BeautifulSoup", soup)
+    assert PageCache().title(LOGIN) == (u"Login page",)
+    assert [t.name for t in soups[0].find_all(True)] == ["title"]
+
+
+def test_parse_forms_once():
+    resp = requests.Response()
+    resp._content = LOGIN
+    resp.status_code = 200
+    resp.url = "https://op.example.com/login"
+    resp.encoding = "utf-8"
+
+    forms = parse_forms(RResponse(resp), resp)
+    assert forms[1].action == "https://op.example.com/login"
+    assert parse_forms(RResponse(resp), resp) is forms
@@ -0,0 +1,64 @@
+import os
+
+from jwkest.jws import JWS
+from jwkest.jws import alg2keytype
+from oic.oic.message import IdToken
+from oic.utils.authn.authn_context import AuthnBroker
+from oic.utils.authn.client import verify_client
+from oic.utils.authn.user import NoAuthn
+from oic.utils.sdb import SessionDB
+from oictest.key_material import load_keys
+from oictest.mode import ProviderPool
+
+__author__ = 'roland'
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+KEYS = [
+    {"type": "RSA", "use": ["sig"],
+     "key": os.path.join(BASE, "..", "test", "oic_rp", "op", "keys",
+                         "pyoidc_sig")},
+    {"type": "EC", "crv": "P-256", "use": ["sig"]}
+]
+
+
+def test_sign():
+    km = load_keys(KEYS)
+    assert load_keys(KEYS) is km
+
+    idt = IdToken(iss="https://op.example.com", sub="sub", aud="client",
+                  exp=1500000000, iat=1400000000)
+    _rsa = km.keyjar.get_signing_key("RSA", "", alg="RS256")
+    jws = km.sign(idt, "RS256")
+    assert jws == idt.to_jwt(_rsa, "RS256")
+    assert km.sign(idt, "RS256") == jws
+    assert len(km.signers) == 1
+
+    for alg in ["PS256", "ES256"]:
+        jws = km.sign(idt, alg)
+        _keys = km.keyjar.get_verify_key(alg2keytype(alg), "")
+        assert JWS().verify_compact(jws, _keys) == idt.to_dict()
+
+    assert km.counters["sign"] == 4
+    assert km.export() == km.export()
+
+
+def test_provider():
+    km = load_keys(KEYS)
+    broker = AuthnBroker()
+    broker.add("UNDEFINED", NoAuthn(None, user="diana"))
+    com_args = {"name": "https://op.example.com/",
+                "sdb": SessionDB("https://op.example.com/"), "cdb": {},
+                "authn_broker": broker, "userinfo": None, "authz": None,
+                "client_authn": verify_client, "symkey": "0123456789abcdef"}
+    op_arg = {"baseurl": "https://op.example.com/", "keyjar": km.keyjar,
+              "key_material": km}
+    pool = ProviderPool(com_args, op_arg)
+    op = pool.get({"test_id": "rp-1", "sign_alg": "RS256"})
+
+    session = {"sub": "sub", "client_id": "client", "authn_event": ""}
+    _count = km.counters["sign"]
+    jws = op.id_token_as_signed_jwt(session)
+    assert km.counters["sign"] == _count + 1
+    op.key_material = None
+    assert op.id_token_as_signed_jwt(session).split(".")[0] == jws.split(
+        ".")[0]
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+
+from oictest.log_index import LogIndex
+from oictest.log_index import read_summary
+from oictest.log_writer import LogWriter
+from rrtest import Trace
+
+__author__ = 'roland'
+
+ISS = "https://example.com"
+
+
+def write_log(root, prof, tid, result, lines=3):
+    path = os.path.join(root, "https%3A%2F%2Fexample.com", prof, tid)
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    trace = Trace()
+    for i in range(lines):
+        trace.info("line %d" % i)
+    info = {"Issuer": ISS, "Profile": prof, "Test ID": tid,
+            "Timestamp": "2015-06-01T10:00:00Z"}
+    LogWriter(path).write(info, trace, [], result)
+    return path
+
+
+def test_read_summary():
+    root = tempfile.mkdtemp()
+    try:
+        path = write_log(root, "C.T.T.ns", "OP-A-1",
+                         "WARNING\nWarnings:\nHmm")
+        headers, result = read_summary(path)
+        assert headers["Test ID"] == "OP-A-1"
+        assert result == "WARNING"
+
+        # the result is not in the part of the file read first
+        path = write_log(root, "C.T.T.ns", "OP-A-2", "PASSED", 10000)
+        assert read_summary(path)[1] == "PASSED"
+    finally:
+        shutil.rmtree(root)
+
+
+def test_record():
+    root = tempfile.mkdtemp()
+    try:
+        index = LogIndex(root)
+        path = write_log(root, "C.T.T.ns", "OP-A-1", "PARTIAL RESULT")
+        index.record(path, ISS, "2015-06-01T10:00:00Z", "PARTIAL RESULT")
+        index.record(path, ISS, "2015-06-01T10:00:01Z", "PARTIAL RESULT")
+        index.record(path, ISS, "2015-06-01T10:00:02Z", "PASSED")
+        assert len(list(index.entries())) == 2
+
+        _key = ("https%3A%2F%2Fexample.com", "C.T.T.ns", "OP-A-1")
+        latest = index.latest()
+        assert latest.keys() == [_key]
+        assert latest[_key]["result"] == "PASSED"
+        assert latest[_key]["issuer"] == ISS
+
+        index.compact()
+        assert len(list(index.entries())) == 1
+    finally:
+        shutil.rmtree(root)
+
+
+def test_rebuild():
+    root = tempfile.mkdtemp()
+    try:
+        write_log(root, "C.T.T.ns", "OP-A-1", "PASSED")
+        write_log(root, "C.T.T.ns", "OP-A-2", "FAILED")
+        write_log(root, "I.T.T.ns", "OP-A-1", "PARTIAL RESULT")
+        index = LogIndex(root)
+        index.rebuild()
+        latest = index.latest()
+        assert sorted([(k[1], k[2], v["result"]) for k, v in
+                       latest.items()]) == [
+            ("C.T.T.ns", "OP-A-1", "PASSED"),
+            ("C.T.T.ns", "OP-A-2", "FAILED"),
+            ("I.T.T.ns", "OP-A-1", "PARTIAL RESULT")]
+    finally:
+        shutil.rmtree(root)
+
+
+def test_update():
+    root = tempfile.mkdtemp()
+    try:
+        old = write_log(root, "C.T.T.ns", "OP-A-1", "PASSED")
+        index = LogIndex(root)
+        path = write_log(root, "C.T.T.ns", "OP-A-2", "FAILED")
+        index.record(path, ISS, "2015-06-01T10:00:00Z", "FAILED")
+        # the catalogue is hidden from whoever walks the tree
+        assert [n for n in os.listdir(root) if not n.startswith(".")] == [
+            "https%3A%2F%2Fexample.com"]
+
+        assert index.update() == (1, 0)
+        assert sorted([k[2] for k in index.latest()]) == ["OP-A-1", "OP-A-2"]
+        assert index.update() == (0, 0)
+
+        os.unlink(old)
+        assert index.update() == (0, 1)
+        assert [k[2] for k in index.latest()] == ["OP-A-2"]
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+from rrtest import Trace
+from rrtest.check import OK
+from rrtest.check import WARNING
+from oictest.log_writer import LogWriter
+from oictest import oprp
+
+__author__ = 'roland'
+
+INFO = {"Issuer": "https://example.com", "Profile": "C.T.T.ns",
+        "Test ID": "OP-Response-code", "Timestamp": "2015-06-01T10:00:00Z"}
+
+
+def full_log(info, trace, output, result):
+    sline = 60 * "="
+    _out = ["%s: %s" % (k, info[k]) for k in ["Issuer", "Profile", "Test ID",
+                                               "Timestamp"]]
+    _out.extend(["", sline, ""])
+    _out.extend(oprp.trace_output(trace))
+    _out.extend(["", sline, ""])
+    _out.extend(oprp.test_output(output))
+    _out.extend(["", sline, ""])
+    _out.append("RESULT: %s" % result)
+    _out.append("")
+    return "\n".join(_out)
+
+
+def test_incremental_write():
+    _fd, path = tempfile.mkstemp()
+    os.close(_fd)
+    writer = LogWriter(path)
+    trace = Trace()
+    output = []
+    info = INFO.copy()
+
+    try:
+        writer.write(info, trace, output, "PARTIAL RESULT")
+        assert open(path).read() == full_log(info, trace, output,
+                                             "PARTIAL RESULT")
+
+        trace.info("------------ AuthorizationRequest ------------")
+        trace.request("URL: https://example.com/authz")
+        writer.write(info, trace, output, "PARTIAL RESULT")
+        assert open(path).read() == full_log(info, trace, output,
+                                             "PARTIAL RESULT")
+
+        output.append(("AuthorizationRequest", "post"))
+        output.append({"id": "check-http-response", "status": OK,
+                       "name": "Checks that the HTTP response status is OK"})
+        writer.write(info, trace, output, "PARTIAL RESULT")
+        assert open(path).read() == full_log(info, trace, output,
+                                             "PARTIAL RESULT")
+
+        trace.reply(u"CONTENT: r\xe4ksm\xf6rg\xe5s")
+        output.append({"id": "-", "status": WARNING, "message": "Hmm"})
+        info["Timestamp"] = "2015-06-01T10:00:05Z"
+        writer.write(info, trace, output, "WARNING\nWarnings:\nHmm")
+        assert open(path).read() == full_log(
+            info, trace, output, "WARNING\nWarnings:\nHmm").encode("utf8")
+
+        # a new trace means starting over
+        trace = Trace()
+        trace.info("restart")
+        writer.write(info, trace, output, "PARTIAL RESULT")
+        assert open(path).read() == full_log(
+            info, trace, output, "PARTIAL RESULT").encode("utf8")
+    finally:
+        os.unlink(path)
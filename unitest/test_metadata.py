@@ -0,0 +1,101 @@
+import json
+
+import responses
+from oic.oauth2.base import PBase
+from oic.oic import Client
+from oic.utils.keyio import KeyBundle
+
+from oictest.metadata import MetadataCache
+from oictest.metadata import bypass_cache
+from oictest.metadata import cache_control
+from oictest.metadata import load_jwks
+
+__author__ = 'roland'
+
+ISS = "https://op.example.com"
+JWKS_URI = ISS + "/jwks.json"
+JWKS = {"keys": [{"kty": "oct", "k": "c2VjcmV0", "use": "sig"}]}
+
+
+def test_cache_control():
+    assert cache_control({"cache-control": 'public, max-age="60"'}) == {
+        "public": "", "max-age": "60"}
+    assert cache_control({}) == {}
+
+
+def test_bypass_cache():
+    assert bypass_cache({"new-signing-keys": {}, "check-http-response": {}})
+    assert not bypass_cache({"check-http-response": {}})
+    assert not bypass_cache(None)
+
+
+@responses.activate
+def test_max_age():
+    responses.add(responses.GET, JWKS_URI, body=json.dumps(JWKS),
+                  adding_headers={"Cache-Control": "max-age=60"})
+    cache = MetadataCache()
+    httpc = PBase()
+    resp = cache.fetch(JWKS_URI, ISS, httpc.http_request)
+    assert cache.fetch(JWKS_URI, ISS, httpc.http_request) is resp
+    assert len(responses.calls) == 1
+    assert cache.counters["hit"] == 1
+    assert cache.counters["miss"] == 1
+
+    cache.fetch(JWKS_URI, ISS, httpc.http_request, bypass=True)
+    assert len(responses.calls) == 2
+    assert cache.counters["bypass"] == 1
+
+    cache.clear(ISS)
+    cache.fetch(JWKS_URI, ISS, httpc.http_request)
+    assert cache.counters["miss"] == 2
+
+
+@responses.activate
+def test_revalidate():
+    responses.add(responses.GET, JWKS_URI, body=json.dumps(JWKS),
+                  adding_headers={"ETag": '"v1"'})
+    cache = MetadataCache()
+    httpc = PBase()
+    resp = cache.fetch(JWKS_URI, ISS, httpc.http_request)
+
+    responses.reset()
+    responses.add(responses.GET, JWKS_URI, status=304)
+    assert cache.fetch(JWKS_URI, ISS, httpc.http_request) is resp
+    assert responses.calls[0].request.headers["If-None-Match"] == '"v1"'
+    assert cache.counters["revalidated"] == 1
+
+    kb = KeyBundle(source=JWKS_URI)
+    load_jwks(kb, resp)
+    assert len(kb.keys()) == 1
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_no_store():
+    responses.add(responses.GET, JWKS_URI, body=json.dumps(JWKS),
+                  adding_headers={"Cache-Control": "no-store, max-age=60"})
+    cache = MetadataCache()
+    httpc = PBase()
+    cache.fetch(JWKS_URI, ISS, httpc.http_request)
+    cache.fetch(JWKS_URI, ISS, httpc.http_request)
+    assert len(responses.calls) == 2
+    assert cache.counters["miss"] == 2
+
+
+@responses.activate
+def test_provider_config():
+    pcr = {"issuer": ISS, "authorization_endpoint": ISS + "/authz",
+           "jwks_uri": JWKS_URI, "response_types_supported": ["code"],
+           "subject_types_supported": ["public"],
+           "id_token_signing_alg_values_supported": ["RS256"]}
+    responses.add(responses.GET, ISS + "/.well-known/openid-configuration",
+                  body=json.dumps(pcr),
+                  adding_headers={"Cache-Control": "max-age=60"})
+    cache = MetadataCache()
+    for _ in range(2):
+        client = Client()
+        res = cache.provider_config(client, ISS)
+        assert res["issuer"] == ISS
+        assert client.provider_info["issuer"] == ISS
+        assert "http_request" not in client.__dict__
+    assert len(responses.calls) == 1
@@ -1,5 +1,11 @@
 from oic.oic import OIDCONF_PATTERN
+from oic.utils.authn.authn_context import AuthnBroker
+from oic.utils.authn.client import verify_client
+from oic.utils.authn.user import NoAuthn
+from oic.utils.sdb import SessionDB
 from oictest.mode import extract_mode, mode2path
+from oictest.mode import ModeCache
+from oictest.mode import ProviderPool
 
 __author__ = 'roland'
 
@@ -42,6 +48,21 @@ def test_extract_mode():
     assert path == 'token'
 
 
+def test_mode_cache():
+    modes = ModeCache(size=2)
+    for path in ["/test_id/RS256/_/_/normal/token",
+                 "test_id/RS256/_/_/normal/userinfo",
+                 "test_id/RS256/_/_/normal",
+                 OIDCONF_PATTERN % "test_id", "test_id", ""]:
+        assert modes(path) == extract_mode(path)
+    assert modes.counters == {"hit": 1, "miss": 5}
+    assert len(modes.modes) == 2
+
+    mod, _ = modes("test_id")
+    mod["test_id"] = "other"
+    assert modes("test_id")[0] == {"test_id": "test_id"}
+
+
 def test_mode2path():
     path = mode2path({"test_id": "test_id"})
     assert path == "test_id/_/_/_/normal"
@@ -56,5 +77,29 @@ def test_mode2path():
                     "normal,aggregated")
 
 
+
+def test_provider_pool():
+    broker = AuthnBroker()
+    broker.add("UNDEFINED", NoAuthn(None, user="diana"))
+    com_args = {"name": "https://op.example.com/",
+                "sdb": SessionDB("https://op.example.com/"), "cdb": {},
+                "authn_broker": broker, "userinfo": None, "authz": None,
+                "client_authn": verify_client, "symkey": "0123456789abcdef"}
+    pool = ProviderPool(com_args, {"baseurl": "https://op.example.com/"},
+                        size=2)
+
+    op1 = pool.get({"test_id": "rp-1", "sign_alg": "RS256"})
+    assert op1.baseurl == "https://op.example.com/rp-1/RS256/_/_/normal"
+    assert op1.jwx_def["sign_alg"]["id_token"] == "RS256"
+    assert pool.get({"sign_alg": "RS256", "test_id": "rp-1"}) is op1
+    assert broker[0][0].srv is op1
+
+    op2 = pool.get({"test_id": "rp-2", "behavior": ["iat"]})
+    assert op2.behavior_type == ["iat"]
+    assert op2.claim_access_token is op1.claim_access_token
+    pool.get({"test_id": "rp-3"})
+    assert pool.counters == {"hit": 1, "miss": 3, "eviction": 1}
+    assert pool.get({"test_id": "rp-1", "sign_alg": "RS256"}) is not op1
+
 if __name__ == "__main__":
     test_mode2path()
\ No newline at end of file
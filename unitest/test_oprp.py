@@ -1,5 +1,12 @@
+import json
+import os
+
+from mako.lookup import TemplateLookup
+
 from rrtest import Trace
 from oictest.oprp import not_supported
+from oictest.oprp import OPRP
+from oictest.oprp import get_node
 from oictest.base import Conversation
 from oictest.check import factory as check_factory
 from oictest.oidcrp import Client
@@ -21,6 +28,72 @@ def test_not_support():
     assert not_supported(["bac", "def"], ["abc", "def"]) == ["bac"]
     assert not_supported(["abc", "def", "ghi"], ["abc", "def"]) == ["ghi"]
 
+class FlowDefs(object):
+    ORDDESC = ["OP-A", "OP-B"]
+    FLOWS = {"OP-B-1": {"profile": "C.."},
+             "OP-A-2": {"profile": "I.."},
+             "OP-A-1": {"profile": "C,I.."}}
+    DESC = {}
+
+
+def test_context():
+    rp = OPRP(None, None, FlowDefs, {}, "C.T.T", None, None, None)
+    assert rp.flow_names == ["OP-A-1", "OP-A-2", "OP-B-1"]
+
+    ctx = rp.context({"PATH_INFO": "/"}, None)
+    assert ctx.environ == {"PATH_INFO": "/"}
+    assert rp.environ is None
+    assert ctx.profile_flows("C.T.T") == ["OP-A-1", "OP-B-1"]
+    # cache is shared
+    assert rp.profile_flows("I.T.T") == ["OP-A-1", "OP-A-2"]
+    assert ctx.registry is rp.registry
+
+    session = {"conv": None}
+    ctx.init_session(session, "C.T.T")
+    assert [n.name for n in session["tests"]] == ["OP-A-1", "OP-B-1"]
+    assert get_node(session["tests"], "OP-B-1") is session["tests"][1]
+    assert get_node(session["tests"], "OP-A-2") is None
+
+
+def test_flow_states_new_session():
+    htdocs = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                          "test", "oic_op", "rp", "htdocs")
+    lookup = TemplateLookup(directories=[htdocs], input_encoding='utf-8',
+                            output_encoding='utf-8')
+    rp = OPRP(lookup, None, FlowDefs, {}, "C.T.T", None, None, None)
+    status = []
+    ctx = rp.context({}, lambda s, h: status.append(s))
+    res = ctx.flow_states({})
+    assert status == ["200 OK"]
+    assert json.loads(res[0]) == {}
+
+
+class Profiles(object):
+    PROFILEMAP = {}
+    calls = 0
+
+    @classmethod
+    def get_sequence(cls, flow_id, spec, flows_, profile_map, phases):
+        cls.calls += 1
+        return [("discover", {"request_args": {"a": 1}}),
+                ("login", {"expect_error": {"stop": True}})]
+
+
+class Phases(object):
+    PHASES = {}
+
+
+def test_get_sequence():
+    rp = OPRP(None, None, FlowDefs, {}, "C.T.T", Profiles, Phases, None)
+    seq1 = rp.get_sequence("OP-A-1", "C.T.T")
+    del seq1[1][1]["expect_error"]
+    seq1.append(("done", {}))
+
+    seq2 = rp.context({}, None).get_sequence("OP-A-1", "C.T.T")
+    assert Profiles.calls == 1
+    assert seq2 == [("discover", {"request_args": {"a": 1}}),
+                    ("login", {"expect_error": {"stop": True}})]
+
 # TODO pi.google does not exist
 # def test_support():
 #     pi = json.loads(open("pi.google").read())
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+
+from mako.lookup import TemplateLookup
+
+from oictest.oprp import Node
+from oictest.pages import FlowListPage
+from oictest.pages import precompile
+
+__author__ = 'roland'
+
+HTDOCS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                      "test", "oic_op", "rp", "htdocs")
+
+
+def argv(nodes, test_info):
+    return {"flows": nodes, "profile": "C.T.T", "test_info": test_info,
+            "base": "https://localhost:8666/",
+            "headlines": {"A": "Response Type", "B": "Discovery"},
+            "testresults": {}}
+
+
+def test_flow_list():
+    lookup = TemplateLookup(directories=[HTDOCS], input_encoding='utf-8',
+                            output_encoding='utf-8')
+    assert "flowlist.mako" in precompile(lookup)
+    nodes = [Node("OP-A-1", "Basic"), Node("OP-A-2", "Other", rmc=True),
+             Node("OP-B-1", "Discovery")]
+    page = FlowListPage()
+    template = lookup.get_template("flowlist.mako")
+
+    res = page.render(lookup, **argv(nodes, []))
+    assert res == template.render(**argv(nodes, []))
+    assert len(page.pages) == 1
+
+    nodes[1].state = 3
+    res = page.render(lookup, **argv(nodes, ["OP-A-2"]))
+    assert res == template.render(**argv(nodes, ["OP-A-2"]))
+    assert "test_info/OP-A-2" in res
+    assert len(page.pages) == 1
+
+    frag = page.fragments(template, nodes, ["OP-A-2"], "/")
+    assert frag["OP-A-2"]["state"] == 3
+    assert frag["OP-A-2"]["info"]
+    assert frag["OP-A-1"]["info"] == ""
+
+
+def test_without_slots():
+    tdir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(tdir, "flowlist.mako"), "w") as fp:
+            fp.write("${' '.join(['%s' % n.state for n in flows])}")
+        lookup = TemplateLookup(directories=[tdir])
+        nodes = [Node("OP-A-1"), Node("OP-A-2")]
+        page = FlowListPage()
+        assert page.render(lookup, **argv(nodes, [])) == "0 0"
+        nodes[0].state = 1
+        assert page.render(lookup, **argv(nodes, [])) == "1 0"
+    finally:
+        shutil.rmtree(tdir)
@@ -0,0 +1,93 @@
+import pickle
+from oic.oauth2.message import ErrorResponse
+from oic.oic.message import AccessTokenResponse
+from oic.oic.message import AuthorizationResponse
+from oic.oic.message import OpenIDSchema
+from oic.oic.message import Message
+
+from oictest.check import get_id_tokens
+from oictest.check import get_protocol_response
+from oictest.check import last_protocol_response
+from rrtest.responses import ResponseStore
+
+__author__ = 'roland'
+
+
+class Conv(object):
+    def __init__(self):
+        self.protocol_response = ResponseStore()
+
+
+def test_index():
+    store = ResponseStore()
+    err = (ErrorResponse(error="invalid_request"), "")
+    ui1 = (OpenIDSchema(sub="foo"), "{}")
+    ui2 = (OpenIDSchema(sub="bar"), "{}")
+    for item in [ui1, err, ui2]:
+        store.append(item)
+
+    assert len(store) == 3
+    assert store[-1] == ui2
+    assert list(store) == [ui1, err, ui2]
+    assert store.all(OpenIDSchema) == [ui1, ui2]
+    assert store.latest(OpenIDSchema) == ui2
+    assert store.latest(ErrorResponse) == err
+    assert store.all(Message) == [ui1, err, ui2]
+    assert store.latest(AuthorizationResponse) is None
+    assert store.all(AuthorizationResponse) == []
+
+
+def test_id_tokens():
+    conv = Conv()
+    idt = {"iss": "https://example.com", "sub": "foo"}
+    atr = AccessTokenResponse(access_token="x", token_type="Bearer",
+                              id_token=idt)
+    conv.protocol_response.append(
+        (atr, '{"access_token": "x", "id_token": "a.b.c"}'))
+
+    calls = []
+
+    def count(*args):
+        calls.append(args)
+
+    assert get_id_tokens(conv) == [(idt, "a.b.c")]
+    conv.protocol_response.memo("id_tokens", count)
+    assert calls == []  # cached
+
+    aresp = AuthorizationResponse(code="y", id_token=idt)
+    conv.protocol_response.append((aresp, "code=y&id_token=d.e.f"))
+    assert get_id_tokens(conv) == [(idt, "a.b.c"), (idt, "d.e.f")]
+    assert get_protocol_response(conv, AuthorizationResponse) == [
+        (aresp, "code=y&id_token=d.e.f")]
+
+
+def test_last():
+    conv = Conv()
+    ui = (OpenIDSchema(sub="foo"), "{}")
+    conv.protocol_response.append(ui)
+    assert last_protocol_response(conv, OpenIDSchema) == ui
+    for _conv in [conv, Conv()]:
+        _conv.protocol_response = list(_conv.protocol_response)
+        assert get_protocol_response(_conv, OpenIDSchema) == list(
+            _conv.protocol_response)
+        try:
+            last_protocol_response(_conv, AuthorizationResponse)
+        except IndexError:
+            pass
+        else:
+            assert False
+
+    try:
+        last_protocol_response(Conv(), AuthorizationResponse)
+    except IndexError:
+        pass
+    else:
+        assert False
+
+
+def test_pickle():
+    store = ResponseStore([(OpenIDSchema(sub="foo"), "{}")])
+    store.memo("x", lambda s: len(s))
+    _store = pickle.loads(pickle.dumps(store, 2))
+    assert _store.latest(OpenIDSchema)[0]["sub"] == "foo"
+    assert _store._memo == {}
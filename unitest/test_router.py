@@ -0,0 +1,58 @@
+import re
+
+from rrtest.router import MAX_GROUPS
+from rrtest.router import MethodNotAllowed
+from rrtest.router import Router
+
+__author__ = 'roland'
+
+URLS = [
+    (r'^verify', "verify"),
+    (r'.well-known/openid-configuration', "op_info", ["GET"]),
+    (r'.+\.css$', "css"),
+    (r'log', "display_log"),
+    (r'^authorization', "authorization"),
+    (r'^registration/(.*)', "registration"),
+]
+
+
+def search(path):
+    for regex, callback in [u[:2] for u in URLS]:
+        match = re.search(regex, path)
+        if match is not None:
+            try:
+                return callback, match.groups()[0]
+            except IndexError:
+                return callback, path
+    return None
+
+
+def test_same_as_search():
+    router = Router(URLS)
+    for path in ["verify", "x/.well-known/openid-configuration",
+                 "static/style.css", "authorization", "blog/authorization",
+                 "registration/abc", "registration", "token", "",
+                 "catalog.css"]:
+        assert router.resolve(path) == search(path)
+
+
+def test_methods():
+    router = Router(URLS)
+    router.path("claim", "claim", ["POST"])
+    assert router.resolve(".well-known/openid-configuration",
+                          "HEAD")[0] == "op_info"
+    assert router.resolve("claim", "POST") == ("claim", "claim")
+    try:
+        router.resolve(".well-known/openid-configuration", "POST")
+    except MethodNotAllowed as err:
+        assert err.allowed == ["GET", "HEAD"]
+    else:
+        assert False
+
+
+def test_many_routes():
+    router = Router([(r'^r%d/(\w+)' % i, i) for i in range(2 * MAX_GROUPS)])
+    router.add(r'^r', "last")
+    assert router.resolve("r150/x") == (150, "x")
+    assert router.resolve("r") == ("last", "r")
+    assert len(router._compiled) > 1
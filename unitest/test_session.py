@@ -0,0 +1,65 @@
+import cookielib
+import os
+import tempfile
+import time
+
+from oictest import oprp
+from oictest.session import SessionStore
+
+__author__ = 'roland'
+
+
+def _cookie(name, value):
+    return cookielib.Cookie(0, name, value, None, False, "example.com", True,
+                            False, "/", True, False, None, False, None, None,
+                            {})
+
+
+def test_round_trip():
+    cache = {}
+    jar = cookielib.MozillaCookieJar()
+    jar.set_cookie(_cookie("foo", "bar"))
+    store = SessionStore(shared={"cache": cache})
+
+    store.save("sid", {"cache": cache, "module": oprp, "jar": jar,
+                       "tests": [oprp.Node("OP-A-1", "desc")]})
+    store.hot.clear()
+
+    data = store.load("sid")
+    assert data["cache"] is cache
+    assert data["module"] is oprp
+    assert [c.value for c in data["jar"]] == ["bar"]
+    assert data["tests"][0].name == "OP-A-1"
+
+    # now deserialized and kept in memory
+    assert store.load("sid") is data
+    assert store.load("unknown") is None
+
+
+def test_shared_between_stores():
+    _fd, path = tempfile.mkstemp()
+    os.close(_fd)
+    try:
+        store1 = SessionStore(path)
+        store2 = SessionStore(path)
+        store1.save("sid", {"index": 1})
+        assert store2.load("sid") == {"index": 1}
+        store1.save("sid", {"index": 2})
+        # store2 has an old version in memory
+        assert store2.load("sid") == {"index": 2}
+        store2.delete("sid")
+        assert store1.load("sid") is None
+    finally:
+        os.unlink(path)
+
+
+def test_bounded_and_expired():
+    store = SessionStore(max_entries=2, timeout=60)
+    for sid in ["a", "b", "c"]:
+        store.save(sid, {"sid": sid})
+    assert list(store.hot.keys()) == ["b", "c"]
+    assert store.load("a") == {"sid": "a"}
+
+    store.db.execute("UPDATE session SET accessed=? WHERE sid='b'",
+                     (time.time() - 120,))
+    assert store.load("b") is None
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+
+from rrtest.static import StaticFiles
+from rrtest.static import byte_range
+from rrtest.static import content_type
+
+__author__ = 'roland'
+
+
+class StartResponse(object):
+    def __call__(self, status, headers):
+        self.status = status
+        self.headers = dict(headers)
+
+
+def test_byte_range():
+    assert byte_range("bytes=0-9", 100) == (0, 9)
+    assert byte_range("bytes=90-", 100) == (90, 99)
+    assert byte_range("bytes=-10", 100) == (90, 99)
+    assert byte_range("bytes=50-200", 100) == (50, 99)
+    assert byte_range("bytes=100-", 100) is False
+    assert byte_range("bytes=0-1,5-6", 100) is None
+    assert byte_range("lines=0-1", 100) is None
+
+
+def test_content_type():
+    assert content_type("static/style.css") == "text/css"
+    assert content_type("tar/iss/C.T.T.ns.tar") == "application/x-tar"
+    assert content_type("log/iss/C.T.T.ns/OP-A-1") == "text/plain"
+
+
+def test_serve():
+    tdir = tempfile.mkdtemp()
+    try:
+        small = os.path.join(tdir, "style.css")
+        with open(small, "w") as fp:
+            fp.write("body {}")
+        large = os.path.join(tdir, "OP-A-1")
+        with open(large, "w") as fp:
+            fp.write("x" * 100 + "y" * 100)
+
+        files = StaticFiles(small=10)
+        sr = StartResponse()
+        assert files({}, sr, small) == ["body {}"]
+        assert sr.status == "200 OK"
+        assert sr.headers["Content-Type"] == "text/css"
+        assert sr.headers["Content-Length"] == "7"
+        assert "max-age" in sr.headers["Cache-Control"]
+        assert small in files.cache
+
+        etag = sr.headers["ETag"]
+        assert files({"HTTP_IF_NONE_MATCH": etag}, sr, small) == []
+        assert sr.status == "304 Not Modified"
+        assert files({"HTTP_IF_MODIFIED_SINCE": sr.headers["Last-Modified"]},
+                     sr, small) == []
+        assert sr.status == "304 Not Modified"
+
+        assert "".join(files({}, sr, large)) == "x" * 100 + "y" * 100
+        assert sr.headers["Cache-Control"] == "no-cache"
+        assert large not in files.cache
+
+        body = files({"HTTP_RANGE": "bytes=95-104"}, sr, large)
+        assert "".join(body) == "x" * 5 + "y" * 5
+        assert sr.status == "206 Partial Content"
+        assert sr.headers["Content-Range"] == "bytes 95-104/200"
+
+        files({"HTTP_RANGE": "bytes=300-"}, sr, large)
+        assert sr.status.startswith("416")
+
+        files({}, sr, os.path.join(tdir, "missing"))
+        assert sr.status.startswith("404")
+    finally:
+        shutil.rmtree(tdir)
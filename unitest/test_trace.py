@@ -0,0 +1,83 @@
+import json
+from oic.oic.message import AccessTokenResponse
+from oic.oic.message import IdToken
+from oic.oic.message import OpenIDSchema
+
+from rrtest import Trace
+
+__author__ = 'roland'
+
+
+def _strip_time(line):
+    return line.split(" ", 1)[1]
+
+
+def test_render():
+    trace = Trace()
+    trace.info("---- Start ----")
+    trace.request("URL: https://example.com/authz")
+    trace.reply("STATUS: 200")
+    trace.error("Oops")
+    trace.warning("Hmm")
+    trace.response("just text")
+
+    assert len(trace) == 6
+    assert [_strip_time(l) for l in trace] == [
+        "---- Start ----", "--> URL: https://example.com/authz",
+        "<-- STATUS: 200", "[ERROR] Oops", "[WARNING] Hmm", "just text"]
+    assert trace[1] == "%f --> URL: https://example.com/authz" % (
+        trace.events[1][0])
+    assert trace[4:] == trace.trace[4:]
+    assert str(trace) == "\n".join(trace.trace)
+    assert _strip_time(trace.lastline()) == "just text"
+
+
+def test_id_token():
+    trace = Trace()
+    idt = IdToken(iss="https://example.com", sub="foo")
+    idt.jws_header = {"alg": "RS256"}
+    trace.response(idt)
+    assert len(trace) == 1
+    assert json.loads(_strip_time(trace[0]).split(": ", 1)[1]) == {
+        "id_token": {"claims": idt.to_dict(),
+                     "jws header parameters": {"alg": "RS256"}}}
+
+
+def test_message():
+    trace = Trace()
+    ui = OpenIDSchema(sub="foo", name="Bar")
+    trace.response(ui)
+    # formatted when rendered, not when added
+    assert trace.events[0][3] is ui
+    txt = json.dumps({"sub": "foo", "name": "Bar"}, sort_keys=True, indent=2,
+                     separators=(',', ': '))
+    assert trace[0] == "%f UserInfo: %s" % (trace.events[0][0], txt)
+
+    trace.response(AccessTokenResponse(access_token="x", token_type="Bearer"))
+    assert _strip_time(trace[-1]).startswith("AccessTokenResponse: {")
+
+
+def test_jsonl():
+    trace = Trace()
+    trace.request("URL: https://example.com/authz")
+    trace.response(OpenIDSchema(sub="foo"))
+    trace.info("done")
+
+    lines = [json.loads(l) for l in trace.jsonl()]
+    assert lines[0]["direction"] == "-->"
+    assert lines[0]["kind"] == "text"
+    assert lines[1]["class"] == "UserInfo"
+    assert lines[1]["payload"] == {"sub": "foo"}
+    assert "direction" not in lines[2]
+    assert [json.loads(l)["payload"] for l in trace.jsonl(2)] == ["done"]
+
+
+def test_load():
+    trace = Trace()
+    trace.request("URL: https://example.com/authz")
+    trace.response(OpenIDSchema(sub="foo"))
+    lines = trace.trace
+
+    _trace = Trace()
+    _trace.load(lines)
+    assert _trace.trace == lines
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+
+from oictest.trace_log import TraceLog
+from rrtest import Trace
+
+__author__ = 'roland'
+
+
+def test_write():
+    tdir = tempfile.mkdtemp()
+    try:
+        created = []
+        log = TraceLog(max_open=1, interval=60, created=created.append)
+        path = os.path.join(tdir, "127.0.0.1", "rp-response_type-code")
+        trace = Trace()
+        trace.info("first")
+        log.write(path, trace)
+        trace.info("second")
+        log.write(path, trace)
+        assert not os.path.exists(path)
+
+        log.flush()
+        assert created == [path]
+        text = open(path).read()
+        assert text.count("first") == 1
+        assert text.count("second") == 1
+
+        other = os.path.join(tdir, "127.0.0.1", "rp-id_token-sig")
+        log.append(other, "x\n")
+        log.flush()
+        assert log.handles.keys() == [other]
+
+        log.end(other)
+        assert log.handles.keys() == []
+        assert open(other).read() == "x\n"
+        log.close()
+    finally:
+        shutil.rmtree(tdir)
+
+
+def test_rotate():
+    tdir = tempfile.mkdtemp()
+    try:
+        log = TraceLog(max_size=10, backups=2, interval=60)
+        path = os.path.join(tdir, "log")
+        for txt in ["aaaaaaaa", "bbbbbbbb", "cccccccc", "dddddddd"]:
+            log.append(path, txt)
+            log.flush()
+        log.close()
+        assert open(path).read() == "dddddddd"
+        assert open(path + ".1").read() == "cccccccc"
+        assert open(path + ".2").read() == "bbbbbbbb"
+        assert not os.path.exists(path + ".3")
+    finally:
+        shutil.rmtree(tdir)
@@ -0,0 +1,34 @@
+import responses
+from oic.oauth2.base import PBase
+
+from rrtest.transport import KeepAlive
+from rrtest.transport import transport
+
+__author__ = 'roland'
+
+URL = "https://op.example.com/"
+
+
+class UserAgent(KeepAlive, PBase):
+    pass
+
+
+@responses.activate
+def test_cookies_stay_with_the_client():
+    responses.add(responses.GET, URL + "login", status=200,
+                  adding_headers={"Set-Cookie": "sid=alice; Path=/"})
+    responses.add(responses.GET, URL + "me", status=200)
+
+    alice = UserAgent(verify_ssl=False)
+    bob = UserAgent(verify_ssl=False)
+    alice.http_request(URL + "login")
+    bob.http_request(URL + "me")
+    alice.http_request(URL + "me")
+
+    assert "Cookie" not in responses.calls[1].request.headers
+    assert responses.calls[2].request.headers["Cookie"] == "sid=alice"
+    assert len(transport().session.cookies) == 0
+
+
+def test_shared():
+    assert transport() is transport()